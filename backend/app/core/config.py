@@ -24,5 +24,25 @@ class AppConfig(BaseSettings):
     workday_fallback: bool = True
     workday_provider: str = "pandas_market_calendars"
     workday_calendar: str = "SSE"
+    # 紧凑日历文件路径（workday_provider=bitmap），未配置时使用 app/data/workdays_<日历>.bin
+    workday_bitmap_path: str | None = None
+    # 工作日进程内缓存：容量（按月计）与过期时间，过期后从 workday_cache 集合重新读取
+    workday_cache_size: int = 240
+    workday_cache_ttl_seconds: int = 3600
+    # 工作日接口：区间查询的最大并发请求数（同时作为连接池容量）与失败结果的缓存秒数
+    workday_api_concurrency: int = 8
+    workday_api_failure_ttl_seconds: int = 30
+    # 单日预算精确求解的工作量上限（移位合并次数 × 位图位宽），超出保留当前最优结果；与机器负载无关，保证指定种子时结果可复现
+    solver_work_limit: int = 1_000_000_000
+    # 未指定种子时额外生效的单日求解时间上限（秒），作为工作量估算之外的兜底
+    solver_time_limit_seconds: float = 0.05
+    generation_cache_size: int = 32
+    generation_cache_ttl_seconds: int = 600
+    # 生成结果缓存的明细总行数上限，单次结果超出时不缓存
+    generation_cache_max_items: int = 200_000
+    generation_preview_size: int = 16
+    generation_preview_ttl_seconds: int = 900
+    # 计划明细存储格式：expanded 为逐行保存完整字段，compact 为按月字典编码
+    plan_storage_format: str = "expanded"
 
 config = AppConfig()
@@ -14,3 +14,4 @@ BUDGET_RANGE_INVALID = 4104
 GENERATION_FAILED = 4105
 PRODUCTS_EMPTY = 4106
 EXPORT_FAILED = 4107
+BUDGET_INFEASIBLE = 4108
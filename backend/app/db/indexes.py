@@ -0,0 +1,14 @@
+"""MongoDB 索引管理。
+
+应用启动时幂等创建查询所需的索引。
+"""
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase) -> None:
+    """创建业务查询依赖的索引，已存在时不会重复创建。"""
+    # 定期采购按产品查询最近采购日期
+    await db["procurement_plans"].create_index([("items.product_id", 1), ("date", -1)])
+    # 计划按日期 upsert 替换，日期唯一保证替换不会产生重复文档
+    await db["procurement_plans"].create_index([("date", 1)], unique=True)
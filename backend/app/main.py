@@ -3,10 +3,13 @@
 创建 FastAPI 应用并注册路由与异常处理器。
 """
 
+from contextlib import asynccontextmanager
+import logging
+
 from fastapi import FastAPI
 from typing import Any
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi import HTTPException
 from pymongo.errors import PyMongoError
 
@@ -14,10 +17,35 @@ from app.core import error_codes
 from app.core.middleware import PermissionMiddleware
 from app.core.config import config
 from app.core.response import ok
+from app.db.indexes import ensure_indexes
+from app.db.mongo import get_database
 from app.routers import auth, categories, history, procurement, procurement_export, products, workdays
+from app.services.generation_jobs import MAX_GENERATION_WORKERS
+from app.services.generation_metrics import generation_metrics
+from app.services.procurement_generator import close_generation_pool, open_generation_pool
+from app.services.workdays import close_workday_client, open_workday_client
+
+logger = logging.getLogger(__name__)
+
 
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    """应用生命周期：启动时创建索引、工作日接口连接池与生成进程池，关闭时依次释放。"""
+    try:
+        await ensure_indexes(get_database())
+    except PyMongoError as exc:
+        # 数据库暂不可用时不阻断启动，查询仍可正常执行
+        logger.warning("创建索引失败：%s", exc)
+    await open_workday_client()
+    await open_generation_pool(MAX_GENERATION_WORKERS)
+    try:
+        yield
+    finally:
+        await close_generation_pool()
+        await close_workday_client()
 
-app = FastAPI(title="自动采购 API", version="0.1.0")
+
+app = FastAPI(title="自动采购 API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(PermissionMiddleware, allow_all=not config.auth_enabled)
 
@@ -51,6 +79,7 @@ async def http_exception_handler(_, exc: HTTPException) -> JSONResponse:
         "未配置预算区间": error_codes.BUDGET_RANGE_INVALID,
         "预算区间无效": error_codes.BUDGET_RANGE_INVALID,
         "产品库为空": error_codes.PRODUCTS_EMPTY,
+        "预算配置不可行": error_codes.BUDGET_INFEASIBLE,
     }
     code = business_mapping.get(detail, mapping.get(status_code, error_codes.SYSTEM_ERROR))
     payload: dict[str, Any] = {"code": code, "message": detail}
@@ -90,3 +119,9 @@ async def pymongo_exception_handler(_, exc: PyMongoError) -> JSONResponse:
 async def health_check() -> JSONResponse:
     """健康检查接口。"""
     return ok({"status": "正常"})
+
+
+@app.get("/metrics")
+async def metrics() -> PlainTextResponse:
+    """以 Prometheus 文本格式导出计划生成的累计耗时与计数。"""
+    return PlainTextResponse(generation_metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -13,6 +13,8 @@ from app.core.response import ok
 from app.db.mongo import get_database
 from app.db.serializers import encode_for_mongo
 from app.schemas.category import CategoryCreate, CategoryDeactivate, CategoryUpdate
+from app.services.catalog_snapshot import bump_catalog_version, get_catalog_snapshot
+from app.services.feasibility import check_feasibility
 from app.services.rule_validation import collect_rule_gaps
 
 router = APIRouter(prefix="/api/categories", tags=["categories"])
@@ -87,14 +89,8 @@ async def list_categories(
     if is_active is False:
         query["is_active"] = False
 
-    counts: dict[str, int] = {}
-    pipeline = [
-        {"$match": {"is_deleted": False, "category_id": {"$exists": True}}},
-        {"$group": {"_id": "$category_id", "count": {"$sum": 1}}},
-    ]
-    async for doc in db["products"].aggregate(pipeline):
-        if doc.get("_id"):
-            counts[str(doc["_id"])] = int(doc.get("count", 0))
+    # 品类下产品数量取自目录快照，目录未变化时不再聚合产品集合
+    counts = (await get_catalog_snapshot(db)).product_counts
 
     sort_field_map = {
         "name": "name",
@@ -129,6 +125,13 @@ async def validate_categories() -> JSONResponse:
     return ok(await collect_rule_gaps(db))
 
 
+@router.get("/feasibility")
+async def check_budget_feasibility() -> JSONResponse:
+    """返回预算可行性预检结果，用于规则页提示。"""
+    db = get_database()
+    return ok(await check_feasibility(db))
+
+
 @router.post("")
 async def create_category(payload: CategoryCreate) -> JSONResponse:
     """新增品类并初始化状态。"""
@@ -145,6 +148,7 @@ async def create_category(payload: CategoryCreate) -> JSONResponse:
     doc["updated_at"] = now
     doc = encode_for_mongo(doc)
     result = await db["categories"].insert_one(doc)
+    await bump_catalog_version(db)
     return ok({"id": str(result.inserted_id)})
 
 
@@ -171,6 +175,7 @@ async def update_category(category_id: str, payload: CategoryUpdate) -> JSONResp
 
     if "name" in update:
         await db["products"].update_many({"category_id": category_id}, {"$set": {"category_name": update["name"]}})
+    await bump_catalog_version(db)
 
     return ok({"status": "成功", "id": category_id})
 
@@ -212,6 +217,7 @@ async def deactivate_category(
         {"_id": _require_object_id(category_id)},
         {"$set": {"is_active": False, "updated_at": datetime.utcnow()}},
     )
+    await bump_catalog_version(db)
 
     return ok({"status": "成功", "id": category_id, "transferred": transferred})
 
@@ -228,5 +234,6 @@ async def activate_category(category_id: str) -> JSONResponse:
         {"_id": _require_object_id(category_id)},
         {"$set": {"is_active": True, "updated_at": datetime.utcnow()}},
     )
+    await bump_catalog_version(db)
 
     return ok({"status": "成功", "id": category_id})
@@ -3,11 +3,13 @@
 提供采购计划历史列表与按月汇总功能。
 """
 from typing import Any
+import re
 
 from fastapi import APIRouter, Query
 
 from app.core.response import ok
 from app.db.mongo import get_database
+from app.services.plan_codec import find_meta_refs
 
 router = APIRouter(prefix="/api/procurement", tags=["history"])
 
@@ -28,10 +30,29 @@ async def history(
     if year and month:
         query["year_month"] = f"{year}-{month:02d}"
     elif year:
-        query["year_month"] = {"$regex": f"^{year}-"}
+        query["year_month"] = {"$gte": f"{year}-01", "$lte": f"{year}-12"}
+    # 紧凑格式的字典按月存放，只加载查询年月范围内的字典
+    year_month = query.get("year_month")
 
+    conditions: list[dict[str, Any]] = []
     if keyword:
-        query["items.name"] = {"$regex": keyword, "$options": "i"}
+        keyword_filter: dict[str, Any] = {"items.name": {"$regex": keyword, "$options": "i"}}
+        # 紧凑格式的明细只保存元数据引用，需先在字典中匹配名称
+        try:
+            pattern = re.compile(keyword, re.IGNORECASE)
+        except re.error:
+            pattern = None
+        refs = []
+        if pattern is not None:
+            refs = await find_meta_refs(
+                db,
+                "name",
+                lambda name: isinstance(name, str) and bool(pattern.search(name)),
+                year_month,
+            )
+        if refs:
+            keyword_filter = {"$or": [keyword_filter, {"items.r": {"$in": refs}}]}
+        conditions.append(keyword_filter)
 
     if category:
         product_cursor = db["products"].find(
@@ -42,7 +63,15 @@ async def history(
         or_filters: list[dict[str, Any]] = [{"items.category_id": category}]
         if product_ids:
             or_filters.append({"items.product_id": {"$in": product_ids}})
-        query["$or"] = or_filters
+        refs = await find_meta_refs(db, "category_id", lambda category_id: category_id == category, year_month)
+        if refs:
+            or_filters.append({"items.r": {"$in": refs}})
+        conditions.append({"$or": or_filters})
+
+    if len(conditions) == 1:
+        query.update(conditions[0])
+    elif conditions:
+        query["$and"] = conditions
 
     skip = max(page - 1, 0) * page_size
     cursor = db["procurement_plans"].find(query).skip(skip).limit(page_size).sort("date", -1)
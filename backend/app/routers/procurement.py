@@ -2,29 +2,64 @@
 
 提供计划生成、列表查询、明细获取与计划更新/删除能力。
 """
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 from typing import Any
+import asyncio
+import json
 
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
+from app.core.config import config
 from app.core.response import ok
 from app.core.security import get_current_user
 from app.db.mongo import get_database
 from app.db.serializers import encode_for_mongo
 from app.schemas.procurement_plan import ProcurementPlanItem
 from app.schemas.settings import SettingsUpdate
-from app.services.procurement_generator import generate_plans
+from app.services.budget_simulation import SIMULATION_DEFAULT_DAYS, simulate_budget
+from app.services.generation_jobs import (
+    JOB_STATUS_QUEUED,
+    JOB_TERMINAL_STATUSES,
+    GenerationRequest,
+    commit_preview,
+    expand_regeneration_dates,
+    get_generation_job,
+    run_generation,
+    run_regeneration,
+    submit_generation_job,
+    validate_generation_request,
+)
+from app.services.plan_codec import (
+    PLAN_DICTIONARY_COLLECTION,
+    PLAN_FORMAT_COMPACT,
+    PLAN_FORMAT_FIELD,
+    compact_items,
+    decode_plans,
+    save_dictionary_entries,
+)
 
 router = APIRouter(prefix="/api/procurement", tags=["procurement"])
 
+# SSE 推送任务进度的轮询间隔（秒）
+JOB_EVENT_POLL_SECONDS = 1.0
+
 
 class PlanUpdate(BaseModel):
     items: list[ProcurementPlanItem]
     total_amount: Decimal
 
 
+class PlanRegenerate(BaseModel):
+    dates: list[date] | None = None
+    start_date: date | None = None
+    end_date: date | None = None
+    seed: int | None = None
+
+
 @router.get("/settings")
 async def get_procurement_settings() -> dict:
     """获取采购计划相关设置（当前为预算区间）。"""
@@ -65,49 +100,94 @@ async def generate_procurement_plans(
     end_year: int,
     end_month: int,
     force_overwrite: bool = False,
+    workers: int = 1,
+    seed: int | None = None,
+    preview: bool = False,
+    require_feasible: bool = False,
+    debug: bool = False,
     current_user: dict[str, Any] = Depends(get_current_user),
 ) -> dict:
-    """按年月范围生成采购计划，并处理覆盖冲突月份逻辑。"""
+    """按年月范围生成采购计划，并处理覆盖冲突月份逻辑；预览模式只返回结果不落库。"""
     db = get_database()
+    request = GenerationRequest(
+        start_year, start_month, end_year, end_month, force_overwrite, workers, seed, preview,
+        require_feasible, debug,
+    )
+    validate_generation_request(request)
+    return ok(await run_generation(db, request, creator_id=current_user.get("id")))
 
-    if (start_year, start_month) > (end_year, end_month):
-        raise HTTPException(status_code=400, detail="月份范围无效")
-    if not (1 <= start_month <= 12 and 1 <= end_month <= 12):
-        raise HTTPException(status_code=400, detail="月份值无效")
-    if start_year < 2000 or end_year > 2100:
-        raise HTTPException(status_code=400, detail="年份值无效")
-
-    months = []
-    current = datetime(start_year, start_month, 1)
-    end = datetime(end_year, end_month, 1)
-    while current <= end:
-        months.append(f"{current.year}-{current.month:02d}")
-        if current.month == 12:
-            current = datetime(current.year + 1, 1, 1)
-        else:
-            current = datetime(current.year, current.month + 1, 1)
-
-    # 检测冲突月份
-    conflict = await db["procurement_plans"].distinct("year_month", {"year_month": {"$in": months}})
-    if conflict and not force_overwrite:
-        return ok({"status": "冲突", "conflict_months": conflict})
-
-    if conflict and force_overwrite:
-        # 覆盖模式下先删除冲突月份
-        await db["procurement_plans"].delete_many({"year_month": {"$in": conflict}})
-
-    plans, warnings = await generate_plans(
-        db,
-        start_year,
-        start_month,
-        end_year,
-        end_month,
-        creator_id=current_user.get("id"),
+
+@router.post("/generate/previews/{token}/commit")
+async def commit_generation_preview(token: str, force_overwrite: bool = False) -> dict:
+    """提交预览结果，直接写入已生成的计划。"""
+    db = get_database()
+    return ok(await commit_preview(db, token, force_overwrite))
+
+
+@router.post("/generate/jobs")
+async def submit_generation(
+    start_year: int,
+    start_month: int,
+    end_year: int,
+    end_month: int,
+    force_overwrite: bool = False,
+    workers: int = 1,
+    seed: int | None = None,
+    preview: bool = False,
+    require_feasible: bool = False,
+    debug: bool = False,
+    current_user: dict[str, Any] = Depends(get_current_user),
+) -> dict:
+    """提交后台生成任务，立即返回任务编号。"""
+    db = get_database()
+    request = GenerationRequest(
+        start_year, start_month, end_year, end_month, force_overwrite, workers, seed, preview,
+        require_feasible, debug,
     )
-    if plans:
-        await db["procurement_plans"].insert_many(encode_for_mongo(plans))
+    job_id = await submit_generation_job(db, request, creator_id=current_user.get("id"))
+    return ok({"job_id": job_id, "status": JOB_STATUS_QUEUED})
 
-    return ok({"status": "成功", "conflict_months": conflict, "warnings": warnings})
+
+@router.get("/generate/jobs/{job_id}")
+async def get_generation_job_status(job_id: str) -> dict:
+    """查询后台生成任务的状态、进度与结果。"""
+    db = get_database()
+    return ok(await get_generation_job(db, job_id))
+
+
+@router.get("/generate/jobs/{job_id}/events")
+async def stream_generation_job(job_id: str) -> StreamingResponse:
+    """以 SSE 推送后台生成任务进度，任务结束后关闭连接。"""
+    db = get_database()
+    # 先校验任务存在，错误以普通 JSON 响应返回
+    await get_generation_job(db, job_id)
+
+    async def events():
+        last_payload = None
+        while True:
+            job = await get_generation_job(db, job_id)
+            payload = json.dumps(jsonable_encoder(job), ensure_ascii=False)
+            if payload != last_payload:
+                yield f"data: {payload}\n\n"
+                last_payload = payload
+            if job["status"] in JOB_TERMINAL_STATUSES:
+                break
+            await asyncio.sleep(JOB_EVENT_POLL_SECONDS)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@router.get("/simulation")
+async def simulate_procurement_budget(
+    days: int = SIMULATION_DEFAULT_DAYS,
+    seed: int | None = None,
+    budget_min: Decimal | None = None,
+    budget_max: Decimal | None = None,
+    workers: int = 1,
+) -> dict:
+    """在内存中模拟大量工作日，返回每日金额分布与预算命中情况，不写入采购计划。"""
+    db = get_database()
+    return ok(await simulate_budget(db, days, seed, budget_min, budget_max, workers))
 
 
 @router.get("/plans")
@@ -160,6 +240,23 @@ async def list_plans(
     return ok({"items": items, "total": total})
 
 
+@router.post("/plans/regenerate")
+async def regenerate_plans(
+    payload: PlanRegenerate,
+    current_user: dict[str, Any] = Depends(get_current_user),
+) -> dict:
+    """重新生成指定日期或日期区间的计划，仅替换对应日期的文档。"""
+    db = get_database()
+    days = expand_regeneration_dates(payload.dates, payload.start_date, payload.end_date)
+    result = await run_regeneration(
+        db,
+        days,
+        creator_id=current_user.get("id"),
+        seed=payload.seed,
+    )
+    return ok(result)
+
+
 @router.get("/plans/{plan_date}")
 async def get_plan(plan_date: str) -> dict:
     """根据日期获取单日采购计划详情。"""
@@ -167,6 +264,7 @@ async def get_plan(plan_date: str) -> dict:
     doc = await db["procurement_plans"].find_one({"date": plan_date})
     if not doc:
         raise HTTPException(status_code=404, detail="未找到采购计划")
+    (doc,) = await decode_plans(db, [doc])
     doc["id"] = str(doc.pop("_id"))
     return ok(doc)
 
@@ -181,6 +279,10 @@ async def update_plan(
     db = get_database()
     update = payload.model_dump()
     update = encode_for_mongo(update)
+    if config.plan_storage_format == PLAN_FORMAT_COMPACT:
+        update["items"], entries = compact_items(update["items"])
+        update[PLAN_FORMAT_FIELD] = PLAN_FORMAT_COMPACT
+        await save_dictionary_entries(db, plan_date[:7], entries)
     update["updated_at"] = datetime.utcnow()
     update["updated_by"] = current_user.get("id")
     result = await db["procurement_plans"].update_one({"date": plan_date}, {"$set": update})
@@ -195,4 +297,5 @@ async def delete_month_plans(year: int = Query(...), month: int = Query(...)) ->
     db = get_database()
     year_month = f"{year}-{month:02d}"
     result = await db["procurement_plans"].delete_many({"year_month": year_month})
+    await db[PLAN_DICTIONARY_COLLECTION].delete_one({"_id": year_month})
     return ok({"status": "成功", "deleted": result.deleted_count})
@@ -4,19 +4,20 @@ from zoneinfo import ZoneInfo
 from decimal import Decimal, ROUND_HALF_UP
 import io
 import zipfile
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
 from fastapi import APIRouter, HTTPException
 from fastapi.responses import StreamingResponse
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Border, Font, Side
-from openpyxl.utils import get_column_letter
 from urllib.parse import quote
 
 from app.db.mongo import get_database
 from app.db.serializers import encode_for_mongo
 from app.schemas.export_template import ExportTemplateUpdate
 from app.core.response import ok
+from app.services.plan_codec import decode_plans
+
+if TYPE_CHECKING:
+    from openpyxl import Workbook
 
 router = APIRouter(prefix="/api/procurement/exports", tags=["procurement-exports"])
 
@@ -209,8 +210,13 @@ def _build_workbook(
     plans: list[dict[str, Any]],
     precision: int,
     template: dict[str, Any],
-) -> Workbook:
+) -> "Workbook":
     """构建单月采购清单的 Excel 工作簿。"""
+    # openpyxl 仅在导出时加载，避免拖慢应用启动
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, Border, Font, Side
+    from openpyxl.utils import get_column_letter
+
     wb = Workbook()
     ws = wb.active
     if ws is None:
@@ -389,7 +395,7 @@ async def export_zip(
     for year, month in months:
         year_month = f"{year}-{month:02d}"
         cursor = db["procurement_plans"].find({"year_month": year_month}).sort("date", 1)
-        plans: list[dict[str, Any]] = [doc async for doc in cursor]
+        plans: list[dict[str, Any]] = await decode_plans(db, [doc async for doc in cursor])
 
         if not plans:
             continue
@@ -502,7 +508,7 @@ async def preview_export(
 
     year_month = f"{year}-{month:02d}"
     cursor = db["procurement_plans"].find({"year_month": year_month}).sort("date", 1)
-    plans: list[dict[str, Any]] = [doc async for doc in cursor]
+    plans: list[dict[str, Any]] = await decode_plans(db, [doc async for doc in cursor])
 
     rows, month_total = _build_preview_rows(plans, precision, max_rows)
     return ok(
@@ -17,6 +17,7 @@ from app.core.response import ok
 from app.db.mongo import get_database
 from app.db.serializers import encode_for_mongo
 from app.schemas.product import ProductCreate, ProductUpdate
+from app.services.catalog_snapshot import bump_catalog_version
 from app.services.product_import_export import (
     build_products_workbook,
     import_products_from_xlsx,
@@ -229,6 +230,7 @@ async def create_product(payload: ProductCreate) -> dict:
     doc["created_at"] = now
     doc["updated_at"] = now
     result = await db["products"].insert_one(doc)
+    await bump_catalog_version(db)
     return ok({"id": str(result.inserted_id)})
 
 
@@ -274,6 +276,7 @@ async def update_product(product_id: str, payload: ProductUpdate) -> dict:
             "$unset": {"volatility_precision": "", "unit_price_precision": ""},
         },
     )
+    await bump_catalog_version(db)
     return ok({"status": "成功", "id": product_id})
 
 
@@ -306,6 +309,7 @@ async def batch_update_products(payload: dict[str, Any]) -> dict:
         {"$set": {**encode_for_mongo(update_payload), "updated_at": datetime.utcnow()}},
     )
     updated = int(result.modified_count)
+    await bump_catalog_version(db)
 
     return ok({"status": "成功", "updated": updated})
 
@@ -323,4 +327,5 @@ async def delete_product(product_id: str) -> dict:
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="未找到产品")
+    await bump_catalog_version(db)
     return ok({"status": "成功", "id": product_id})
@@ -1,11 +1,13 @@
 """工作日查询接口。
 
-提供指定年月的工作日列表。
+提供指定年月的工作日列表与工作日缓存刷新。
 """
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
 
 from app.core.response import ok
+from app.db.mongo import get_database
 from app.services.workdays import get_workdays as fetch_workdays
+from app.services.workdays import refresh_workday_cache
 
 router = APIRouter(prefix="/api/workdays", tags=["workdays"])
 
@@ -16,3 +18,12 @@ async def get_workdays(year: int = Query(...), month: int = Query(...)) -> dict:
     workdays = await fetch_workdays(year, month)
     payload = [day.isoformat() for day in workdays]
     return ok({"workdays": payload})
+
+
+@router.post("/refresh")
+async def refresh_workdays(year: int | None = None, month: int | None = None) -> dict:
+    """节假日安排变化后清除工作日缓存，可限定年份或年月。"""
+    if month is not None and (year is None or not 1 <= month <= 12):
+        raise HTTPException(status_code=400, detail="月份值无效")
+    removed = await refresh_workday_cache(get_database(), year, month)
+    return ok({"status": "成功", "removed": removed})
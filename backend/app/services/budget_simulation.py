@@ -0,0 +1,146 @@
+"""预算命中模拟服务。
+
+在内存中按生成服务的选品与预算调整逻辑批量模拟大量工作日，统计每日金额分布、
+超出预算区间的比例与各品类金额贡献，用于调整预算与选品规则，不读写采购计划集合。
+"""
+from collections import Counter, defaultdict
+from contextlib import aclosing
+from datetime import date, timedelta
+from decimal import Decimal
+import random
+
+from fastapi import HTTPException
+
+from app.services.fixed_point import cents_to_decimal, to_cents
+from app.services.generation_jobs import MAX_GENERATION_WORKERS
+from app.services.procurement_generator import (
+    build_months,
+    load_generation_context,
+    plan_simulation_batch,
+    summarize_budget_fit,
+)
+
+# 单次模拟天数上限与默认值
+SIMULATION_MAX_DAYS = 10000
+SIMULATION_DEFAULT_DAYS = 1000
+# 每批模拟的天数：每批作为一个生成任务在工作线程或进程池中执行
+SIMULATION_BATCH_DAYS = 250
+# 每日金额分布直方图的分桶数
+SIMULATION_HISTOGRAM_BINS = 10
+# 模拟日期的起点，仅用于派生每日随机源
+_SIMULATION_EPOCH = date(2000, 1, 1)
+
+
+def _amount(cents: float) -> str:
+    """将（可能为小数的）分值格式化为两位小数金额。"""
+    return str(cents_to_decimal(int(round(cents))))
+
+
+def _distribution(totals, budget_min_cents: int, budget_max_cents: int) -> dict:
+    """统计每日金额的分位数、直方图与超出预算区间的比例。"""
+    import numpy as np
+
+    values = np.asarray(totals, dtype=np.int64)
+    p5, p50, p95 = np.percentile(values, [5, 50, 95])
+    counts, edges = np.histogram(values, bins=SIMULATION_HISTOGRAM_BINS)
+    below = int((values < budget_min_cents).sum())
+    above = int((values > budget_max_cents).sum())
+    days = len(values)
+    return {
+        "min": _amount(values.min()),
+        "max": _amount(values.max()),
+        "mean": _amount(values.mean()),
+        "p5": _amount(p5),
+        "p50": _amount(p50),
+        "p95": _amount(p95),
+        "histogram": [
+            {"from": _amount(edges[idx]), "to": _amount(edges[idx + 1]), "days": int(count)}
+            for idx, count in enumerate(counts)
+        ],
+        "below_budget_ratio": round(below / days, 4),
+        "above_budget_ratio": round(above / days, 4),
+        "outside_budget_ratio": round((below + above) / days, 4),
+    }
+
+
+async def simulate_budget(
+    db,
+    days: int = SIMULATION_DEFAULT_DAYS,
+    seed: int | None = None,
+    budget_min: Decimal | None = None,
+    budget_max: Decimal | None = None,
+    workers: int = 1,
+) -> dict:
+    """模拟指定天数的每日采购，返回金额分布、预算命中与品类贡献。
+
+    仅模拟每日采购品类，按批交给生成服务的月份生成接口，选品、预算求解与补充选品沿用生成服务的实现。
+    可临时指定预算区间以评估调整效果，不修改已保存的设置；各批次在工作线程中执行，不阻塞事件循环，
+    workers 大于 1 时交给进程池并行模拟。
+    """
+    if not 1 <= days <= SIMULATION_MAX_DAYS:
+        raise HTTPException(status_code=400, detail="模拟天数无效")
+    if not 1 <= workers <= MAX_GENERATION_WORKERS:
+        raise HTTPException(status_code=400, detail="并行进程数无效")
+
+    context = await load_generation_context(db, budget_min, budget_max)
+
+    if seed is None:
+        seed = random.randrange(2**32)
+    totals: list[int] = []
+    budget_errors: list[Decimal] = []
+    category_amounts: dict[str, int] = defaultdict(int)
+    category_items: dict[str, int] = defaultdict(int)
+    category_names: dict[str, str | None] = {}
+    warning_reasons: Counter = Counter()
+
+    batch_ranges = [
+        range(start, min(start + SIMULATION_BATCH_DAYS, days))
+        for start in range(0, days, SIMULATION_BATCH_DAYS)
+    ]
+
+    def plan_batches():
+        """按批次构建模拟任务。"""
+        for batch, offsets in enumerate(batch_ranges):
+            simulated_days = [_SIMULATION_EPOCH + timedelta(days=offset) for offset in offsets]
+            yield plan_simulation_batch(context, simulated_days, seed, batch)
+
+    batch_index = 0
+    batches = build_months(context, plan_batches(), min(workers, len(batch_ranges)))
+    async with aclosing(batches):
+        async for _, plans, warnings, plan_errors in batches:
+            # 结果按提交顺序产出；无任何可选产品的日期计为 0 元
+            totals.extend([0] * (len(batch_ranges[batch_index]) - len(plans)))
+            batch_index += 1
+            warning_reasons.update(warning["reason"] for warning in warnings)
+            budget_errors.extend(plan_errors)
+            for plan in plans:
+                totals.append(to_cents(plan["total_amount"]))
+                for item in plan["items"]:
+                    category_id = item.get("category_id")
+                    category_amounts[category_id] += to_cents(item["amount"])
+                    category_items[category_id] += 1
+                    category_names.setdefault(category_id, item.get("category_name"))
+
+    grand_total = sum(category_amounts.values())
+    categories = [
+        {
+            "category_id": category_id,
+            "category_name": category_names.get(category_id)
+            or context.categories_by_id.get(category_id, {}).get("name"),
+            "mean_amount": _amount(amount / days),
+            "mean_items": round(category_items[category_id] / days, 2),
+            "share": round(amount / grand_total, 4) if grand_total else 0.0,
+        }
+        for category_id, amount in sorted(category_amounts.items(), key=lambda entry: -entry[1])
+    ]
+
+    return {
+        "days": days,
+        "seed": seed,
+        "budget_min": str(context.daily_range.min),
+        "budget_max": str(context.daily_range.max),
+        "daily_total": _distribution(totals, context.budget_min_cents, context.budget_max_cents),
+        "budget_fit": summarize_budget_fit(budget_errors),
+        "categories": categories,
+        "warnings": dict(warning_reasons),
+    }
@@ -0,0 +1,103 @@
+"""预算贴合求解器。
+
+在所选明细的整数步进格上求解最接近目标预算的数量组合。
+以大整数位图表示可达金额集合（第 k 位为 1 表示相对基准合计 k 分可达），
+逐个明细按各候选步数的金额做移位合并，最后取最接近目标的可达金额并回溯每个明细的步数。
+求解工作量以移位合并次数 × 位图位宽计，只取决于输入，可作为与机器负载无关的确定性上限。
+"""
+from time import perf_counter
+import random
+
+
+def _closest_bit(reachable: int, goal: int) -> int:
+    """返回位图中最接近 goal 的置位位置，距离相同时取较小者。"""
+    below = reachable & ((1 << (goal + 1)) - 1)
+    above = reachable >> goal
+    best_below = below.bit_length() - 1 if below else None
+    best_above = goal + (above & -above).bit_length() - 1 if above else None
+    if best_above is None:
+        return best_below
+    if best_below is None:
+        return best_above
+    return best_below if goal - best_below <= best_above - goal else best_above
+
+
+def _max_gap(options: list[list[int]]) -> int:
+    """返回各组相邻候选金额的最大间隔。"""
+    return max(
+        (group[idx + 1] - group[idx] for group in options for idx in range(len(group) - 1)),
+        default=0,
+    )
+
+
+def solver_work(options: list[list[int]], target: int) -> int:
+    """估算求解的工作量（移位合并次数 × 位图位宽），可直接得出结果的情形为 0。"""
+    if not options:
+        return 0
+    goal = target - sum(group[0] for group in options)
+    if goal <= 0 or goal >= sum(group[-1] - group[0] for group in options):
+        return 0
+    return (goal + _max_gap(options) + 1) * sum(len(group) for group in options)
+
+
+def solve_closest(
+    options: list[list[int]],
+    target: int,
+    deadline: float | None = None,
+    rng: random.Random | None = None,
+    max_work: int | None = None,
+) -> tuple[list[int], int] | None:
+    """在每组候选金额（按步数升序、非递减）中各选一项，使合计最接近目标。
+
+    返回各组选中的下标与合计金额；工作量超过 max_work 或超过 deadline（perf_counter 时刻）时返回 None。
+    """
+    if not options:
+        return [], 0
+    base = sum(group[0] for group in options)
+    goal = target - base
+    if goal <= 0:
+        return [0] * len(options), base
+    span = sum(group[-1] - group[0] for group in options)
+    if goal >= span:
+        return [len(group) - 1 for group in options], base + span
+
+    # 任一可达合计每次最多跨越一个最大金额间隔，最优解不会超过 goal + gap
+    width = goal + _max_gap(options) + 1
+    if max_work is not None and width * sum(len(group) for group in options) > max_work:
+        return None
+    mask = (1 << width) - 1
+
+    layers = [1]
+    for group in options:
+        previous = layers[-1]
+        current = 0
+        seen: set[int] = set()
+        for amount in group:
+            offset = amount - group[0]
+            if offset in seen:
+                continue
+            seen.add(offset)
+            current |= previous << offset
+            # 单组候选较多时移位合并本身耗时可观，逐项检查超时
+            if deadline is not None and perf_counter() > deadline:
+                return None
+        layers.append(current & mask)
+
+    total = _closest_bit(layers[-1], goal)
+
+    # 回溯：从最后一组开始寻找能由上一层到达的选项，随机顺序避免数量集中在边界
+    chosen = [0] * len(options)
+    remaining = total
+    for idx in range(len(options) - 1, -1, -1):
+        group = options[idx]
+        previous = layers[idx]
+        order = list(range(len(group)))
+        if rng is not None:
+            rng.shuffle(order)
+        for option in order:
+            offset = group[option] - group[0]
+            if offset <= remaining and (previous >> (remaining - offset)) & 1:
+                chosen[idx] = option
+                remaining -= offset
+                break
+    return chosen, base + total
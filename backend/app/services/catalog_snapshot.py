@@ -0,0 +1,97 @@
+"""产品目录快照服务。
+
+在进程内缓存品类、按品类分组的产品、名称映射与产品画像，供计划生成、规则校验与品类列表复用。
+目录版本号保存在 meta 集合中，产品与品类的每条写入路径都会递增版本号；
+读取快照时只读取版本号（记录缺失时才初始化），版本未变化时直接复用，变化后整体重建。
+"""
+from collections import defaultdict
+from functools import cached_property
+from uuid import uuid4
+
+from pymongo import ReturnDocument
+
+CATALOG_META_ID = "catalog"
+
+_snapshot: "CatalogSnapshot | None" = None
+
+
+class CatalogSnapshot:
+    """某一目录版本下的只读数据，调用方不得修改其中的文档。"""
+
+    def __init__(self, version: str, categories: list[dict], products: list[dict]) -> None:
+        """按品类分组产品，并解析历史数据中仅有品类名称的产品。"""
+        self.version = version
+        self.categories = categories
+        self.products = products
+        self.name_to_id = {doc.get("name"): str(doc.get("_id")) for doc in categories if doc.get("name")}
+        self.active_categories_by_id = {
+            str(doc["_id"]): doc for doc in categories if doc.get("is_active") is True
+        }
+
+        # 品类列表的产品数量只统计已关联品类编号的产品
+        self.product_counts: dict[str, int] = defaultdict(int)
+        active_name_to_id = {
+            doc.get("name"): category_id
+            for category_id, doc in self.active_categories_by_id.items()
+            if doc.get("name")
+        }
+        products_by_category: dict[str, list[dict]] = defaultdict(list)
+        for product in products:
+            category_id = product.get("category_id")
+            if category_id:
+                self.product_counts[str(category_id)] += 1
+            else:
+                legacy_name = product.get("category_name") or product.get("category")
+                category_id = active_name_to_id.get(legacy_name)
+                if category_id:
+                    product = {**product, "category_id": category_id, "category_name": legacy_name}
+            if category_id:
+                products_by_category[category_id].append(product)
+        self.products_by_category = dict(products_by_category)
+
+    @cached_property
+    def profiles(self) -> dict:
+        """产品成本画像，首次用于生成时计算，同一版本内复用。"""
+        # 延迟导入，避免与生成服务循环依赖
+        from app.services.procurement_generator import DEFAULT_MONEY_PRECISION, _build_product_profiles
+
+        return _build_product_profiles(self.products, DEFAULT_MONEY_PRECISION)
+
+
+async def _current_version(db) -> str:
+    """读取目录版本，仅在版本记录缺失时初始化；纪元编号保证版本记录重建后不会误用旧快照。"""
+    doc = await db["meta"].find_one({"_id": CATALOG_META_ID})
+    if doc is None:
+        doc = await db["meta"].find_one_and_update(
+            {"_id": CATALOG_META_ID},
+            {"$setOnInsert": {"version": 0, "epoch": uuid4().hex}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    return f"{doc['epoch']}:{doc['version']}"
+
+
+async def bump_catalog_version(db) -> None:
+    """产品或品类写入后递增目录版本，使各进程的快照失效。"""
+    global _snapshot
+    await db["meta"].update_one(
+        {"_id": CATALOG_META_ID},
+        {"$inc": {"version": 1}, "$setOnInsert": {"epoch": uuid4().hex}},
+        upsert=True,
+    )
+    _snapshot = None
+
+
+async def get_catalog_snapshot(db) -> CatalogSnapshot:
+    """返回当前版本的目录快照，版本未变化时不访问品类与产品集合。"""
+    global _snapshot
+    version = await _current_version(db)
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+    # 逐条读取游标，不设条数上限，大型产品库的品类计数与生成输入不会被截断
+    categories = [doc async for doc in db["categories"].find({})]
+    products = [doc async for doc in db["products"].find({"is_deleted": False})]
+    snapshot = CatalogSnapshot(version, categories, products)
+    _snapshot = snapshot
+    return snapshot
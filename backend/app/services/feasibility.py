@@ -0,0 +1,176 @@
+"""预算可行性预检服务。
+
+在生成任何计划之前，根据品类选品数量范围、产品采购数量范围与单价波动，
+计算每日采购可达到的金额区间，并与预算区间比较，提前发现无解的配置。
+"""
+from decimal import Decimal, ROUND_HALF_EVEN
+from itertools import accumulate
+
+from fastapi import HTTPException
+
+from app.services.catalog_snapshot import get_catalog_snapshot
+from app.services.fixed_point import cents_to_decimal, line_amount_cents, to_cents
+
+# 业务侧统一使用 2 位金额精度，与生成服务一致
+FEASIBILITY_MONEY_PRECISION = 2
+
+
+def _count_bounds(count_range: dict | None, available: int) -> tuple[int, int]:
+    """按生成服务的取数规则换算品类每日实际可选的最少与最多产品数。"""
+    count_range = count_range or {}
+    min_count = int(count_range.get("min", 1))
+    max_count = int(count_range.get("max", min_count))
+    upper = min(max(max_count, min_count), available)
+    lower = min(max(1, min_count), upper)
+    return lower, upper
+
+
+def _lowest_line_cents(product: dict, profile, precision: int) -> int:
+    """产品以波动后最低单价、最小数量采购时的金额（分）。"""
+    volatility = Decimal(str(product.get("volatility") or 0))
+    price_cents = max(1, to_cents(cents_to_decimal(profile.base_cents) * (1 - volatility), ROUND_HALF_EVEN))
+    return line_amount_cents(price_cents, profile.min_steps, profile.ratio, precision)
+
+
+def _highest_line_cents(profile, precision: int) -> int:
+    """产品以波动后最高单价、最大数量采购时的金额（分）。"""
+    return line_amount_cents(profile.max_price_cents, profile.max_steps, profile.ratio, precision)
+
+
+def analyze_feasibility(
+    categories_by_id: dict[str, dict],
+    products_by_category: dict[str, list[dict]],
+    profiles: dict,
+    budget_min_cents: int,
+    budget_max_cents: int,
+    precision: int = FEASIBILITY_MONEY_PRECISION,
+) -> dict:
+    """计算每日采购金额可达区间并给出问题清单。
+
+    每个每日采购品类分别按最低、最高金额排序求前缀和，取选品数量下限个最便宜产品之和
+    作为品类下界、上限个最贵产品之和作为上界；各品类相加即为全天可达区间。
+    区间与预算区间不相交时配置不可行（error），单品类估算问题仅作提示（warning）。
+    """
+    budget_min = cents_to_decimal(budget_min_cents)
+    budget_max = cents_to_decimal(budget_max_cents)
+    categories: list[dict] = []
+    issues: list[dict] = []
+    total_min_cents = 0
+    total_max_cents = 0
+
+    for category_id, category in categories_by_id.items():
+        if category.get("purchase_mode") != "daily":
+            continue
+        name = category.get("name")
+        products = products_by_category.get(category_id, [])
+        if not products:
+            issues.append({
+                "level": "warning",
+                "category_id": category_id,
+                "category_name": name,
+                "reason": "品类无可用产品",
+            })
+            continue
+
+        count_range = category.get("items_count_range") or {}
+        min_required = int(count_range.get("min", 1))
+        min_count, max_count = _count_bounds(count_range, len(products))
+        if len(products) < min_required:
+            issues.append({
+                "level": "warning",
+                "category_id": category_id,
+                "category_name": name,
+                "reason": "品类产品数量不足以满足下限",
+                "available": len(products),
+                "min_required": min_required,
+            })
+
+        category_profiles = [(product, profiles[str(product["_id"])]) for product in products]
+        low_prefix = list(accumulate(
+            sorted(_lowest_line_cents(product, profile, precision) for product, profile in category_profiles),
+            initial=0,
+        ))
+        high_prefix = list(accumulate(
+            sorted((_highest_line_cents(profile, precision) for _, profile in category_profiles), reverse=True),
+            initial=0,
+        ))
+        # 生成时按最高单价估算最低成本，超过预算上限会逐日产生预警
+        estimate_prefix = list(accumulate(
+            sorted(profile.min_cost_cents for _, profile in category_profiles),
+            initial=0,
+        ))
+        cost_min_cents = low_prefix[min_count]
+        cost_max_cents = high_prefix[max_count]
+        if estimate_prefix[min_count] > budget_max_cents:
+            issues.append({
+                "level": "warning",
+                "category_id": category_id,
+                "category_name": name,
+                "reason": "最低成本高于预算上限",
+                "min_cost": str(cents_to_decimal(estimate_prefix[min_count])),
+                "budget_max": str(budget_max),
+            })
+
+        total_min_cents += cost_min_cents
+        total_max_cents += cost_max_cents
+        categories.append({
+            "category_id": category_id,
+            "category_name": name,
+            "available": len(products),
+            "min_count": min_count,
+            "max_count": max_count,
+            "cost_min": str(cents_to_decimal(cost_min_cents)),
+            "cost_max": str(cents_to_decimal(cost_max_cents)),
+        })
+
+    if total_min_cents > budget_max_cents:
+        issues.append({
+            "level": "error",
+            "reason": "最低日采总额高于预算上限",
+            "cost_min": str(cents_to_decimal(total_min_cents)),
+            "budget_max": str(budget_max),
+        })
+    if total_max_cents < budget_min_cents:
+        issues.append({
+            "level": "error",
+            "reason": "最高日采总额低于预算下限",
+            "cost_max": str(cents_to_decimal(total_max_cents)),
+            "budget_min": str(budget_min),
+        })
+
+    return {
+        "feasible": not any(issue["level"] == "error" for issue in issues),
+        "budget_min": str(budget_min),
+        "budget_max": str(budget_max),
+        "cost_min": str(cents_to_decimal(total_min_cents)),
+        "cost_max": str(cents_to_decimal(total_max_cents)),
+        "categories": categories,
+        "issues": issues,
+    }
+
+
+def ensure_feasible(report: dict) -> None:
+    """预检不可行时拒绝生成，并在错误详情中附带预检结果。"""
+    if not report["feasible"]:
+        raise HTTPException(status_code=409, detail={"message": "预算配置不可行", "feasibility": report})
+
+
+async def check_feasibility(db) -> dict:
+    """读取预算设置与目录快照，返回当前配置的可行性预检结果。"""
+    settings_doc = await db["settings"].find_one({"key": "global"})
+    budget = (settings_doc or {}).get("daily_budget_range")
+    if not budget:
+        raise HTTPException(status_code=409, detail="未配置预算区间")
+    budget_min_cents = to_cents(budget["min"])
+    budget_max_cents = to_cents(budget["max"])
+    if budget_min_cents > budget_max_cents:
+        raise HTTPException(status_code=409, detail="预算区间无效")
+
+    snapshot = await get_catalog_snapshot(db)
+    return analyze_feasibility(
+        snapshot.active_categories_by_id,
+        snapshot.products_by_category,
+        snapshot.profiles,
+        budget_min_cents,
+        budget_max_cents,
+    )
@@ -0,0 +1,60 @@
+"""定点数运算工具。
+
+生成器内部统一以整数表示金额（分）与数量（步进单位，如 0.1 斤 = 1 个单位），
+仅在输出边界转换为 Decimal。取整语义与 number_utils.round_decimal 的 ROUND_HALF_UP 完全一致。
+"""
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR, ROUND_HALF_UP
+
+MONEY_SCALE = 100
+# 数量步进仅有 0.1 与 1 两种，分母均可整除该值
+QUANTITY_SCALE = 10
+
+
+def div_round_half_up(numerator: int, denominator: int) -> int:
+    """整数除法并按 ROUND_HALF_UP（远离零）取整。"""
+    if denominator < 0:
+        numerator, denominator = -numerator, -denominator
+    quotient, remainder = divmod(abs(numerator), denominator)
+    if remainder * 2 >= denominator:
+        quotient += 1
+    return quotient if numerator >= 0 else -quotient
+
+
+def to_cents(value: Decimal | float | int, rounding: str = ROUND_HALF_UP) -> int:
+    """将金额换算为整数分，默认四舍五入。"""
+    return int((Decimal(str(value)) * MONEY_SCALE).to_integral_value(rounding=rounding))
+
+
+def cents_to_decimal(cents: int) -> Decimal:
+    """将整数分还原为两位小数的 Decimal。"""
+    return Decimal(cents).scaleb(-2)
+
+
+def step_ratio(step: Decimal) -> tuple[int, int]:
+    """返回步进值的分子与分母，如 0.1 -> (1, 10)。"""
+    numerator, denominator = step.as_integer_ratio()
+    if QUANTITY_SCALE % denominator:
+        raise ValueError("数量步进不受支持")
+    return numerator, denominator
+
+
+def to_steps(value: Decimal, step: Decimal, rounding: str = ROUND_HALF_UP) -> int:
+    """将数量换算为步进单位整数。"""
+    return int((value / step).to_integral_value(rounding=rounding))
+
+
+def steps_range(min_value: Decimal, max_value: Decimal, step: Decimal) -> tuple[int, int]:
+    """返回数量区间内可行的最小与最大步数（可能出现最小大于最大）。"""
+    return to_steps(min_value, step, ROUND_CEILING), to_steps(max_value, step, ROUND_FLOOR)
+
+
+def steps_to_decimal(steps: int, step: Decimal) -> Decimal:
+    """将步进单位整数还原为数量 Decimal，小数位与步进一致。"""
+    return Decimal(steps) * step
+
+
+def line_amount_cents(price_cents: int, steps: int, ratio: tuple[int, int], precision: int = 2) -> int:
+    """计算单价 × 数量的金额（分），按金额精度做 ROUND_HALF_UP。"""
+    numerator, denominator = ratio
+    granularity = 10 ** max(0, 2 - precision)
+    return div_round_half_up(price_cents * steps * numerator, denominator * granularity) * granularity
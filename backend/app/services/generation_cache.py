@@ -0,0 +1,87 @@
+"""生成结果缓存。
+
+缓存指定种子的按月生成结果，键由种子、目录版本、设置版本、历史台账、工作日与月份范围组成，
+相同请求的重复预览与重新生成可直接返回。未指定种子的生成不可复现，不进入缓存。
+生成结果缓存除条目数外还按明细行数估算占用，总行数超出上限时淘汰最久未使用的条目，单个结果超出上限则不缓存。
+"""
+from collections import OrderedDict
+from collections.abc import Hashable
+from time import monotonic
+from typing import Any
+import copy
+import hashlib
+import json
+
+from app.core.config import config
+
+
+def fingerprint(value: Any) -> str:
+    """计算任意可 JSON 化数据的稳定摘要。"""
+    payload = json.dumps(value, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """带过期时间的 LRU 缓存，读写均做深拷贝，调用方修改结果不会污染缓存。
+
+    指定 max_weight 时按写入时给出的权重（如明细行数）限制总占用。
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, max_weight: int | None = None) -> None:
+        """设置容量、过期时间（秒）与可选的总权重上限。"""
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_weight = max_weight
+        self.weight = 0
+        self._entries: OrderedDict[Hashable, tuple[float, int, Any]] = OrderedDict()
+
+    def accepts(self, weight: int) -> bool:
+        """判断指定权重的值能否写入缓存。"""
+        return self.max_entries > 0 and (self.max_weight is None or weight <= self.max_weight)
+
+    def get(self, key: Hashable) -> Any | None:
+        """读取未过期的缓存值，命中时刷新 LRU 顺序。"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _weight, value = entry
+        if expires_at < monotonic():
+            self.pop(key)
+            return None
+        self._entries.move_to_end(key)
+        return copy.deepcopy(value)
+
+    def put(self, key: Hashable, value: Any, weight: int = 1, owned: bool = False) -> None:
+        """写入缓存，超过容量或总权重时淘汰最久未使用的条目；owned 表示值已是调用方不再持有的副本。"""
+        if not self.accepts(weight):
+            return
+        self.pop(key)
+        self._entries[key] = (monotonic() + self.ttl_seconds, weight, value if owned else copy.deepcopy(value))
+        self.weight += weight
+        while len(self._entries) > self.max_entries or (
+            self.max_weight is not None and self.weight > self.max_weight
+        ):
+            _, (_, evicted, _) = self._entries.popitem(last=False)
+            self.weight -= evicted
+
+    def pop(self, key: Hashable) -> None:
+        """移除指定条目。"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.weight -= entry[1]
+
+    def clear(self) -> None:
+        """清空缓存。"""
+        self._entries.clear()
+        self.weight = 0
+
+    def __len__(self) -> int:
+        """返回当前条目数。"""
+        return len(self._entries)
+
+
+generation_cache = GenerationCache(
+    config.generation_cache_size,
+    config.generation_cache_ttl_seconds,
+    max_weight=config.generation_cache_max_items,
+)
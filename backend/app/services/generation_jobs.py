@@ -0,0 +1,370 @@
+"""采购计划生成任务服务。
+
+封装“冲突检测 → 流式生成 → 按月替换写入”的完整生成流程，供同步接口与后台任务共用。
+后台任务的状态与进度保存在 generation_jobs 集合中，服务重启后仍可查询。
+"""
+from collections.abc import Awaitable, Callable
+from contextlib import aclosing
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import asyncio
+import logging
+import os
+from uuid import uuid4
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.core.config import config
+from app.db.serializers import encode_for_mongo
+from app.services import generation_metrics
+from app.services.feasibility import check_feasibility, ensure_feasible
+from app.services.generation_cache import GenerationCache
+from app.services.plan_store import replace_date_plans, replace_month_plans, supports_transactions
+from app.services.procurement_generator import (
+    iter_generate_plans,
+    regenerate_days,
+    summarize_budget_fit,
+)
+
+logger = logging.getLogger(__name__)
+
+# 并行生成进程数上限
+MAX_GENERATION_WORKERS = os.cpu_count() or 1
+# 单次重新生成的日期数量上限
+MAX_REGENERATE_DAYS = 366
+# 任务文档中保留的预警条数上限（计数不受影响）
+JOB_MAX_WARNINGS = 1000
+# 运行中任务超过该时长无心跳视为已中断（如进程重启）
+JOB_STALE_AFTER = timedelta(minutes=10)
+
+JOB_STATUS_QUEUED = "排队中"
+JOB_STATUS_RUNNING = "运行中"
+JOB_STATUS_SUCCEEDED = "已完成"
+JOB_STATUS_FAILED = "失败"
+JOB_STATUS_INTERRUPTED = "已中断"
+JOB_TERMINAL_STATUSES = {JOB_STATUS_SUCCEEDED, JOB_STATUS_FAILED, JOB_STATUS_INTERRUPTED}
+
+# 预览结果暂存：令牌 -> 待提交的计划，过期后需重新生成
+preview_store = GenerationCache(config.generation_preview_size, config.generation_preview_ttl_seconds)
+
+# 持有运行中任务的引用，避免被垃圾回收
+_running_tasks: set[asyncio.Task] = set()
+
+MonthCallback = Callable[[str, list[dict], list[dict]], Awaitable[None]]
+
+
+@dataclass
+class GenerationRequest:
+    """一次生成请求的参数。"""
+    start_year: int
+    start_month: int
+    end_year: int
+    end_month: int
+    force_overwrite: bool = False
+    workers: int = 1
+    seed: int | None = None
+    preview: bool = False
+    require_feasible: bool = False
+    debug: bool = False
+
+
+def validate_generation_request(request: GenerationRequest) -> None:
+    """校验生成的年月范围。"""
+    if (request.start_year, request.start_month) > (request.end_year, request.end_month):
+        raise HTTPException(status_code=400, detail="月份范围无效")
+    if not (1 <= request.start_month <= 12 and 1 <= request.end_month <= 12):
+        raise HTTPException(status_code=400, detail="月份值无效")
+    if request.start_year < 2000 or request.end_year > 2100:
+        raise HTTPException(status_code=400, detail="年份值无效")
+    if not 1 <= request.workers <= MAX_GENERATION_WORKERS:
+        raise HTTPException(status_code=400, detail="并行进程数无效")
+
+
+def _year_months(request: GenerationRequest) -> list[str]:
+    """列出请求范围内的全部年月。"""
+    months = []
+    current = datetime(request.start_year, request.start_month, 1)
+    end = datetime(request.end_year, request.end_month, 1)
+    while current <= end:
+        months.append(f"{current.year}-{current.month:02d}")
+        if current.month == 12:
+            current = datetime(current.year + 1, 1, 1)
+        else:
+            current = datetime(current.year, current.month + 1, 1)
+    return months
+
+
+async def run_generation(
+    db,
+    request: GenerationRequest,
+    creator_id: str | None = None,
+    on_month: MonthCallback | None = None,
+) -> dict:
+    """执行一次完整生成：检测冲突、按月流式生成并逐月替换写入，返回接口结果。
+
+    预览模式只生成不落库，结果暂存在服务端并返回令牌，确认后可直接提交。
+    各阶段耗时与计数汇总到指标；debug 模式下同时随结果返回。
+    """
+    with generation_metrics.profiling("generate") as profile:
+        result = await _run_generation(db, request, creator_id, on_month)
+    if request.debug:
+        result["profile"] = profile.as_dict()
+    return result
+
+
+async def _run_generation(
+    db,
+    request: GenerationRequest,
+    creator_id: str | None,
+    on_month: MonthCallback | None,
+) -> dict:
+    """run_generation 的实际执行流程。"""
+    months = _year_months(request)
+
+    # 检测冲突月份
+    with generation_metrics.span("conflict_check"):
+        conflict = await db["procurement_plans"].distinct("year_month", {"year_month": {"$in": months}})
+    if conflict and not request.force_overwrite and not request.preview:
+        return {"status": "冲突", "conflict_months": conflict}
+
+    # 生成前预检预算可行性：严格模式下直接拒绝，否则随结果返回提示
+    with generation_metrics.span("feasibility"):
+        feasibility = await check_feasibility(db)
+    if request.require_feasible:
+        ensure_feasible(feasibility)
+
+    # 覆盖模式下按日期原地替换冲突月份，不再先整月删除
+    use_transaction = not request.preview and await supports_transactions(db)
+    written_months: set[str] = set()
+
+    warnings: list[dict] = []
+    budget_errors: list[Decimal] = []
+    preview_plans: list[dict] = []
+    # 写入失败等提前结束时立即关闭生成流，释放并行生成的进程池
+    month_stream = iter_generate_plans(
+        db,
+        request.start_year,
+        request.start_month,
+        request.end_year,
+        request.end_month,
+        creator_id=creator_id,
+        workers=request.workers,
+        seed=request.seed,
+    )
+    async with aclosing(month_stream):
+        async for year_month, month_plans, month_warnings, month_errors in month_stream:
+            warnings.extend(month_warnings)
+            budget_errors.extend(month_errors)
+            if request.preview:
+                preview_plans.extend(month_plans)
+            else:
+                with generation_metrics.span("write"):
+                    await replace_month_plans(
+                        db,
+                        year_month,
+                        month_plans,
+                        prune=year_month in conflict,
+                        use_transaction=use_transaction,
+                    )
+                written_months.add(year_month)
+            if on_month is not None:
+                await on_month(year_month, month_plans, month_warnings)
+
+    # 冲突月份若本次没有任何工作日，整月清理旧计划
+    stale_months = [year_month for year_month in conflict if year_month not in written_months]
+    if stale_months and not request.preview:
+        await db["procurement_plans"].delete_many({"year_month": {"$in": stale_months}})
+
+    result = {
+        "status": "成功",
+        "conflict_months": conflict,
+        "warnings": warnings,
+        "budget_fit": summarize_budget_fit(budget_errors),
+        "seed": request.seed,
+        "feasibility": feasibility,
+    }
+    if request.preview:
+        token = uuid4().hex
+        preview_store.put(token, {"months": months, "plans": preview_plans})
+        result.update(
+            {
+                "status": "预览",
+                "preview_token": token,
+                "expires_in_seconds": preview_store.ttl_seconds,
+                "plans": preview_plans,
+            }
+        )
+    return result
+
+
+async def commit_preview(db, token: str, force_overwrite: bool = False) -> dict:
+    """将预览结果直接写入数据库，无需重新生成；令牌提交成功后失效。"""
+    entry = preview_store.get(token)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="预览已过期或不存在")
+
+    conflict = await db["procurement_plans"].distinct("year_month", {"year_month": {"$in": entry["months"]}})
+    if conflict and not force_overwrite:
+        # 保留令牌，便于用户确认覆盖后再次提交
+        return {"status": "冲突", "conflict_months": conflict}
+
+    now = datetime.utcnow()
+    plans = entry["plans"]
+    plans_by_month: dict[str, list[dict]] = {year_month: [] for year_month in entry["months"]}
+    for plan in plans:
+        plan["created_at"] = now
+        plan["updated_at"] = now
+        plans_by_month[plan["year_month"]].append(plan)
+    use_transaction = await supports_transactions(db)
+    for year_month, month_plans in plans_by_month.items():
+        await replace_month_plans(
+            db,
+            year_month,
+            month_plans,
+            prune=year_month in conflict,
+            use_transaction=use_transaction,
+        )
+    preview_store.pop(token)
+    return {"status": "成功", "conflict_months": conflict, "inserted": len(plans)}
+
+
+def expand_regeneration_dates(
+    dates: list[date] | None,
+    start_date: date | None,
+    end_date: date | None,
+) -> list[date]:
+    """将日期列表或起止日期展开为去重排序后的日期列表。"""
+    if dates:
+        days = set(dates)
+    elif start_date and end_date:
+        if start_date > end_date:
+            raise HTTPException(status_code=400, detail="日期范围无效")
+        days = {start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)}
+    else:
+        raise HTTPException(status_code=400, detail="请提供日期列表或起止日期")
+    if len(days) > MAX_REGENERATE_DAYS:
+        raise HTTPException(status_code=400, detail="重新生成的日期过多")
+    return sorted(days)
+
+
+async def run_regeneration(
+    db,
+    days: list[date],
+    creator_id: str | None = None,
+    seed: int | None = None,
+) -> dict:
+    """重新生成指定日期并只替换这些日期的计划文档。"""
+    with generation_metrics.profiling("regenerate"):
+        plans, warnings, skipped, budget_errors = await regenerate_days(db, days, creator_id=creator_id, seed=seed)
+
+        # 目标工作日若未生成明细，则移除原有计划，避免保留过期内容
+        regenerated = {plan["date"] for plan in plans}
+        removed = [
+            day.isoformat() for day in days
+            if day not in skipped and day.isoformat() not in regenerated
+        ]
+        with generation_metrics.span("write"):
+            await replace_date_plans(db, plans, removed, use_transaction=await supports_transactions(db))
+
+    return {
+        "status": "成功",
+        "regenerated": sorted(regenerated),
+        "removed": removed,
+        "skipped": [day.isoformat() for day in skipped],
+        "warnings": warnings,
+        "budget_fit": summarize_budget_fit(budget_errors),
+    }
+
+
+def _serialize_job(doc: dict) -> dict:
+    """将任务文档转换为接口输出结构，并识别心跳超时的中断任务。"""
+    doc["id"] = str(doc.pop("_id"))
+    if doc.get("status") in {JOB_STATUS_QUEUED, JOB_STATUS_RUNNING}:
+        heartbeat = doc.get("heartbeat_at") or doc.get("created_at")
+        if heartbeat and datetime.utcnow() - heartbeat > JOB_STALE_AFTER:
+            doc["status"] = JOB_STATUS_INTERRUPTED
+            doc["error"] = "任务执行进程已停止"
+    return doc
+
+
+async def submit_generation_job(db, request: GenerationRequest, creator_id: str | None = None) -> str:
+    """创建后台生成任务并立即返回任务编号。"""
+    validate_generation_request(request)
+    now = datetime.utcnow()
+    job = {
+        "status": JOB_STATUS_QUEUED,
+        "params": asdict(request),
+        "creator_id": creator_id,
+        "progress": {
+            "months_total": len(_year_months(request)),
+            "months_done": 0,
+            "days_done": 0,
+            "warnings_count": 0,
+        },
+        "warnings": [],
+        "result": None,
+        "error": None,
+        "created_at": now,
+        "updated_at": now,
+        "heartbeat_at": now,
+    }
+    result = await db["generation_jobs"].insert_one(job)
+    job_id = str(result.inserted_id)
+
+    task = asyncio.create_task(_run_job(db, job_id, request, creator_id))
+    _running_tasks.add(task)
+    task.add_done_callback(_running_tasks.discard)
+    return job_id
+
+
+async def _update_job(db, job_id: str, update: dict) -> None:
+    """更新任务文档并刷新心跳。"""
+    now = datetime.utcnow()
+    update.setdefault("$set", {}).update({"updated_at": now, "heartbeat_at": now})
+    await db["generation_jobs"].update_one({"_id": ObjectId(job_id)}, update)
+
+
+async def _run_job(db, job_id: str, request: GenerationRequest, creator_id: str | None) -> None:
+    """后台执行生成任务，逐月回写进度与预警。"""
+    await _update_job(db, job_id, {"$set": {"status": JOB_STATUS_RUNNING}})
+
+    async def on_month(year_month: str, month_plans: list[dict], month_warnings: list[dict]) -> None:
+        """每生成完一个月回写一次进度。"""
+        update: dict = {
+            "$inc": {
+                "progress.months_done": 1,
+                "progress.days_done": len(month_plans),
+                "progress.warnings_count": len(month_warnings),
+            },
+            "$set": {"progress.current_month": year_month},
+        }
+        if month_warnings:
+            update["$push"] = {"warnings": {"$each": month_warnings, "$slice": JOB_MAX_WARNINGS}}
+        await _update_job(db, job_id, update)
+
+    try:
+        result = await run_generation(db, request, creator_id, on_month=on_month)
+    except HTTPException as exc:
+        detail = exc.detail.get("message") if isinstance(exc.detail, dict) else str(exc.detail)
+        await _update_job(db, job_id, {"$set": {"status": JOB_STATUS_FAILED, "error": detail}})
+        return
+    except Exception:  # pragma: no cover - 兜底记录未预期异常
+        logger.exception("生成任务执行失败：%s", job_id)
+        await _update_job(db, job_id, {"$set": {"status": JOB_STATUS_FAILED, "error": "服务器内部错误"}})
+        return
+
+    # 最终结果中的预警已逐月写入任务文档，预览计划保存在预览缓存中，这里均不重复保存
+    summary = {key: value for key, value in result.items() if key not in {"warnings", "plans"}}
+    await _update_job(db, job_id, {"$set": {"status": JOB_STATUS_SUCCEEDED, "result": encode_for_mongo(summary)}})
+
+
+async def get_generation_job(db, job_id: str) -> dict:
+    """查询任务状态、进度与结果。"""
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=400, detail="无效的任务编号")
+    doc = await db["generation_jobs"].find_one({"_id": ObjectId(job_id)})
+    if not doc:
+        raise HTTPException(status_code=404, detail="未找到生成任务")
+    return _serialize_job(doc)
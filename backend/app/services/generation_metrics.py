@@ -0,0 +1,165 @@
+"""生成过程耗时与计数埋点。
+
+每次生成使用一个 GenerationProfile 记录各阶段耗时（span）与计数（如选品重试、替换尝试、预算调整次数），
+通过上下文变量传递，生成服务内部无需逐层传参；未启用时埋点调用直接返回。
+生成结束后汇总到进程级的 generation_metrics，并以 Prometheus 文本格式对外暴露。
+"""
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+METRICS_PREFIX = "autoprocure_generation"
+
+
+class GenerationProfile:
+    """单次生成的阶段耗时与计数；子进程中的记录以 as_dict 结果合并回父进程。"""
+
+    def __init__(self) -> None:
+        self.spans: dict[str, list] = defaultdict(lambda: [0.0, 0])
+        self.counters: dict[str, int] = defaultdict(int)
+
+    def add_span(self, name: str, seconds: float, calls: int = 1) -> None:
+        """累加阶段耗时与调用次数。"""
+        entry = self.spans[name]
+        entry[0] += seconds
+        entry[1] += calls
+
+    def count(self, name: str, value: int = 1) -> None:
+        """累加计数。"""
+        self.counters[name] += value
+
+    def merge(self, data: dict) -> None:
+        """合并另一份记录（as_dict 的结果）。"""
+        for name, span in data.get("spans", {}).items():
+            self.add_span(name, span["seconds"], span["calls"])
+        for name, value in data.get("counters", {}).items():
+            self.count(name, value)
+
+    def as_dict(self) -> dict:
+        """导出为可序列化结构，耗时单位为秒。"""
+        return {
+            "spans": {
+                name: {"seconds": round(seconds, 6), "calls": calls}
+                for name, (seconds, calls) in sorted(self.spans.items())
+            },
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+
+_current_profile: ContextVar[GenerationProfile | None] = ContextVar("generation_profile", default=None)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """记录代码块耗时；当前没有启用的记录时不计时。"""
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_span(name, perf_counter() - started)
+
+
+def count(name: str, value: int = 1) -> None:
+    """累加当前记录的计数；当前没有启用的记录时忽略。"""
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.count(name, value)
+
+
+def merge(data: dict) -> None:
+    """将子进程回传的记录合并到当前记录。"""
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.merge(data)
+
+
+@contextmanager
+def recording(profile: GenerationProfile) -> Iterator[GenerationProfile]:
+    """在代码块内启用指定记录，不写入进程级汇总（供子进程使用）。"""
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+@contextmanager
+def profiling(operation: str) -> Iterator[GenerationProfile]:
+    """启用一次新的记录，结束后（含失败）按操作类型汇总到 generation_metrics。"""
+    profile = GenerationProfile()
+    started = perf_counter()
+    try:
+        with recording(profile):
+            yield profile
+    finally:
+        profile.add_span("total", perf_counter() - started)
+        generation_metrics.record(operation, profile)
+
+
+class GenerationMetrics:
+    """进程级累计指标：各操作的执行次数、阶段耗时与计数。"""
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.runs: dict[str, int] = defaultdict(int)
+        self.spans: dict[tuple[str, str], list] = defaultdict(lambda: [0.0, 0])
+        self.counters: dict[tuple[str, str], int] = defaultdict(int)
+
+    def record(self, operation: str, profile: GenerationProfile) -> None:
+        """累加一次执行的记录。"""
+        with self._lock:
+            self.runs[operation] += 1
+            for name, (seconds, calls) in profile.spans.items():
+                entry = self.spans[(operation, name)]
+                entry[0] += seconds
+                entry[1] += calls
+            for name, value in profile.counters.items():
+                self.counters[(operation, name)] += value
+
+    def clear(self) -> None:
+        """清空累计指标。"""
+        with self._lock:
+            self.runs.clear()
+            self.spans.clear()
+            self.counters.clear()
+
+    def render_prometheus(self) -> str:
+        """输出 Prometheus 文本格式。"""
+        with self._lock:
+            runs = sorted(self.runs.items())
+            spans = sorted(self.spans.items())
+            counters = sorted(self.counters.items())
+        lines = [
+            f"# HELP {METRICS_PREFIX}_runs_total Completed generation operations.",
+            f"# TYPE {METRICS_PREFIX}_runs_total counter",
+            *(f'{METRICS_PREFIX}_runs_total{{operation="{operation}"}} {value}' for operation, value in runs),
+            f"# HELP {METRICS_PREFIX}_phase_seconds_total Time spent per generation phase.",
+            f"# TYPE {METRICS_PREFIX}_phase_seconds_total counter",
+            *(
+                f'{METRICS_PREFIX}_phase_seconds_total{{operation="{operation}",phase="{name}"}} {seconds:.6f}'
+                for (operation, name), (seconds, _) in spans
+            ),
+            f"# HELP {METRICS_PREFIX}_phase_calls_total Calls per generation phase.",
+            f"# TYPE {METRICS_PREFIX}_phase_calls_total counter",
+            *(
+                f'{METRICS_PREFIX}_phase_calls_total{{operation="{operation}",phase="{name}"}} {calls}'
+                for (operation, name), (_, calls) in spans
+            ),
+            f"# HELP {METRICS_PREFIX}_events_total Generation event counters.",
+            f"# TYPE {METRICS_PREFIX}_events_total counter",
+            *(
+                f'{METRICS_PREFIX}_events_total{{operation="{operation}",event="{name}"}} {value}'
+                for (operation, name), value in counters
+            ),
+        ]
+        return "\n".join(lines) + "\n"
+
+
+generation_metrics = GenerationMetrics()
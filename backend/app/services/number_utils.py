@@ -3,6 +3,7 @@
 提供 Decimal 的随机与四舍五入处理，用于价格与数量计算。
 """
 from decimal import Decimal, ROUND_HALF_UP
+import hashlib
 import random
 
 
@@ -12,10 +13,22 @@ def round_decimal(value: Decimal, precision: int) -> Decimal:
     return value.quantize(quant, rounding=ROUND_HALF_UP)
 
 
-def random_decimal(min_value: Decimal, max_value: Decimal, precision: int) -> Decimal:
-    """在区间内生成随机 Decimal 并按精度处理。"""
+def random_decimal(
+    min_value: Decimal,
+    max_value: Decimal,
+    precision: int,
+    rng: random.Random | None = None,
+) -> Decimal:
+    """在区间内生成随机 Decimal 并按精度处理，可指定随机源。"""
     if max_value < min_value:
         # 保证区间顺序正确
         min_value, max_value = max_value, min_value
-    raw = Decimal(str(random.uniform(float(min_value), float(max_value))))
+    chooser = rng if rng is not None else random
+    raw = Decimal(str(chooser.uniform(float(min_value), float(max_value))))
     return round_decimal(raw, precision)
+
+
+def derive_seed(seed: int, *labels: object) -> int:
+    """由主种子与标签派生独立的子种子，各随机流互不干扰。"""
+    text = ":".join(str(part) for part in (seed, *labels))
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
@@ -0,0 +1,136 @@
+"""采购计划明细的紧凑存储编码。
+
+紧凑格式下明细行只保存产品编号、元数据引用与整数化的单价（分）、数量（数量单位）、金额（分），
+名称、品类与单位等重复字符串按月存入 plan_dictionaries 集合，以内容哈希作为引用。
+读取时按月加载字典还原为原始明细，字段顺序与数值和展开格式完全一致；
+无法无损还原的明细（如手工编辑引入的额外精度）按原样保存在行内。
+"""
+from collections.abc import Iterable
+import hashlib
+import json
+
+from app.core.config import config
+from app.services.fixed_point import MONEY_SCALE, QUANTITY_SCALE
+
+PLAN_FORMAT_COMPACT = "compact"
+# 计划文档中标记明细存储格式的字段，读取时移除
+PLAN_FORMAT_FIELD = "items_format"
+PLAN_DICTIONARY_COLLECTION = "plan_dictionaries"
+
+# 明细字段顺序需与生成结果及 ProcurementPlanItem 保持一致，保证还原后响应不变
+ITEM_FIELDS = ("product_id", "category_id", "category_name", "name", "unit", "price", "quantity", "amount")
+ITEM_META_FIELDS = ("category_id", "category_name", "name", "unit")
+
+
+def _scaled(value, scale: int) -> int | None:
+    """将浮点数按比例换算为整数，换算后无法还原为同一浮点数时返回 None。"""
+    if type(value) is not float:
+        return None
+    scaled = round(value * scale)
+    return scaled if scaled / scale == value else None
+
+
+def meta_ref(meta: dict) -> str:
+    """元数据的内容哈希引用，相同元数据在任意月份得到相同引用。"""
+    payload = json.dumps([meta[field] for field in ITEM_META_FIELDS], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def _compact_item(item: dict) -> tuple[dict, str, dict] | None:
+    """将已编码的明细转换为紧凑行，无法无损还原时返回 None。"""
+    if tuple(item) != ITEM_FIELDS or type(item["product_id"]) is not str:
+        return None
+    price = _scaled(item["price"], MONEY_SCALE)
+    quantity = _scaled(item["quantity"], QUANTITY_SCALE)
+    amount = _scaled(item["amount"], MONEY_SCALE)
+    if price is None or quantity is None or amount is None:
+        return None
+    meta = {field: item[field] for field in ITEM_META_FIELDS}
+    ref = meta_ref(meta)
+    row = {"product_id": item["product_id"], "r": ref, "p": price, "q": quantity, "a": amount}
+    return row, ref, meta
+
+
+def _expand_item(row: dict, entries: dict[str, dict]) -> dict:
+    """将紧凑行还原为明细；行内原样保存的明细直接返回。"""
+    if "r" not in row:
+        return row
+    meta = entries.get(row["r"], {})
+    return {
+        "product_id": row["product_id"],
+        **{field: meta.get(field) for field in ITEM_META_FIELDS},
+        "price": row["p"] / MONEY_SCALE,
+        "quantity": row["q"] / QUANTITY_SCALE,
+        "amount": row["a"] / MONEY_SCALE,
+    }
+
+
+def compact_items(items: list[dict]) -> tuple[list[dict], dict[str, dict]]:
+    """压缩已编码的明细列表，返回（明细行, 本次用到的字典条目）。"""
+    rows: list[dict] = []
+    entries: dict[str, dict] = {}
+    for item in items:
+        compacted = _compact_item(item)
+        if compacted is None:
+            rows.append(item)
+            continue
+        row, ref, meta = compacted
+        rows.append(row)
+        entries[ref] = meta
+    return rows, entries
+
+
+async def save_dictionary_entries(db, year_month: str, entries: dict[str, dict], session=None) -> None:
+    """写入单月字典条目；条目以内容哈希为键，重复写入幂等。"""
+    if not entries:
+        return
+    await db[PLAN_DICTIONARY_COLLECTION].update_one(
+        {"_id": year_month},
+        {"$set": {f"entries.{ref}": meta for ref, meta in entries.items()}},
+        upsert=True,
+        session=session,
+    )
+
+
+async def compact_plan_docs(db, docs: list[dict], session=None) -> list[dict]:
+    """按配置的存储格式处理已编码的计划文档；紧凑格式会先写入对应月份的字典条目。"""
+    if config.plan_storage_format != PLAN_FORMAT_COMPACT:
+        return docs
+    month_entries: dict[str, dict[str, dict]] = {}
+    for doc in docs:
+        doc["items"], entries = compact_items(doc.get("items", []))
+        doc[PLAN_FORMAT_FIELD] = PLAN_FORMAT_COMPACT
+        month_entries.setdefault(doc["year_month"], {}).update(entries)
+    for year_month, entries in month_entries.items():
+        await save_dictionary_entries(db, year_month, entries, session=session)
+    return docs
+
+
+async def decode_plans(db, docs: Iterable[dict]) -> list[dict]:
+    """将计划文档还原为展开格式，按涉及的月份一次加载字典。"""
+    docs = list(docs)
+    months = sorted({doc["year_month"] for doc in docs if doc.get(PLAN_FORMAT_FIELD) == PLAN_FORMAT_COMPACT})
+    dictionaries: dict[str, dict[str, dict]] = {}
+    if months:
+        cursor = db[PLAN_DICTIONARY_COLLECTION].find({"_id": {"$in": months}})
+        dictionaries = {doc["_id"]: doc.get("entries", {}) async for doc in cursor}
+    for doc in docs:
+        if doc.pop(PLAN_FORMAT_FIELD, None) != PLAN_FORMAT_COMPACT:
+            continue
+        entries = dictionaries.get(doc["year_month"], {})
+        doc["items"] = [_expand_item(row, entries) for row in doc.get("items", [])]
+    return docs
+
+
+async def find_meta_refs(db, field: str, predicate, year_month: str | dict | None = None) -> list[str]:
+    """在各月字典中查找元数据满足条件的引用，用于按名称或品类筛选紧凑格式的计划。
+
+    year_month 为与计划查询相同的年月条件，只加载这些月份的字典（按 _id 索引查询）。
+    """
+    query = {} if year_month is None else {"_id": year_month}
+    refs: set[str] = set()
+    async for doc in db[PLAN_DICTIONARY_COLLECTION].find(query, {"entries": 1}):
+        for ref, meta in doc.get("entries", {}).items():
+            if predicate(meta.get(field)):
+                refs.add(ref)
+    return sorted(refs)
@@ -0,0 +1,78 @@
+"""采购计划写入服务。
+
+按日期 upsert 替换计划文档：先分批 ReplaceOne(upsert) 写入新计划，再删除范围内已不存在的日期，
+读者始终能看到旧计划或新计划，不会出现整月为空的中间状态。部署支持事务时每个替换单元在事务中完成。
+"""
+from contextlib import asynccontextmanager
+
+from pymongo import ReplaceOne
+from pymongo.errors import PyMongoError
+
+from app.db.serializers import encode_for_mongo
+from app.services.plan_codec import compact_plan_docs
+
+# 单次 bulk_write 的计划数量上限
+PLAN_WRITE_BATCH_SIZE = 200
+
+
+async def supports_transactions(db) -> bool:
+    """判断部署是否支持多文档事务（副本集或分片集群）。"""
+    try:
+        hello = await db.command("hello")
+    except (PyMongoError, NotImplementedError):
+        # 单机部署或测试替身不支持时按无事务处理
+        return False
+    return bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+
+
+@asynccontextmanager
+async def _write_session(db, use_transaction: bool):
+    """按需开启事务会话，不使用事务时返回 None。"""
+    if not use_transaction:
+        yield None
+        return
+    async with await db.client.start_session() as session:
+        async with session.start_transaction():
+            yield session
+
+
+async def _upsert_plans(db, plans: list[dict], session=None) -> None:
+    """按日期分批 upsert 计划文档，批内无序执行以提高吞吐。"""
+    for offset in range(0, len(plans), PLAN_WRITE_BATCH_SIZE):
+        docs = encode_for_mongo(plans[offset:offset + PLAN_WRITE_BATCH_SIZE])
+        docs = await compact_plan_docs(db, docs, session=session)
+        await db["procurement_plans"].bulk_write(
+            [ReplaceOne({"date": doc["date"]}, doc, upsert=True) for doc in docs],
+            ordered=False,
+            session=session,
+        )
+
+
+async def replace_month_plans(
+    db,
+    year_month: str,
+    plans: list[dict],
+    prune: bool = True,
+    use_transaction: bool = False,
+) -> None:
+    """写入单月计划；prune 时删除该月中新计划未覆盖的旧日期。"""
+    async with _write_session(db, use_transaction) as session:
+        await _upsert_plans(db, plans, session=session)
+        if prune:
+            await db["procurement_plans"].delete_many(
+                {"year_month": year_month, "date": {"$nin": [plan["date"] for plan in plans]}},
+                session=session,
+            )
+
+
+async def replace_date_plans(
+    db,
+    plans: list[dict],
+    removed_dates: list[str],
+    use_transaction: bool = False,
+) -> None:
+    """替换指定日期的计划，并删除不再有计划的日期。"""
+    async with _write_session(db, use_transaction) as session:
+        await _upsert_plans(db, plans, session=session)
+        if removed_dates:
+            await db["procurement_plans"].delete_many({"date": {"$in": removed_dates}}, session=session)
@@ -2,17 +2,42 @@
 
 基于品类规则、产品配置与预算区间生成每日采购明细，并支持定期采购插入。
 """
-from collections import defaultdict
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict, deque
+from collections.abc import AsyncIterator, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import aclosing, asynccontextmanager
 from dataclasses import dataclass
 from datetime import date, datetime, timedelta
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_EVEN
+from time import perf_counter
+import asyncio
+import copy
+import multiprocessing
+import pickle
 import random
 
 from fastapi import HTTPException
 
-from app.services.number_utils import random_decimal, round_decimal
+from app.core.config import config
+from app.services import generation_metrics
+from app.services.budget_solver import solve_closest, solver_work
+from app.services.catalog_snapshot import get_catalog_snapshot
+from app.services.fixed_point import (
+    cents_to_decimal,
+    div_round_half_up,
+    line_amount_cents,
+    step_ratio,
+    steps_range,
+    steps_to_decimal,
+    to_cents,
+    to_steps,
+)
+from app.services.generation_cache import fingerprint, generation_cache
+from app.services.number_utils import derive_seed, random_decimal
 from app.services.unit_rules import quantity_precision_for_unit, quantity_step_for_unit
-from app.services.workdays import get_workdays, shift_to_next_workday
+from app.services.workdays import get_workdays_range, shift_to_next_workday
 from app.services.rule_validation import collect_rule_gaps
 
 
@@ -27,6 +52,17 @@ DEFAULT_MONEY_PRECISION = 2
 MAX_MIN_COST_SWAP_TRIES = 5
 MAX_DAILY_BUDGET_RETRY = 5
 MAX_DAILY_MIN_ADD_TRIES = 5
+MAX_CHEAPER_PROBES = 8
+# 预算求解：完整区间候选步数上限、先行小窗口与大窗口半径；单日求解工作量与时间上限见 config.solver_work_limit、solver_time_limit_seconds
+SOLVER_MAX_OPTIONS = 4000
+SOLVER_NARROW_WINDOW_STEPS = 2
+SOLVER_WINDOW_STEPS = 40
+# 并行生成时每个子进程的在途月份数，控制结果在内存中的堆积
+PARALLEL_MONTHS_PER_WORKER = 2
+# 月份数少于该值时串行生成，序列化目录快照与进程间传输的开销高于并行收益
+PARALLEL_MIN_MONTHS = 3
+# 常驻进程池中每个子进程缓存的目录快照数，以及父进程缓存的快照序列化结果数
+WORKER_CONTEXT_CACHE_SIZE = 2
 
 
 def _parse_budget_range(payload: dict | None) -> BudgetRange | None:
@@ -53,51 +89,131 @@ def _normalize_volatility_price(value: Decimal) -> Decimal:
     return Decimal("0.01") if rounded < Decimal("0.01") else rounded
 
 
-def _step_quantize(value: Decimal, step: Decimal) -> Decimal:
-    """按步进对数量进行量化，保持与采购数量步进一致。"""
-    if step <= 0:
-        return value
-    steps = (value / step).to_integral_value(rounding="ROUND_HALF_UP")
-    return steps * step
+@dataclass(frozen=True, slots=True)
+class ProductProfile:
+    """单个产品的不可变成本画像，金额以分、数量以步进单位表示，每次生成只构建一次。"""
+    base_cents: int
+    max_price_cents: int
+    min_steps: int
+    max_steps: int
+    step: Decimal
+    ratio: tuple[int, int]
+    quantity_precision: int
+    min_cost_cents: int
+
+
+def _build_product_profile(product: dict, precision: int) -> ProductProfile:
+    """计算产品的基础单价、波动后最高单价、最小可行数量与最低成本。"""
+    unit = product.get("unit", "")
+    step = quantity_step_for_unit(unit)
+    ratio = step_ratio(step)
+    base_price = _normalize_base_price(_decimal(product.get("base_price", 0)))
+    volatility = _decimal(product.get("volatility") or 0)
+    # 考虑波动后的最高单价，用于预算估算
+    max_price = _normalize_volatility_price(base_price * (_decimal(1) + volatility))
+    max_price_cents = to_cents(max_price)
 
-
-def _random_quantity(min_value: Decimal, max_value: Decimal, step: Decimal, fallback_precision: int) -> Decimal:
-    """在区间内按步进生成随机数量，步进无效时按精度随机。"""
-    if step <= 0:
-        return random_decimal(min_value, max_value, fallback_precision)
-    min_steps = int((min_value / step).to_integral_value(rounding="ROUND_CEILING"))
-    max_steps = int((max_value / step).to_integral_value(rounding="ROUND_FLOOR"))
-    if max_steps < min_steps:
-        return random_decimal(min_value, max_value, fallback_precision)
-    return step * Decimal(random.randint(min_steps, max_steps))
-
-
-def _min_quantity_for_product(item_quantity_range: dict, step: Decimal) -> Decimal:
-    """根据采购数量范围与步进，推算可行的最小采购数量。"""
-    min_value = _decimal(item_quantity_range["min"])
-    if step <= 0:
-        return min_value
-    min_steps = (min_value / step).to_integral_value(rounding="ROUND_CEILING")
-    return step * min_steps
-
-
-def _max_price_for_product(product: dict) -> Decimal:
-    """计算考虑波动后的最高单价，用于预算估算。"""
-    base_price = _normalize_base_price(_decimal(product["base_price"]))
-    volatility = _decimal(product.get("volatility", 0))
-    price = base_price * (_decimal(1) + volatility)
-    return _normalize_volatility_price(price)
-
-
-def _estimate_min_cost(product: dict, precision: int) -> Decimal:
-    """估算单品的最小成本，供预算内选品筛选使用。"""
     item_quantity_range = product.get("item_quantity_range")
-    if not item_quantity_range:
-        return Decimal("0")
-    step = quantity_step_for_unit(product.get("unit", ""))
-    min_qty = _min_quantity_for_product(item_quantity_range, step)
-    max_price = _max_price_for_product(product)
-    return round_decimal(min_qty * max_price, precision)
+    if item_quantity_range:
+        min_steps, max_steps = steps_range(
+            _decimal(item_quantity_range["min"]),
+            _decimal(item_quantity_range["max"]),
+            step,
+        )
+        min_cost_cents = line_amount_cents(max_price_cents, min_steps, ratio, precision)
+    else:
+        min_steps = max_steps = min_cost_cents = 0
+
+    return ProductProfile(
+        base_cents=to_cents(base_price),
+        max_price_cents=max_price_cents,
+        min_steps=min_steps,
+        max_steps=max_steps,
+        step=step,
+        ratio=ratio,
+        quantity_precision=quantity_precision_for_unit(unit),
+        min_cost_cents=min_cost_cents,
+    )
+
+
+def _build_product_profiles(products: list[dict], precision: int) -> dict[str, ProductProfile]:
+    """在加载产品库时一次性构建全部产品画像。"""
+    return {str(product["_id"]): _build_product_profile(product, precision) for product in products}
+
+
+class CandidateIndex:
+    """品类内按基础单价升序排列的候选索引，配合当日已用位图回答“随机取未用产品”类查询。
+
+    各品类索引在当日位图中占用从 offset 开始的连续区段，一天只需一个位图，
+    选品后原地标记，无需逐品类重建候选列表。
+    """
+
+    __slots__ = ("products", "prices", "positions", "offset")
+
+    def __init__(self, products: list[dict], profiles: dict[str, ProductProfile], offset: int = 0) -> None:
+        """按基础单价排序并记录产品位置与在当日位图中的起始偏移。"""
+        self.products = sorted(products, key=lambda product: profiles[str(product["_id"])].base_cents)
+        self.prices = [profiles[str(product["_id"])].base_cents for product in self.products]
+        self.positions = {str(product["_id"]): pos for pos, product in enumerate(self.products)}
+        self.offset = offset
+
+    def __len__(self) -> int:
+        """返回索引内的产品数量。"""
+        return len(self.products)
+
+    def mark(self, bitmap: bytearray, product: dict, used: bool) -> None:
+        """在位图中标记或取消标记产品，非本品类产品忽略。"""
+        pos = self.positions.get(str(product["_id"]))
+        if pos is not None:
+            bitmap[self.offset + pos] = 1 if used else 0
+
+    def free_count(self, bitmap: bytearray) -> int:
+        """统计当日尚未使用的产品数量。"""
+        return len(self.products) - bitmap.count(1, self.offset, self.offset + len(self.products))
+
+    def _free_positions(self, bitmap: bytearray, limit: int) -> list[int]:
+        """列出前 limit 个位置中未使用的位置。"""
+        offset = self.offset
+        return [pos for pos in range(limit) if not bitmap[offset + pos]]
+
+    def sample(self, count: int, bitmap: bytearray, rng: random.Random) -> list[dict]:
+        """随机抽取至多 count 个互不相同的未用产品；未用产品不足 count 个时全部返回。"""
+        if count <= 0:
+            return []
+        free = self.free_count(bitmap)
+        if free <= count:
+            return [self.products[pos] for pos in self._free_positions(bitmap, len(self.products))]
+        offset = self.offset
+        picked: list[int] = []
+        seen: set[int] = set()
+        # 未用产品占多数时拒绝采样即可快速命中，探测次数超限再退化为扫描
+        for _ in range(count * MAX_CHEAPER_PROBES):
+            pos = rng.randrange(len(self.products))
+            if bitmap[offset + pos] or pos in seen:
+                continue
+            seen.add(pos)
+            picked.append(pos)
+            if len(picked) == count:
+                return [self.products[pos] for pos in picked]
+        remaining = [pos for pos in self._free_positions(bitmap, len(self.products)) if pos not in seen]
+        picked.extend(rng.sample(remaining, count - len(picked)))
+        return [self.products[pos] for pos in picked]
+
+    def pick_cheaper(self, price_cents: int, bitmap: bytearray, rng: random.Random) -> dict | None:
+        """二分定位低于指定单价的前缀，随机抽取其中一个未用产品。"""
+        limit = bisect_left(self.prices, price_cents)
+        if limit == 0:
+            return None
+        offset = self.offset
+        # 前缀中未用产品占多数时拒绝采样即可命中，否则退化为前缀扫描
+        for _ in range(MAX_CHEAPER_PROBES):
+            pos = rng.randrange(limit)
+            if not bitmap[offset + pos]:
+                return self.products[pos]
+        free = self._free_positions(bitmap, limit)
+        if not free:
+            return None
+        return self.products[rng.choice(free)]
 
 
 def _load_settings(doc: dict | None) -> dict:
@@ -115,18 +231,23 @@ def _allocate_daily_budgets(
     days: int,
     daily_range: BudgetRange,
     precision: int,
+    rng: random.Random | None = None,
 ) -> list[Decimal]:
     """为每个工作日生成目标预算金额。"""
     if days <= 0:
         return []
 
     return [
-        random_decimal(daily_range.min, daily_range.max, precision)
+        random_decimal(daily_range.min, daily_range.max, precision, rng=rng)
         for _ in range(days)
     ]
 
 
-def _pick_items_count(count_range: dict | None, default_count: int) -> int:
+def _pick_items_count(
+    count_range: dict | None,
+    default_count: int,
+    rng: random.Random | None = None,
+) -> int:
     """按选品数量范围随机抽取数量，失败时返回默认值。"""
     if not count_range:
         return default_count
@@ -140,21 +261,77 @@ def _pick_items_count(count_range: dict | None, default_count: int) -> int:
     if max_value < 1:
         return default_count
     min_value = max(1, min_value)
-    return random.randint(min_value, max_value)
+    chooser = rng if rng is not None else random
+    return chooser.randint(min_value, max_value)
 
 
-async def _build_periodic_schedule(
+async def _load_last_purchase_index(
     db,
+    product_ids: list[str],
+    before: date | None = None,
+) -> dict[str, date]:
+    """一次聚合查询所有定期产品的最近采购日期，可限定在指定日期之前。"""
+    if not product_ids:
+        return {}
+    match: dict = {"items.product_id": {"$in": product_ids}}
+    if before is not None:
+        match["date"] = {"$lt": before.isoformat()}
+    pipeline = [
+        {"$match": match},
+        {"$unwind": "$items"},
+        {"$match": {"items.product_id": {"$in": product_ids}}},
+        {"$group": {"_id": "$items.product_id", "last_date": {"$max": "$date"}}},
+    ]
+    index: dict[str, date] = {}
+    async for doc in db["procurement_plans"].aggregate(pipeline):
+        if doc.get("last_date"):
+            index[str(doc["_id"])] = date.fromisoformat(doc["last_date"])
+    return index
+
+
+def _periodic_product_ids(
+    products_by_category: dict[str, list[dict]],
+    categories_by_id: dict[str, dict],
+) -> list[str]:
+    """返回所有定期采购品类下的产品编号。"""
+    product_ids: list[str] = []
+    for category_id, category in categories_by_id.items():
+        if category.get("purchase_mode") != "periodic":
+            continue
+        product_ids.extend(str(product.get("_id")) for product in products_by_category.get(category_id, []))
+    return product_ids
+
+
+def _record_periodic_purchases(
+    ledger: dict[str, date],
+    periodic_ids: set[str],
+    items: list[dict],
+    day: date,
+) -> None:
+    """将当日生成的定期产品写入运行期最近采购台账。"""
+    for item in items:
+        product_id = item["product_id"]
+        if product_id not in periodic_ids:
+            continue
+        last = ledger.get(product_id)
+        if last is None or last < day:
+            ledger[product_id] = day
+
+
+def _build_periodic_schedule(
+    last_purchases: dict[str, date],
     products_by_category: dict[str, list[dict]],
     categories_by_id: dict[str, dict],
     workdays: list[date],
     year: int,
     month: int,
+    rng: random.Random | None = None,
 ) -> dict[date, list[dict]]:
     """生成定期采购的投放计划，按周期与浮动天数选定日期。"""
     schedule: dict[date, list[dict]] = defaultdict(list)
     if not workdays:
         return schedule
+    chooser = rng if rng is not None else random
 
     for category_id, category in categories_by_id.items():
         if category.get("purchase_mode") != "periodic":
@@ -163,22 +340,14 @@ async def _build_periodic_schedule(
             continue
         products = products_by_category.get(category_id, [])
         for product in products:
-            product_id = str(product.get("_id"))
-            last = await (
-                db["procurement_plans"]
-                .find({"items.product_id": product_id})
-                .sort("date", -1)
-                .limit(1)
-                .to_list(1)
-            )
-            if last:
+            last_date = last_purchases.get(str(product.get("_id")))
+            if last_date:
                 # 有历史采购记录时按周期顺延
-                last_date = date.fromisoformat(last[0]["date"])
-                jitter = random.randint(-int(category["float_days"]), int(category["float_days"]))
+                jitter = chooser.randint(-int(category["float_days"]), int(category["float_days"]))
                 target = last_date + timedelta(days=int(category["cycle_days"]) + jitter)
             else:
                 # 无历史记录时随机落到当月工作日
-                target = random.choice(workdays)
+                target = chooser.choice(workdays)
 
             if target.year != year or target.month != month:
                 continue
@@ -194,53 +363,45 @@ async def _build_periodic_schedule(
 
 def _build_item(
     product: dict,
-    category: dict,
+    profile: ProductProfile,
     precision: int,
-    quantity_override: Decimal | None = None,
+    steps_override: int | None = None,
     rng: random.Random | None = None,
 ) -> dict:
-    """构建单个采购明细，包含价格、数量与金额。"""
-    base_price = _normalize_base_price(_decimal(product["base_price"]))
+    """构建单个采购明细，内部以整数分与步进单位保存价格、数量与金额。"""
     raw_volatility = product.get("volatility")
     if raw_volatility is None:
         raise HTTPException(status_code=409, detail="产品缺少单价波动配置")
     volatility = _decimal(raw_volatility)
-    # 在波动范围内随机生成单价
+    # 在波动范围内随机生成单价，按分做 banker's rounding，最小 0.01
     chooser = rng if rng is not None else random
     price_factor = _decimal(1) + _decimal(chooser.uniform(float(-volatility), float(volatility)))
-    price = _normalize_volatility_price(base_price * price_factor)
+    price_cents = max(1, to_cents(cents_to_decimal(profile.base_cents) * price_factor, ROUND_HALF_EVEN))
 
     item_quantity_range = product.get("item_quantity_range")
     if not item_quantity_range:
         raise HTTPException(status_code=409, detail="产品缺少采购数量范围配置")
-    quantity_step = quantity_step_for_unit(product.get("unit", ""))
-    quantity_precision = quantity_precision_for_unit(product.get("unit", ""))
-    # 按步进生成采购数量
-    if quantity_override is not None:
-        quantity = quantity_override
+    # 按步进生成采购数量，无可行步数时按数量精度随机
+    if steps_override is not None:
+        steps = steps_override
+    elif profile.min_steps <= profile.max_steps:
+        steps = chooser.randint(profile.min_steps, profile.max_steps)
     else:
-        quantity = _random_quantity(
+        quantity = random_decimal(
             _decimal(item_quantity_range["min"]),
             _decimal(item_quantity_range["max"]),
-            quantity_step,
-            quantity_precision,
+            profile.quantity_precision,
+            rng=chooser,
         )
-    quantity = round_decimal(quantity, quantity_precision)
-    amount = round_decimal(price * quantity, precision)
+        steps = to_steps(quantity, profile.step)
+    amount_cents = line_amount_cents(price_cents, steps, profile.ratio, precision)
 
     # 若金额精度为 0，保证单品金额至少为 1 元，尽量在范围内提升数量
-    if precision == 0 and amount < 1 and price > 0:
-        needed_qty = _decimal(1) / price
-        if quantity_step > 0:
-            steps_needed = (needed_qty / quantity_step).to_integral_value(rounding="ROUND_CEILING")
-            needed_qty = steps_needed * quantity_step
-        else:
-            needed_qty = needed_qty.to_integral_value(rounding="ROUND_CEILING")
-        qty_max = _decimal(item_quantity_range.get("max", needed_qty))
-        if needed_qty > qty_max:
-            needed_qty = qty_max
-        quantity = round_decimal(needed_qty, quantity_precision)
-        amount = round_decimal(price * quantity, precision)
+    if precision == 0 and amount_cents < 100:
+        numerator, denominator = profile.ratio
+        needed_steps = -((-100 * denominator) // (price_cents * numerator))
+        steps = min(needed_steps, profile.max_steps)
+        amount_cents = line_amount_cents(price_cents, steps, profile.ratio, precision)
 
     return {
         "product_id": str(product["_id"]),
@@ -248,221 +409,314 @@ def _build_item(
         "category_name": product.get("category_name"),
         "name": product["name"],
         "unit": product.get("unit", ""),
-        "price": price,
-        "quantity": quantity,
-        "amount": amount,
-        "_qty_min": _decimal(item_quantity_range["min"]),
-        "_qty_max": _decimal(item_quantity_range["max"]),
-        "_qty_step": quantity_step,
+        "_price_cents": price_cents,
+        "_steps": steps,
+        "_amount_cents": amount_cents,
+        "_min_steps": profile.min_steps,
+        "_max_steps": profile.max_steps,
+        "_step": profile.step,
+        "_ratio": profile.ratio,
     }
 
 
-def _adjust_to_budget(items: list[dict], target: Decimal, precision: int) -> None:
-    """在不突破单品范围的前提下，尽量贴合目标预算。"""
+def _set_steps(item: dict, steps: int, precision: int) -> None:
+    """更新明细数量（步进单位）并同步金额（分）。"""
+    item["_steps"] = steps
+    item["_amount_cents"] = line_amount_cents(item["_price_cents"], steps, item["_ratio"], precision)
+
+
+def _greedy_adjust_to_budget(items: list[dict], target_cents: int, precision: int) -> None:
+    """多轮贪心调整数量，快速逼近目标预算（金额单位为分）。"""
     if not items:
         return
 
-    adjustables = [item for item in items if "_qty_min" in item]
+    adjustables = [item for item in items if "_max_steps" in item]
     if not adjustables:
         return
+    generation_metrics.count("greedy_adjustments")
 
     # 多轮贪心调整，直到无法再靠近目标
     for _ in range(5):
-        current_total = sum(item["amount"] for item in items)
-        delta = target - current_total
-        if abs(delta) < 0.01:
+        delta = target_cents - sum(item["_amount_cents"] for item in items)
+        if delta == 0:
             return
         # 增加预算时优先低价商品，减少预算时优先高价商品
-        adjustables.sort(key=lambda x: x["price"] if delta > 0 else -x["price"])
+        adjustables.sort(key=lambda x: x["_price_cents"] if delta > 0 else -x["_price_cents"])
         for item in adjustables:
-            if abs(delta) < 0.01:
+            if delta == 0:
                 break
-            price = item["price"]
-            step = item.get("_qty_step") or Decimal("0")
-            quantity_precision = _step_precision(step)
-            max_add = item["_qty_max"] - item["quantity"]
-            max_sub = item["quantity"] - item["_qty_min"]
+            numerator, denominator = item["_ratio"]
+            step_cost = item["_price_cents"] * numerator
+            # 连续意义上贴合差额所需的步数，按 ROUND_HALF_UP 取整
+            wanted = div_round_half_up(delta * denominator, step_cost)
             if delta > 0:
-                add_qty = min(delta / price, max_add)
-                if add_qty > 0:
-                    new_qty = item["quantity"] + add_qty
-                    if step > 0:
-                        new_qty = _step_quantize(new_qty, step)
-                    item["quantity"] = round_decimal(new_qty, quantity_precision)
-                    item["amount"] = round_decimal(item["quantity"] * price, precision)
-                    delta -= add_qty * price
+                change = min(wanted, item["_max_steps"] - item["_steps"])
             else:
-                sub_qty = min(-delta / price, max_sub)
-                if sub_qty > 0:
-                    new_qty = item["quantity"] - sub_qty
-                    if step > 0:
-                        new_qty = _step_quantize(new_qty, step)
-                    item["quantity"] = round_decimal(new_qty, quantity_precision)
-                    item["amount"] = round_decimal(item["quantity"] * price, precision)
-                    delta += sub_qty * price
+                change = max(wanted, item["_min_steps"] - item["_steps"])
+            if (change > 0) != (delta > 0) or change == 0:
+                continue
+            before = item["_amount_cents"]
+            _set_steps(item, item["_steps"] + change, precision)
+            delta -= item["_amount_cents"] - before
 
     # 最后再微调一个商品，尽量贴合 target
-    current_total = sum(item["amount"] for item in items)
-    delta = target - current_total
-    if abs(delta) >= 0.01:
+    delta = target_cents - sum(item["_amount_cents"] for item in items)
+    if delta != 0:
         for item in adjustables:
-            price = item["price"]
-            new_quantity = item["quantity"] + (delta / price)
-            step = item.get("_qty_step") or Decimal("0")
-            if step > 0:
-                new_quantity = _step_quantize(new_quantity, step)
-            new_quantity = round_decimal(new_quantity, _step_precision(step))
-            if item["_qty_min"] <= new_quantity <= item["_qty_max"]:
-                item["quantity"] = new_quantity
-                item["amount"] = round_decimal(new_quantity * price, precision)
+            numerator, denominator = item["_ratio"]
+            new_steps = item["_steps"] + div_round_half_up(delta * denominator, item["_price_cents"] * numerator)
+            if item["_min_steps"] <= new_steps <= item["_max_steps"]:
+                _set_steps(item, new_steps, precision)
                 break
 
 
-def _step_precision(step: Decimal) -> int:
-    """根据步进值计算数量保留小数位数。"""
-    text = format(step, "f")
-    if "." not in text:
-        return 0
-    return len(text.rstrip("0").split(".")[1])
+def _adjust_to_budget(
+    items: list[dict],
+    target_cents: int,
+    precision: int,
+    rng: random.Random | None = None,
+    time_limit: float | None = None,
+) -> None:
+    """在不突破单品范围的前提下，于步进格上求解最接近目标预算的数量组合。
+
+    先贪心逼近，贪心已命中目标时直接返回；否则先在贪心结果附近的小窗口内精确求解，
+    仍未命中时再扩大到完整区间（候选步数总量较小时）或大窗口。
+    各轮求解共用 config.solver_work_limit 工作量上限，结果与机器负载无关；
+    time_limit 为额外的时间兜底（秒），仅在不要求可复现时传入。超出上限则保留当前最优结果。
+    """
+    adjustables = [
+        item for item in items
+        if "_max_steps" in item and item["_min_steps"] <= item["_max_steps"]
+    ]
+    if not adjustables:
+        return
+    generation_metrics.count("adjust_passes")
+    _greedy_adjust_to_budget(items, target_cents, precision)
+    error = abs(target_cents - sum(item["_amount_cents"] for item in items))
+    if error == 0:
+        return
+
+    adjustable_ids = {id(item) for item in adjustables}
+    fixed_cents = sum(item["_amount_cents"] for item in items if id(item) not in adjustable_ids)
+    full_options = sum(item["_max_steps"] - item["_min_steps"] + 1 for item in adjustables)
+    work_left = config.solver_work_limit
+    deadline = perf_counter() + time_limit if time_limit is not None else None
+    for radius in (SOLVER_NARROW_WINDOW_STEPS, None if full_options <= SOLVER_MAX_OPTIONS else SOLVER_WINDOW_STEPS):
+        if radius is None:
+            ranges = [(item["_min_steps"], item["_max_steps"]) for item in adjustables]
+        else:
+            ranges = [
+                (max(item["_min_steps"], item["_steps"] - radius), min(item["_max_steps"], item["_steps"] + radius))
+                for item in adjustables
+            ]
+        options = [
+            [line_amount_cents(item["_price_cents"], steps, item["_ratio"], precision) for steps in range(low, high + 1)]
+            for item, (low, high) in zip(adjustables, ranges)
+        ]
+        goal = target_cents - fixed_cents
+        result = solve_closest(options, goal, deadline=deadline, rng=rng, max_work=work_left)
+        if result is None:
+            # 超出工作量或时间上限：保留当前最优结果
+            generation_metrics.count("solver_timeouts")
+            return
+        work_left -= solver_work(options, goal)
+        chosen, total = result
+        if abs(target_cents - fixed_cents - total) < error:
+            for item, (low, _high), option in zip(adjustables, ranges, chosen):
+                _set_steps(item, low + option, precision)
+            error = abs(target_cents - fixed_cents - total)
+        if error == 0:
+            return
+
+
+def summarize_budget_fit(budget_errors: list[Decimal | None]) -> dict:
+    """汇总每日实际金额与目标预算的偏差，用于观察预算命中情况。"""
+    errors = [abs(error) for error in budget_errors if error is not None]
+    if not errors:
+        return {"days": 0, "exact_days": 0, "mean_abs_error": "0.00", "max_abs_error": "0.00"}
+    mean_error = (sum(errors, Decimal("0")) / len(errors)).quantize(Decimal("0.01"))
+    return {
+        "days": len(errors),
+        "exact_days": sum(1 for error in errors if error == 0),
+        "mean_abs_error": str(mean_error),
+        "max_abs_error": str(max(errors)),
+    }
+
+
+def _items_total_cents(items: list[dict]) -> int:
+    """汇总明细金额（分）。"""
+    return sum(item["_amount_cents"] for item in items)
 
 
 def _cleanup_items(items: list[dict]) -> list[dict]:
-    """移除内部计算字段，输出对外可用的明细结构。"""
+    """移除内部计算字段，并在输出边界转换为 Decimal 明细结构。"""
     cleaned = []
     for item in items:
-        item.pop("_qty_min", None)
-        item.pop("_qty_max", None)
-        item.pop("_qty_step", None)
+        price_cents = item.pop("_price_cents")
+        steps = item.pop("_steps")
+        amount_cents = item.pop("_amount_cents")
+        step = item.pop("_step")
+        for key in ("_min_steps", "_max_steps", "_ratio"):
+            item.pop(key, None)
+        item["price"] = cents_to_decimal(price_cents)
+        item["quantity"] = steps_to_decimal(steps, step)
+        item["amount"] = cents_to_decimal(amount_cents)
         cleaned.append(item)
     return cleaned
 
 
-def _month_range(start_year: int, start_month: int, end_year: int, end_month: int) -> list[tuple[int, int]]:
-    """生成起止年月范围内的所有年月列表。"""
-    months: list[tuple[int, int]] = []
-    current = date(start_year, start_month, 1)
-    end = date(end_year, end_month, 1)
-    while current <= end:
-        months.append((current.year, current.month))
-        if current.month == 12:
-            current = date(current.year + 1, 1, 1)
-        else:
-            current = date(current.year, current.month + 1, 1)
-    return months
-
-
-def _rng_for_day(day: date) -> random.Random:
-    """基于日期生成稳定随机源。"""
-    seed = int(day.strftime("%Y%m%d"))
-    return random.Random(seed)
-
-
-def _product_base_price(product: dict) -> Decimal:
-    """获取产品基准单价。"""
-    return _decimal(product.get("base_price", 0))
+def _rng_for_day(day: date, seed: int | None = None) -> random.Random:
+    """基于日期（及可选的生成种子）生成稳定随机源。"""
+    if seed is None:
+        return random.Random(int(day.strftime("%Y%m%d")))
+    return random.Random(derive_seed(seed, "day", day.isoformat()))
 
 
-def _select_products(
-    candidates: list[dict],
-    desired_count: int,
-    rng: random.Random,
-) -> list[dict]:
-    """在候选集中尽量随机选品。"""
-    if desired_count <= 0 or not candidates:
-        return []
-    if len(candidates) <= desired_count:
-        return candidates
-    return rng.sample(candidates, desired_count)
+def _rng_for_month(seed: int | None, stream: str, year: int, month: int) -> random.Random | None:
+    """按种子派生指定用途的月度随机流；未指定种子时沿用全局随机源。"""
+    if seed is None:
+        return None
+    return random.Random(derive_seed(seed, stream, year, month))
 
 
-def _min_cost_total(products: list[dict], precision: int) -> Decimal:
-    """计算一组产品的最低成本合计。"""
-    total = Decimal("0")
-    for product in products:
-        total += _estimate_min_cost(product, precision)
-    return total
+def _min_cost_total(products: list[dict], profiles: dict[str, ProductProfile]) -> int:
+    """计算一组产品的最低成本合计（分）。"""
+    return sum(profiles[str(product["_id"])].min_cost_cents for product in products)
 
 
 def _try_lower_cost_swap(
     chosen: list[dict],
-    candidates: list[dict],
+    index: CandidateIndex,
+    bitmap: bytearray,
     rng: random.Random,
-    precision: int,
-    budget_max: Decimal,
+    profiles: dict[str, ProductProfile],
+    budget_max_cents: int,
     max_tries: int = MAX_MIN_COST_SWAP_TRIES,
-) -> tuple[list[dict], Decimal]:
+) -> tuple[list[dict], int]:
     """若最低成本超预算，尝试替换高价产品为更低价产品以降低最低成本。"""
     if not chosen or max_tries <= 0:
-        return chosen, _min_cost_total(chosen, precision)
+        return chosen, _min_cost_total(chosen, profiles)
+
+    def base_cents(product: dict) -> int:
+        """读取产品画像中的基础单价（分）。"""
+        return profiles[str(product["_id"])].base_cents
 
-    chosen_ids = {str(item.get("_id")) for item in chosen}
     best = chosen
-    best_cost = _min_cost_total(chosen, precision)
-
-    for _ in range(max_tries):
-        priciest = max(chosen, key=_product_base_price)
-        priciest_price = _product_base_price(priciest)
-        lower_pool = [
-            item
-            for item in candidates
-            if str(item.get("_id")) not in chosen_ids
-            and _product_base_price(item) < priciest_price
-        ]
-        if not lower_pool:
-            break
-        replacement = rng.choice(lower_pool)
-        new_chosen = [item for item in chosen if item is not priciest]
-        new_chosen.append(replacement)
-        new_cost = _min_cost_total(new_chosen, precision)
-        if new_cost < best_cost:
-            best = new_chosen
-            best_cost = new_cost
-        chosen = new_chosen
-        chosen_ids = {str(item.get("_id")) for item in chosen}
-        if new_cost <= budget_max:
-            return chosen, new_cost
+    best_cost = _min_cost_total(chosen, profiles)
+    # 已选产品临时计入位图，结束时恢复，保证重复调用互不影响
+    for item in chosen:
+        index.mark(bitmap, item, True)
+
+    try:
+        for _ in range(max_tries):
+            generation_metrics.count("swaps_tried")
+            priciest = max(chosen, key=base_cents)
+            replacement = index.pick_cheaper(base_cents(priciest), bitmap, rng)
+            if replacement is None:
+                break
+            new_chosen = [item for item in chosen if item is not priciest]
+            new_chosen.append(replacement)
+            index.mark(bitmap, priciest, False)
+            index.mark(bitmap, replacement, True)
+            new_cost = _min_cost_total(new_chosen, profiles)
+            if new_cost < best_cost:
+                best = new_chosen
+                best_cost = new_cost
+            chosen = new_chosen
+            if new_cost <= budget_max_cents:
+                return chosen, new_cost
+    finally:
+        for item in chosen:
+            index.mark(bitmap, item, False)
 
     return best, best_cost
 
 
 def _best_within_budget(
-    candidates: list[dict],
+    index: CandidateIndex,
+    bitmap: bytearray,
     desired_count: int,
     rng: random.Random,
-    precision: int,
-    budget_max: Decimal,
+    profiles: dict[str, ProductProfile],
+    budget_max_cents: int,
     max_tries: int = MAX_DAILY_BUDGET_RETRY,
-) -> tuple[list[dict], Decimal]:
+) -> tuple[list[dict], int]:
     """重复随机选品，尽量找到预算内的最低成本组合。"""
     best = []
-    best_cost = Decimal("0")
+    best_cost = 0
     for idx in range(max_tries):
-        chosen = _select_products(candidates, desired_count, rng)
+        if idx:
+            generation_metrics.count("selection_retries")
+        chosen = index.sample(desired_count, bitmap, rng)
         chosen, min_cost_total = _try_lower_cost_swap(
             chosen,
-            candidates,
+            index,
+            bitmap,
             rng,
-            precision,
-            budget_max,
+            profiles,
+            budget_max_cents,
             MAX_MIN_COST_SWAP_TRIES,
         )
         if idx == 0 or min_cost_total < best_cost:
             best = chosen
             best_cost = min_cost_total
-        if min_cost_total <= budget_max:
+        if min_cost_total <= budget_max_cents:
             return chosen, min_cost_total
     return best, best_cost
 
 
-async def generate_plans(
+@dataclass
+class GenerationContext:
+    """一次生成所需的只读目录快照，可整体序列化交给子进程。"""
+    categories_by_id: dict[str, dict]
+    products_by_category: dict[str, list[dict]]
+    profiles: dict[str, ProductProfile]
+    candidate_indexes: dict[str, CandidateIndex]
+    daily_range: BudgetRange
+    precision: int
+    budget_min_cents: int
+    budget_max_cents: int
+    # 目录与设置版本，用于生成结果缓存键
+    catalog_version: str = ""
+    settings_version: str = ""
+    # 当日已用位图长度：各每日品类索引区段的总和
+    bitmap_size: int = 0
+
+
+@dataclass
+class DayInput:
+    """单个工作日的生成输入：当月序号、目标预算、已选定期产品与当日随机源。"""
+    index: int
+    day: date
+    target_cents: int
+    periodic_products: list[dict]
+    rng: random.Random
+
+
+@dataclass
+class MonthTask:
+    """单月生成任务，预算、定期投放与台账均已在串行预处理中确定。"""
+    year: int
+    month: int
+    workdays: list[date]
+    days: list[DayInput]
+    creator_id: str | None = None
+    seed: int | None = None
+
+
+# 常驻生成进程池及其子进程数，由应用生命周期创建与关闭
+_generation_pool: ProcessPoolExecutor | None = None
+_generation_pool_workers = 1
+# 父进程：上下文键 -> 序列化后的目录快照；子进程：上下文键 -> 已反序列化的目录快照
+_context_payloads: OrderedDict[tuple, bytes] = OrderedDict()
+_worker_contexts: OrderedDict[tuple, GenerationContext] = OrderedDict()
+
+
+async def _load_generation_context(
     db,
-    start_year: int,
-    start_month: int,
-    end_year: int,
-    end_month: int,
-    creator_id: str | None = None,
-) -> tuple[list[dict], list[dict]]:
-    """生成指定时间范围内的采购计划列表。"""
+    daily_range: BudgetRange | None = None,
+) -> GenerationContext:
+    """加载设置并取用目录快照，构建本次生成共用的上下文；指定 daily_range 时代替已保存的预算区间。"""
     settings_doc = await db["settings"].find_one({"key": "global"})
     settings = _load_settings(settings_doc)
 
@@ -471,223 +725,653 @@ async def generate_plans(
     if gap["categories_without_rules"]:
         raise HTTPException(status_code=409, detail="存在未配置规则的品类")
 
-    categories = await db["categories"].find({"is_active": True}).to_list(1000)
-    products = await db["products"].find({"is_deleted": False}).to_list(10000)
-    if not products:
+    snapshot = await get_catalog_snapshot(db)
+    if not snapshot.products:
         raise HTTPException(status_code=409, detail="产品库为空")
+    categories_by_id = snapshot.active_categories_by_id
+    products_by_category = snapshot.products_by_category
 
-    categories_by_id = {str(doc["_id"]): doc for doc in categories}
-    category_name_map = {doc.get("name"): str(doc.get("_id")) for doc in categories if doc.get("name")}
-    products_by_category: dict[str, list[dict]] = defaultdict(list)
-    for product in products:
-        category_id = product.get("category_id")
-        if not category_id:
-            legacy_name = product.get("category_name") or product.get("category")
-            category_id = category_name_map.get(legacy_name)
-            if category_id:
-                product["category_id"] = category_id
-                product["category_name"] = legacy_name
-        if category_id:
-            products_by_category[category_id].append(product)
-
-    daily_range = _parse_budget_range(settings.get("daily_budget_range"))
+    if daily_range is None:
+        daily_range = _parse_budget_range(settings.get("daily_budget_range"))
     if daily_range is None:
         raise HTTPException(status_code=409, detail="未配置预算区间")
     if daily_range.min > daily_range.max:
         raise HTTPException(status_code=409, detail="预算区间无效")
 
     precision = DEFAULT_MONEY_PRECISION
-    plans: list[dict] = []
-    warnings: list[dict] = []
-
-    for year, month in _month_range(start_year, start_month, end_year, end_month):
-        workdays = await get_workdays(year, month)
-        if not workdays:
+    profiles = snapshot.profiles
+    candidate_indexes: dict[str, CandidateIndex] = {}
+    bitmap_size = 0
+    for category_id, category in categories_by_id.items():
+        if category.get("purchase_mode") != "daily":
             continue
+        index = CandidateIndex(products_by_category.get(category_id, []), profiles, offset=bitmap_size)
+        candidate_indexes[category_id] = index
+        bitmap_size += len(index)
+
+    return GenerationContext(
+        categories_by_id=categories_by_id,
+        products_by_category=products_by_category,
+        profiles=profiles,
+        candidate_indexes=candidate_indexes,
+        daily_range=daily_range,
+        precision=precision,
+        budget_min_cents=to_cents(daily_range.min),
+        budget_max_cents=to_cents(daily_range.max),
+        catalog_version=snapshot.version,
+        settings_version=fingerprint(settings),
+        bitmap_size=bitmap_size,
+    )
+
+
+async def load_generation_context(
+    db,
+    budget_min: Decimal | None = None,
+    budget_max: Decimal | None = None,
+) -> GenerationContext:
+    """加载生成上下文，可临时指定预算区间（只给一端时另一端取已保存设置），不修改已保存的设置。"""
+    daily_range = None
+    if budget_min is not None and budget_max is not None:
+        # 完整指定预算区间时无需已保存的设置
+        daily_range = BudgetRange(min=budget_min, max=budget_max)
+    elif budget_min is not None or budget_max is not None:
+        settings = _load_settings(await db["settings"].find_one({"key": "global"}))
+        saved = _parse_budget_range(settings["daily_budget_range"])
+        if saved is None:
+            raise HTTPException(status_code=409, detail="未配置预算区间")
+        daily_range = BudgetRange(
+            min=budget_min if budget_min is not None else saved.min,
+            max=budget_max if budget_max is not None else saved.max,
+        )
+    if daily_range is not None and daily_range.min > daily_range.max:
+        raise HTTPException(status_code=400, detail="预算区间无效")
+    return await _load_generation_context(db, daily_range)
+
+
+def plan_simulation_batch(context: GenerationContext, days: list[date], seed: int, batch: int) -> MonthTask:
+    """构建只含每日品类的模拟批次任务：预算与每日随机源均由种子派生，批次序号区分各批的随机流。"""
+    budgets = _allocate_daily_budgets(
+        len(days),
+        context.daily_range,
+        context.precision,
+        rng=random.Random(derive_seed(seed, "simulation", "budgets", batch)),
+    )
+    day_inputs = [
+        DayInput(idx, day, to_cents(budgets[idx]), [], _rng_for_day(day, seed))
+        for idx, day in enumerate(days)
+    ]
+    # 批次序号作为月份参与派生随机源，各批次抽样互相独立
+    return MonthTask(days[0].year, batch + 1, days, day_inputs, seed=seed)
 
-        budgets = _allocate_daily_budgets(len(workdays), daily_range, precision)
-        periodic_schedule = await _build_periodic_schedule(
-            db,
-            products_by_category,
-            categories_by_id,
+
+def _plan_month(
+    context: GenerationContext,
+    ledger: dict[str, date],
+    periodic_ids: set[str],
+    workdays: list[date],
+    year: int,
+    month: int,
+    creator_id: str | None = None,
+    seed: int | None = None,
+) -> MonthTask:
+    """串行确定当月预算、定期投放与定期选品，并推进最近采购台账。"""
+    budgets = _allocate_daily_budgets(
+        len(workdays),
+        context.daily_range,
+        context.precision,
+        rng=_rng_for_month(seed, "budgets", year, month),
+    )
+    with generation_metrics.span("periodic_schedule"):
+        periodic_schedule = _build_periodic_schedule(
+            ledger,
+            context.products_by_category,
+            context.categories_by_id,
             workdays,
             year,
             month,
+            rng=_rng_for_month(seed, "periodic", year, month),
         )
 
-        for idx, day in enumerate(workdays):
-            items: list[dict] = []
-            daily_items: list[dict] = []
-            used_products: set[str] = set()
-            target_budget = budgets[idx]
-            rng = _rng_for_day(day)
-            day_warnings: list[dict] = []
-            daily_category_limits: dict[str, int] = {}
-            daily_category_candidates: dict[str, list[dict]] = {}
-            daily_category_selected: dict[str, list[dict]] = defaultdict(list)
-
-            periodic_products = periodic_schedule.get(day, [])
-            if periodic_products:
-                periodic_by_category: dict[str, list[dict]] = defaultdict(list)
-                for product in periodic_products:
-                    category_id = product.get("category_id")
-                    if not category_id:
-                        continue
-                    periodic_by_category[category_id].append(product)
-
-                for category_id, products in periodic_by_category.items():
-                    category = categories_by_id.get(category_id)
-                    if not category:
-                        continue
-                    count = _pick_items_count(category.get("items_count_range"), len(products))
-                    count = min(count, len(products))
-                    chosen = products if count >= len(products) else rng.sample(products, count)
-                    for product in chosen:
-                        item = _build_item(product, category, precision, rng=rng)
-                        used_products.add(item["product_id"])
-                        items.append(item)
-
-            # 生成每日采购品类的明细
-            for category_id, category in categories_by_id.items():
-                if category.get("purchase_mode") != "daily":
-                    continue
-                candidates = [
-                    p for p in products_by_category.get(category_id, []) if str(p["_id"]) not in used_products
-                ]
-                if not candidates:
-                    warning = {
-                        "date": day.isoformat(),
-                        "category_id": category_id,
-                        "category_name": category.get("name"),
-                        "reason": "品类无可用产品",
-                    }
-                    warnings.append(warning)
-                    day_warnings.append(warning)
-                    continue
-                count_range = category.get("items_count_range") or {}
-                min_count = int(count_range.get("min", 1))
-                max_count = int(count_range.get("max", min_count))
-                available = len(candidates)
-                if available < min_count:
-                    warning = {
-                        "date": day.isoformat(),
-                        "category_id": category_id,
-                        "category_name": category.get("name"),
-                        "reason": "品类产品数量不足以满足下限",
-                        "available": available,
-                        "min_required": min_count,
-                    }
-                    warnings.append(warning)
-                    day_warnings.append(warning)
-                desired_count = _pick_items_count(category.get("items_count_range"), 1)
-                max_count = min(max(max_count, min_count), available)
-                desired_count = min(max(min_count, desired_count), max_count)
-                chosen, min_cost_total = _best_within_budget(
-                    candidates,
-                    desired_count,
-                    rng,
-                    precision,
-                    daily_range.max,
-                    MAX_DAILY_BUDGET_RETRY,
-                )
-                daily_category_limits[category_id] = max_count
-                daily_category_candidates[category_id] = candidates
-                if min_cost_total > daily_range.max:
-                    warning = {
-                        "date": day.isoformat(),
-                        "category_id": category_id,
-                        "category_name": category.get("name"),
-                        "reason": "最低成本高于预算上限",
-                        "min_cost": str(round_decimal(min_cost_total, precision)),
-                        "budget_max": str(daily_range.max),
-                    }
-                    warnings.append(warning)
-                    day_warnings.append(warning)
-                for product in chosen:
-                    item_quantity_range = product.get("item_quantity_range") or {"min": 0}
-                    quantity_step = quantity_step_for_unit(product.get("unit", ""))
-                    min_qty = _min_quantity_for_product(item_quantity_range, quantity_step)
-                    item = _build_item(product, category, precision, quantity_override=min_qty, rng=rng)
-                    used_products.add(item["product_id"])
-                    items.append(item)
-                    daily_items.append(item)
-                    daily_category_selected[category_id].append(product)
+    days: list[DayInput] = []
+    for idx, day in enumerate(workdays):
+        rng = _rng_for_day(day, seed)
+        periodic_products: list[dict] = []
+        periodic_by_category: dict[str, list[dict]] = defaultdict(list)
+        for product in periodic_schedule.get(day, []):
+            category_id = product.get("category_id")
+            if not category_id:
+                continue
+            periodic_by_category[category_id].append(product)
 
-            if not items:
+        for category_id, products in periodic_by_category.items():
+            category = context.categories_by_id.get(category_id)
+            if not category:
                 continue
+            count = _pick_items_count(category.get("items_count_range"), len(products), rng)
+            count = min(count, len(products))
+            chosen = products if count >= len(products) else rng.sample(products, count)
+            periodic_products.extend(chosen)
+
+        _record_periodic_purchases(
+            ledger,
+            periodic_ids,
+            [{"product_id": str(product["_id"])} for product in periodic_products],
+            day,
+        )
+        days.append(DayInput(idx, day, to_cents(budgets[idx]), periodic_products, rng))
 
-            if daily_items:
-                daily_total = round_decimal(
-                    sum((item["amount"] for item in daily_items), Decimal("0")),
-                    precision,
-                )
-                if daily_total < daily_range.min:
-                    for _ in range(MAX_DAILY_MIN_ADD_TRIES):
-                        if daily_total >= daily_range.min:
-                            break
-                        eligible_categories = [
-                            category_id
-                            for category_id, max_count in daily_category_limits.items()
-                            if len(daily_category_selected[category_id]) < max_count
-                        ]
-                        if not eligible_categories:
-                            break
-                        category_id = rng.choice(eligible_categories)
-                        candidates = daily_category_candidates.get(category_id, [])
-                        remaining = [
-                            p for p in candidates if str(p["_id"]) not in used_products
-                        ]
-                        if not remaining:
-                            daily_category_limits[category_id] = len(daily_category_selected[category_id])
-                            continue
-                        product = rng.choice(remaining)
-                        category = categories_by_id.get(category_id)
-                        if not category:
-                            continue
-                        item_quantity_range = product.get("item_quantity_range") or {"min": 0}
-                        quantity_step = quantity_step_for_unit(product.get("unit", ""))
-                        min_qty = _min_quantity_for_product(item_quantity_range, quantity_step)
-                        item = _build_item(product, category, precision, quantity_override=min_qty, rng=rng)
-                        used_products.add(item["product_id"])
-                        items.append(item)
-                        daily_items.append(item)
-                        daily_category_selected[category_id].append(product)
-                        daily_total = round_decimal(
-                            sum((itm["amount"] for itm in daily_items), Decimal("0")),
-                            precision,
-                        )
-                _adjust_to_budget(daily_items, target_budget, precision)
-
-            total_amount = round_decimal(sum((item["amount"] for item in items), Decimal("0")), precision)
-            daily_total = round_decimal(sum((item["amount"] for item in daily_items), Decimal("0")), precision)
-            if daily_total > daily_range.max:
+    return MonthTask(year, month, workdays, days, creator_id, seed)
+
+
+def _build_month(context: GenerationContext, task: MonthTask) -> tuple[list[dict], list[dict], list[Decimal]]:
+    """生成单月每日计划；仅依赖目录快照与任务输入，可在子进程中执行。
+
+    第三项为各有明细日期的实际金额与目标预算偏差，仅作生成诊断，不写入计划文档。
+    """
+    categories_by_id = context.categories_by_id
+    profiles = context.profiles
+    daily_range = context.daily_range
+    precision = context.precision
+    budget_min_cents = context.budget_min_cents
+    budget_max_cents = context.budget_max_cents
+    year, month = task.year, task.month
+
+    plans: list[dict] = []
+    warnings: list[dict] = []
+    budget_errors: list[Decimal] = []
+
+    for day_input in task.days:
+        day = day_input.day
+        rng = day_input.rng
+        target_cents = day_input.target_cents
+        items: list[dict] = []
+        daily_items: list[dict] = []
+        # 当日已用产品位图：各每日品类占用其中一段，选品后原地标记
+        used_bitmap = bytearray(context.bitmap_size)
+        day_warnings: list[dict] = []
+        daily_category_limits: dict[str, int] = {}
+        daily_category_selected: dict[str, list[dict]] = defaultdict(list)
+
+        def make_item(product: dict, steps_override: int | None = None) -> dict:
+            """使用当日随机源构建单个明细。"""
+            generation_metrics.count("items_built")
+            profile = profiles[str(product["_id"])]
+            return _build_item(product, profile, precision, steps_override=steps_override, rng=rng)
+
+        for product in day_input.periodic_products:
+            item = make_item(product)
+            items.append(item)
+
+        # 生成每日采购品类的明细
+        for category_id, category in categories_by_id.items():
+            if category.get("purchase_mode") != "daily":
+                continue
+            candidate_index = context.candidate_indexes[category_id]
+            available = candidate_index.free_count(used_bitmap)
+            if not available:
                 warning = {
                     "date": day.isoformat(),
-                    "reason": "日采总额高于预算上限",
-                    "total_amount": str(daily_total),
-                    "budget_max": str(daily_range.max),
+                    "category_id": category_id,
+                    "category_name": category.get("name"),
+                    "reason": "品类无可用产品",
                 }
                 warnings.append(warning)
                 day_warnings.append(warning)
-            if daily_total < daily_range.min:
+                continue
+            count_range = category.get("items_count_range") or {}
+            min_count = int(count_range.get("min", 1))
+            max_count = int(count_range.get("max", min_count))
+            if available < min_count:
                 warning = {
                     "date": day.isoformat(),
-                    "reason": "日采总额低于预算下限",
-                    "total_amount": str(daily_total),
-                    "budget_min": str(daily_range.min),
+                    "category_id": category_id,
+                    "category_name": category.get("name"),
+                    "reason": "品类产品数量不足以满足下限",
+                    "available": available,
+                    "min_required": min_count,
                 }
                 warnings.append(warning)
                 day_warnings.append(warning)
-            plan = {
+            desired_count = _pick_items_count(category.get("items_count_range"), 1, rng)
+            max_count = min(max(max_count, min_count), available)
+            desired_count = min(max(min_count, desired_count), max_count)
+            with generation_metrics.span("select"):
+                chosen, min_cost_total = _best_within_budget(
+                    candidate_index,
+                    used_bitmap,
+                    desired_count,
+                    rng,
+                    profiles,
+                    budget_max_cents,
+                    MAX_DAILY_BUDGET_RETRY,
+                )
+            daily_category_limits[category_id] = max_count
+            if min_cost_total > budget_max_cents:
+                warning = {
+                    "date": day.isoformat(),
+                    "category_id": category_id,
+                    "category_name": category.get("name"),
+                    "reason": "最低成本高于预算上限",
+                    "min_cost": str(cents_to_decimal(min_cost_total)),
+                    "budget_max": str(daily_range.max),
+                }
+                warnings.append(warning)
+                day_warnings.append(warning)
+            for product in chosen:
+                item = make_item(product, steps_override=profiles[str(product["_id"])].min_steps)
+                candidate_index.mark(used_bitmap, product, True)
+                items.append(item)
+                daily_items.append(item)
+                daily_category_selected[category_id].append(product)
+
+        if not items:
+            continue
+
+        if daily_items:
+            daily_total_cents = _items_total_cents(daily_items)
+            if daily_total_cents < budget_min_cents:
+                for _ in range(MAX_DAILY_MIN_ADD_TRIES):
+                    if daily_total_cents >= budget_min_cents:
+                        break
+                    eligible_categories = [
+                        category_id
+                        for category_id, max_count in daily_category_limits.items()
+                        if len(daily_category_selected[category_id]) < max_count
+                    ]
+                    if not eligible_categories:
+                        break
+                    category_id = rng.choice(eligible_categories)
+                    candidate_index = context.candidate_indexes[category_id]
+                    remaining = candidate_index.sample(1, used_bitmap, rng)
+                    if not remaining:
+                        daily_category_limits[category_id] = len(daily_category_selected[category_id])
+                        continue
+                    product = remaining[0]
+                    item = make_item(product, steps_override=profiles[str(product["_id"])].min_steps)
+                    generation_metrics.count("min_budget_additions")
+                    candidate_index.mark(used_bitmap, product, True)
+                    items.append(item)
+                    daily_items.append(item)
+                    daily_category_selected[category_id].append(product)
+                    daily_total_cents = _items_total_cents(daily_items)
+            with generation_metrics.span("adjust"):
+                # 指定种子时只受确定性的工作量上限约束，未指定时再加时间兜底
+                time_limit = config.solver_time_limit_seconds if task.seed is None else None
+                _adjust_to_budget(daily_items, target_cents, precision, rng=rng, time_limit=time_limit)
+
+        total_amount = cents_to_decimal(_items_total_cents(items))
+        daily_total = cents_to_decimal(_items_total_cents(daily_items))
+        if daily_total > daily_range.max:
+            warning = {
                 "date": day.isoformat(),
-                "year_month": f"{year}-{month:02d}",
-                "total_amount": total_amount,
-                "items": _cleanup_items(items),
-                "warnings": day_warnings,
-                "creator_id": creator_id,
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow(),
+                "reason": "日采总额高于预算上限",
+                "total_amount": str(daily_total),
+                "budget_max": str(daily_range.max),
             }
-            plans.append(plan)
+            warnings.append(warning)
+            day_warnings.append(warning)
+        if daily_total < daily_range.min:
+            warning = {
+                "date": day.isoformat(),
+                "reason": "日采总额低于预算下限",
+                "total_amount": str(daily_total),
+                "budget_min": str(daily_range.min),
+            }
+            warnings.append(warning)
+            day_warnings.append(warning)
+        if daily_items:
+            # 记录实际金额与目标预算的偏差，便于统计预算命中率
+            budget_errors.append(cents_to_decimal(_items_total_cents(daily_items) - target_cents))
+        plan = {
+            "date": day.isoformat(),
+            "year_month": f"{year}-{month:02d}",
+            "total_amount": total_amount,
+            "items": _cleanup_items(items),
+            "warnings": day_warnings,
+            "creator_id": task.creator_id,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow(),
+        }
+        plans.append(plan)
+
+    generation_metrics.count("days_built", len(plans))
+    return plans, warnings, budget_errors
+
+
+class _WorkerHTTPError(Exception):
+    """子进程中的业务错误；HTTPException 无法跨进程反序列化，需转换后回传。"""
+
+    def __init__(self, status_code: int, detail) -> None:
+        super().__init__(status_code, detail)
+
+
+def _new_generation_pool(max_workers: int) -> ProcessPoolExecutor:
+    """创建生成进程池；使用 spawn 启动子进程，避免 fork 继承数据库驱动的后台线程。"""
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def _warm_worker() -> None:
+    """空任务：促使进程池提前启动子进程并完成模块导入。"""
+
 
+async def open_generation_pool(max_workers: int) -> None:
+    """创建进程级常驻生成进程池并预先启动子进程，在多次请求间复用（应用启动时调用）。"""
+    global _generation_pool, _generation_pool_workers
+    if _generation_pool is None:
+        _generation_pool_workers = max_workers
+        _generation_pool = _new_generation_pool(max_workers)
+        # 子进程启动与导入耗时远高于单月生成，放在启动阶段而非首个请求中
+        for _ in range(max_workers):
+            _generation_pool.submit(_warm_worker)
+
+
+async def close_generation_pool() -> None:
+    """关闭常驻生成进程池（应用关闭时调用），在线程中等待子进程退出，不阻塞事件循环。"""
+    global _generation_pool
+    pool, _generation_pool = _generation_pool, None
+    _context_payloads.clear()
+    if pool is not None:
+        await asyncio.to_thread(pool.shutdown, wait=True, cancel_futures=True)
+
+
+@asynccontextmanager
+async def _borrow_generation_pool(workers: int) -> AsyncIterator[ProcessPoolExecutor]:
+    """优先使用常驻进程池；未启动常驻进程池（如脚本中）时为本次生成临时创建。"""
+    if _generation_pool is not None:
+        yield _generation_pool
+        return
+    pool = _new_generation_pool(workers)
+    try:
+        yield pool
+    finally:
+        # 不在事件循环上阻塞等待子进程退出
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _context_key(context: GenerationContext) -> tuple:
+    """目录快照的缓存键：目录版本、设置版本与本次使用的预算区间唯一决定上下文内容。"""
+    return (context.catalog_version, context.settings_version, context.budget_min_cents, context.budget_max_cents)
+
+
+def _lru_put(cache: OrderedDict, key: tuple, value) -> None:
+    """写入按最近使用排序的小容量缓存。"""
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > WORKER_CONTEXT_CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+async def _context_payload(context: GenerationContext) -> tuple[tuple, bytes]:
+    """返回上下文键与序列化后的目录快照；同一版本只序列化一次，且在线程中执行。"""
+    key = _context_key(context)
+    payload = _context_payloads.get(key)
+    if payload is None:
+        payload = await asyncio.to_thread(pickle.dumps, context, pickle.HIGHEST_PROTOCOL)
+        _lru_put(_context_payloads, key, payload)
+    else:
+        _context_payloads.move_to_end(key)
+    return key, payload
+
+
+def _build_month_in_worker(
+    context_key: tuple, payload: bytes, task: MonthTask
+) -> tuple[list[dict], list[dict], list[Decimal], dict]:
+    """子进程入口：按键复用已反序列化的目录快照生成单月计划，并回传本月的耗时与计数记录。"""
+    context = _worker_contexts.get(context_key)
+    if context is None:
+        context = pickle.loads(payload)
+    _lru_put(_worker_contexts, context_key, context)
+    profile = generation_metrics.GenerationProfile()
+    try:
+        with generation_metrics.recording(profile), generation_metrics.span("build_month"):
+            plans, warnings, budget_errors = _build_month(context, task)
+    except HTTPException as exc:
+        raise _WorkerHTTPError(exc.status_code, exc.detail) from None
+    return plans, warnings, budget_errors, profile.as_dict()
+
+
+async def _collect_month(
+    pool: ProcessPoolExecutor, task: MonthTask, future: asyncio.Future
+) -> tuple[str, list[dict], list[dict], list[Decimal]]:
+    """等待子进程结果，将业务错误还原为 HTTPException，并合并子进程的埋点记录。"""
+    global _generation_pool
+    try:
+        plans, warnings, budget_errors, profile = await future
+    except _WorkerHTTPError as exc:
+        status_code, detail = exc.args
+        raise HTTPException(status_code=status_code, detail=detail) from None
+    except BrokenProcessPool:
+        # 子进程异常退出后进程池不可再用，重建常驻进程池供后续请求使用
+        if pool is _generation_pool:
+            _generation_pool = _new_generation_pool(_generation_pool_workers)
+            pool.shutdown(wait=False, cancel_futures=True)
+        raise HTTPException(status_code=500, detail="并行生成进程异常") from None
+    generation_metrics.merge(profile)
+    return f"{task.year}-{task.month:02d}", plans, warnings, budget_errors
+
+
+def _next_built_month(
+    context: GenerationContext, tasks: Iterator[MonthTask]
+) -> tuple[MonthTask, tuple[list[dict], list[dict], list[Decimal]]] | None:
+    """取出下一个月份任务（含串行预处理）并生成，供工作线程执行；任务取完时返回 None。"""
+    task = next(tasks, None)
+    if task is None:
+        return None
+    with generation_metrics.span("build_month"):
+        return task, _build_month(context, task)
+
+
+async def _iter_built_months(
+    context: GenerationContext,
+    month_workdays: list[tuple[int, int, list[date]]],
+    last_purchases: dict[str, date],
+    periodic_ids: set[str],
+    creator_id: str | None,
+    seed: int | None,
+    workers: int,
+) -> AsyncIterator[tuple[str, list[dict], list[dict], list[Decimal]]]:
+    """串行预处理各月后逐月生成；workers 大于 1 且月份足够多时交给进程池并行执行。"""
+    tasks = (
+        _plan_month(context, last_purchases, periodic_ids, workdays, year, month, creator_id, seed)
+        for year, month, workdays in month_workdays
+    )
+    if len(month_workdays) < PARALLEL_MIN_MONTHS:
+        workers = 1
+    # 提前结束时立即关闭下游生成器，取消尚未开始的月份
+    async with aclosing(build_months(context, tasks, min(workers, len(month_workdays)))) as month_stream:
+        async for entry in month_stream:
+            yield entry
+
+
+async def build_months(
+    context: GenerationContext,
+    tasks: Iterable[MonthTask],
+    workers: int,
+) -> AsyncIterator[tuple[str, list[dict], list[dict], list[Decimal]]]:
+    """逐个生成已规划好的月份任务；workers 大于 1 时交给进程池并行执行，结果按提交顺序产出。
+
+    串行时月份预处理与生成在工作线程中执行，CPU 密集的生成不会阻塞事件循环（任务进度查询与事件流仍可响应）。
+    """
+    if workers <= 1:
+        remaining = iter(tasks)
+        while (built := await asyncio.to_thread(_next_built_month, context, remaining)) is not None:
+            task, (plans, warnings, budget_errors) = built
+            yield f"{task.year}-{task.month:02d}", plans, warnings, budget_errors
+        return
+
+    loop = asyncio.get_running_loop()
+    context_key, payload = await _context_payload(context)
+    pending: deque[tuple[MonthTask, asyncio.Future]] = deque()
+    async with _borrow_generation_pool(workers) as pool:
+        try:
+            for task in tasks:
+                future = loop.run_in_executor(pool, _build_month_in_worker, context_key, payload, task)
+                pending.append((task, future))
+                # 限制在途月份数量，按提交顺序取回结果即保证日期有序
+                if len(pending) >= workers * PARALLEL_MONTHS_PER_WORKER:
+                    yield await _collect_month(pool, *pending.popleft())
+            while pending:
+                yield await _collect_month(pool, *pending.popleft())
+        finally:
+            # 出错或提前结束时取消尚未开始的月份，常驻进程池继续服务其他请求
+            for _, future in pending:
+                future.cancel()
+
+
+def _restamp_plans(plans: list[dict], creator_id: str | None) -> list[dict]:
+    """缓存命中时刷新创建人与时间戳。"""
+    now = datetime.utcnow()
+    for plan in plans:
+        plan["creator_id"] = creator_id
+        plan["created_at"] = now
+        plan["updated_at"] = now
+    return plans
+
+
+async def iter_generate_plans(
+    db,
+    start_year: int,
+    start_month: int,
+    end_year: int,
+    end_month: int,
+    creator_id: str | None = None,
+    workers: int = 1,
+    seed: int | None = None,
+) -> AsyncIterator[tuple[str, list[dict], list[dict], list[Decimal]]]:
+    """按月流式生成采购计划，每生成完一个月即产出（年月, 当月计划, 当月预警, 当月预算偏差）。
+
+    workers 大于 1 时各月交给进程池并行生成，结果仍按月份顺序产出。
+    指定 seed 时所有随机抽样均来自该种子派生的独立随机流，相同输入的结果可复现并会被缓存。
+    """
+    if workers < 1:
+        raise HTTPException(status_code=400, detail="并行进程数无效")
+
+    with generation_metrics.span("load_context"):
+        context = await _load_generation_context(db)
+
+    # 定期产品最近采购台账：仅从数据库初始化一次，生成过程中逐日更新，后续月份不再查询；
+    # 只取起始月之前的历史，覆盖或预览已有计划的月份时不受将被替换的计划影响
+    periodic_ids = set(_periodic_product_ids(context.products_by_category, context.categories_by_id))
+    with generation_metrics.span("load_ledger"):
+        last_purchases = await _load_last_purchase_index(
+            db, sorted(periodic_ids), before=date(start_year, start_month, 1)
+        )
+
+    month_workdays: list[tuple[int, int, list[date]]] = []
+    with generation_metrics.span("workdays"):
+        # 整个月份区间一次解析工作日，日历开销只付一次
+        workdays_by_month = await get_workdays_range((start_year, start_month), (end_year, end_month))
+    for (year, month), workdays in workdays_by_month.items():
+        if workdays:
+            month_workdays.append((year, month, workdays))
+
+    cache_key = None
+    if seed is not None:
+        # 结果由种子、目录、设置、历史台账与工作日唯一决定
+        cache_key = (
+            seed,
+            context.catalog_version,
+            context.settings_version,
+            fingerprint(sorted(last_purchases.items())),
+            fingerprint(month_workdays),
+            (start_year, start_month, end_year, end_month),
+        )
+        cached = generation_cache.get(cache_key)
+        generation_metrics.count("cache_misses" if cached is None else "cache_hits")
+        if cached is not None:
+            for year_month, plans, warnings, budget_errors in cached:
+                yield year_month, _restamp_plans(plans, creator_id), warnings, budget_errors
+            return
+
+    collected: list[tuple[str, list[dict], list[dict], list[Decimal]]] = []
+    collected_items = 0
+    built_months = _iter_built_months(context, month_workdays, last_purchases, periodic_ids, creator_id, seed, workers)
+    async with aclosing(built_months):
+        async for year_month, plans, warnings, budget_errors in built_months:
+            if cache_key is not None:
+                collected_items += sum(len(plan["items"]) for plan in plans)
+                if generation_cache.accepts(collected_items):
+                    collected.append(copy.deepcopy((year_month, plans, warnings, budget_errors)))
+                else:
+                    # 结果超出缓存上限：停止收集并释放已拷贝的月份
+                    generation_metrics.count("cache_skips")
+                    cache_key = None
+                    collected = []
+            yield year_month, plans, warnings, budget_errors
+    if cache_key is not None:
+        generation_cache.put(cache_key, collected, weight=collected_items, owned=True)
+
+
+async def regenerate_days(
+    db,
+    days: list[date],
+    creator_id: str | None = None,
+    seed: int | None = None,
+) -> tuple[list[dict], list[dict], list[date], list[Decimal]]:
+    """仅重新生成指定日期的计划，返回（计划, 预警, 非工作日, 预算偏差）。
+
+    按所在月份重放预算分配、定期投放与每日随机源，定期台账只取该月之前的历史，
+    与整月生成时各日期的输入保持一致。
+    """
+    with generation_metrics.span("load_context"):
+        context = await _load_generation_context(db)
+    periodic_ids = set(_periodic_product_ids(context.products_by_category, context.categories_by_id))
+
+    targets_by_month: dict[tuple[int, int], set[date]] = defaultdict(set)
+    for day in days:
+        targets_by_month[(day.year, day.month)].add(day)
+
+    months = sorted(targets_by_month)
+    with generation_metrics.span("workdays"):
+        workdays_by_month = await get_workdays_range(months[0], months[-1]) if months else {}
+
+    plans: list[dict] = []
+    warnings: list[dict] = []
+    skipped: list[date] = []
+    budget_errors: list[Decimal] = []
+    for year, month in months:
+        targets = targets_by_month[(year, month)]
+        workdays = workdays_by_month[(year, month)]
+        skipped.extend(sorted(targets.difference(workdays)))
+        if not targets.intersection(workdays):
+            continue
+        with generation_metrics.span("load_ledger"):
+            ledger = await _load_last_purchase_index(db, sorted(periodic_ids), before=date(year, month, 1))
+        task = _plan_month(context, ledger, periodic_ids, workdays, year, month, creator_id, seed)
+        task.days = [day_input for day_input in task.days if day_input.day in targets]
+        with generation_metrics.span("build_month"):
+            month_plans, month_warnings, month_errors = await asyncio.to_thread(_build_month, context, task)
+        plans.extend(month_plans)
+        warnings.extend(month_warnings)
+        budget_errors.extend(month_errors)
+    return plans, warnings, skipped, budget_errors
+
+
+async def generate_plans(
+    db,
+    start_year: int,
+    start_month: int,
+    end_year: int,
+    end_month: int,
+    creator_id: str | None = None,
+    workers: int = 1,
+    seed: int | None = None,
+) -> tuple[list[dict], list[dict]]:
+    """生成指定时间范围内的采购计划列表。"""
+    plans: list[dict] = []
+    warnings: list[dict] = []
+    month_stream = iter_generate_plans(
+        db,
+        start_year,
+        start_month,
+        end_year,
+        end_month,
+        creator_id=creator_id,
+        workers=workers,
+        seed=seed,
+    )
+    async with aclosing(month_stream):
+        async for _, month_plans, month_warnings, _ in month_stream:
+            plans.extend(month_plans)
+            warnings.extend(month_warnings)
     return plans, warnings
@@ -12,17 +12,17 @@
 from datetime import datetime
 import re
 from decimal import Decimal, InvalidOperation
-from typing import Any
+from typing import TYPE_CHECKING, Any
 import io
 
 from fastapi import HTTPException
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Alignment, Border, Side, PatternFill, Font
-from openpyxl.utils import get_column_letter
 
 from app.db.serializers import encode_for_mongo
+from app.services.catalog_snapshot import bump_catalog_version
 from app.services.unit_rules import normalize_unit_input, quantity_step_for_unit
 
+if TYPE_CHECKING:
+    from openpyxl import Workbook
 
 PRODUCT_TEMPLATE_HEADERS = [
     "name",
@@ -158,12 +158,17 @@ def _parse_bool(value: Any) -> bool | None:
     return None
 
 
-def build_products_workbook(products: list[dict[str, Any]]) -> Workbook:
+def build_products_workbook(products: list[dict[str, Any]]) -> "Workbook":
     """生成产品库导出工作簿。
 
     - 主表“产品库”：表头 + 数据区 + 右侧说明区。
     - 子表“说明”：导入规则与重点字段解释。
     """
+    # openpyxl 仅在导入导出时加载，避免拖慢应用启动
+    from openpyxl import Workbook
+    from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+    from openpyxl.utils import get_column_letter
+
     wb = Workbook()
     ws = wb.active
     if ws is None:
@@ -314,6 +319,8 @@ async def import_products_from_xlsx(
     2. 逐行校验字段，收集 errors/warnings。
     3. 无 errors 时按产品名称执行 upsert（dry_run 时仅统计不落库）。
     """
+    from openpyxl import load_workbook
+
     wb = load_workbook(io.BytesIO(payload), data_only=True)
     ws = wb["产品库"] if "产品库" in wb.sheetnames else wb.active
 
@@ -536,6 +543,7 @@ async def import_products_from_xlsx(
                 {"$set": {"is_deleted": True, "updated_at": now}},
             )
             deactivated = result.modified_count or 0
+        await bump_catalog_version(db)
     else:
         for row in prepared:
             if row["name"] in existing_map:
@@ -5,18 +5,14 @@
 
 from collections.abc import Iterable
 
+from app.services.catalog_snapshot import get_catalog_snapshot
+
 
 async def collect_rule_gaps(db) -> dict:
     """收集品类规则缺口，返回缺少规则或缺少产品的品类列表。"""
-    categories = await db["categories"].find({}).to_list(1000)
-    name_to_id = {doc.get("name"): str(doc.get("_id")) for doc in categories if doc.get("name")}
-
-    product_cursor = db["products"].find(
-        {"is_deleted": False},
-        {"category_id": 1, "category_name": 1, "category": 1},
-    )
-
-    product_categories = await _collect_categories(product_cursor, name_to_id)
+    snapshot = await get_catalog_snapshot(db)
+    categories = snapshot.categories
+    product_categories = _collect_categories(snapshot.products, snapshot.name_to_id)
     rule_categories: set[str] = set()
     for doc in categories:
         purchase_mode = doc.get("purchase_mode")
@@ -40,10 +36,10 @@ async def collect_rule_gaps(db) -> dict:
     }
 
 
-async def _collect_categories(cursor, name_to_id: dict[str, str] | None) -> set[str]:
-    """从产品游标中提取关联的品类编号集合，兼容历史字段。"""
+def _collect_categories(products: Iterable[dict], name_to_id: dict[str, str] | None) -> set[str]:
+    """从产品列表中提取关联的品类编号集合，兼容历史字段。"""
     categories: set[str] = set()
-    async for doc in cursor:
+    for doc in products:
         category = doc.get("category_id")
         if not category and doc.get("_id"):
             category = str(doc.get("_id"))
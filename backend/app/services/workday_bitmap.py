@@ -0,0 +1,97 @@
+"""紧凑工作日日历。
+
+每年以 366 位位图记录工作日（第 N 位对应当年第 N+1 天），按字节对齐为 46 字节，
+文件头记录起始年份与年数，整份日历只有几百字节，可随镜像打包并由构建脚本重新生成。
+查询为一次位运算，只依赖标准库，不需要加载交易日历库。
+"""
+from collections.abc import Iterable
+from datetime import date, timedelta
+from functools import lru_cache
+from pathlib import Path
+import calendar
+import struct
+
+BITMAP_MAGIC = b"APWD"
+BITMAP_VERSION = 1
+YEAR_BITS = 366
+YEAR_BYTES = (YEAR_BITS + 7) // 8
+# 文件头：魔数、格式版本、起始年份、年数（小端）
+_HEADER = struct.Struct("<4sBHH")
+
+BUNDLED_BITMAP_DIR = Path(__file__).resolve().parents[1] / "data"
+
+
+def bundled_bitmap_path(calendar_name: str) -> Path:
+    """随应用打包的指定日历位图路径。"""
+    return BUNDLED_BITMAP_DIR / f"workdays_{calendar_name}.bin"
+
+
+class WorkdayBitmap:
+    """按年组织的工作日位图。"""
+
+    def __init__(self, first_year: int, years: int, data: bytes) -> None:
+        """设置起始年份、年数与位图数据（不含文件头）。"""
+        if len(data) != years * YEAR_BYTES:
+            raise ValueError("工作日位图长度与年数不符")
+        self.first_year = first_year
+        self.years = years
+        self._data = data
+
+    @property
+    def last_year(self) -> int:
+        """位图覆盖的最后一年。"""
+        return self.first_year + self.years - 1
+
+    def covers(self, year: int) -> bool:
+        """判断位图是否覆盖指定年份。"""
+        return self.first_year <= year <= self.last_year
+
+    def is_workday(self, day: date) -> bool:
+        """判断日期是否为工作日，年份未覆盖时抛出 KeyError。"""
+        if not self.covers(day.year):
+            raise KeyError(day.year)
+        bit = day.timetuple().tm_yday - 1
+        offset = (day.year - self.first_year) * YEAR_BYTES + (bit >> 3)
+        return bool(self._data[offset] >> (bit & 7) & 1)
+
+    def month_workdays(self, year: int, month: int) -> list[date] | None:
+        """返回指定月份的工作日，年份未覆盖时返回 None。"""
+        if not self.covers(year):
+            return None
+        first = date(year, month, 1)
+        return [
+            first + timedelta(days=offset)
+            for offset in range(calendar.monthrange(year, month)[1])
+            if self.is_workday(first + timedelta(days=offset))
+        ]
+
+    def to_bytes(self) -> bytes:
+        """序列化为带文件头的二进制内容。"""
+        return _HEADER.pack(BITMAP_MAGIC, BITMAP_VERSION, self.first_year, self.years) + self._data
+
+    @classmethod
+    def from_bytes(cls, payload: bytes) -> "WorkdayBitmap":
+        """从二进制内容解析位图。"""
+        if len(payload) < _HEADER.size:
+            raise ValueError("工作日位图文件无效")
+        magic, version, first_year, years = _HEADER.unpack_from(payload)
+        if magic != BITMAP_MAGIC or version != BITMAP_VERSION:
+            raise ValueError("工作日位图文件无效")
+        return cls(first_year, years, bytes(payload[_HEADER.size:]))
+
+    @classmethod
+    def from_workdays(cls, workdays: Iterable[date], first_year: int, last_year: int) -> "WorkdayBitmap":
+        """由工作日列表构建位图，超出年份范围的日期忽略。"""
+        years = last_year - first_year + 1
+        data = bytearray(years * YEAR_BYTES)
+        for day in workdays:
+            if first_year <= day.year <= last_year:
+                bit = day.timetuple().tm_yday - 1
+                data[(day.year - first_year) * YEAR_BYTES + (bit >> 3)] |= 1 << (bit & 7)
+        return cls(first_year, years, bytes(data))
+
+
+@lru_cache(maxsize=4)
+def load_workday_bitmap(path: str) -> WorkdayBitmap:
+    """读取位图文件，同一路径在进程内只读取一次。"""
+    return WorkdayBitmap.from_bytes(Path(path).read_bytes())
@@ -1,16 +1,41 @@
 """工作日服务。
 
-支持三种来源：交易日历库、本地工作日接口、工作日规则回退。
+支持四种来源：交易日历库、本地工作日接口、随应用打包的紧凑日历（bitmap）、工作日规则回退。
 用于采购计划生成时的工作日计算与日期对齐。
+
+多月份通过 get_workdays_range 一次解析，交易日历对整段区间只构建一次日程表。
+来源成功返回的结果按（来源、日历、年、月）缓存：进程内 LRU 在前，workday_cache 集合在后，
+命中时无需再构建交易日历；回退得到的默认工作日不缓存。节假日安排变化时通过刷新接口清除缓存，
+其他进程的内存缓存在过期时间内自然失效。
+工作日接口使用应用生命周期内共享的连接池客户端，区间内各月在并发上限内同时请求，失败结果短期缓存。
 """
-from datetime import date, timedelta
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import date, datetime
+from functools import lru_cache
+import asyncio
 import calendar
+import logging
 
 import httpx
-import pandas_market_calendars as mcal
 from fastapi import HTTPException
+from pymongo import ReplaceOne
+from pymongo.errors import PyMongoError
 
 from app.core.config import config
+from app.db import mongo
+from app.services.generation_cache import GenerationCache
+from app.services.workday_bitmap import bundled_bitmap_path, load_workday_bitmap
+
+logger = logging.getLogger(__name__)
+
+WORKDAY_CACHE_COLLECTION = "workday_cache"
+
+workday_cache = GenerationCache(config.workday_cache_size, config.workday_cache_ttl_seconds)
+# 工作日接口失败的短期缓存：值为错误信息，过期前同一月份不再重复请求
+workday_failures = GenerationCache(config.workday_cache_size, config.workday_api_failure_ttl_seconds)
+
+_http_client: httpx.AsyncClient | None = None
 
 
 def _default_workdays(year: int, month: int) -> list[date]:
@@ -24,55 +49,80 @@ def _default_workdays(year: int, month: int) -> list[date]:
     return days
 
 
-def _calendar_workdays(year: int, month: int) -> list[date]:
-    """使用 pandas_market_calendars 获取指定月份工作日。"""
+@lru_cache(maxsize=8)
+def _exchange_calendar(name: str):
+    """获取交易日历对象，同名日历在进程内只构建一次。"""
+    # 交易日历库连同 pandas 导入耗时较长，仅在首次使用交易日历来源时加载
+    import pandas_market_calendars as mcal
+
+    return mcal.get_calendar(name)
+
+
+def _calendar_workdays(start: date, end: date) -> list[date] | None:
+    """使用 pandas_market_calendars 一次获取起止日期内的工作日，日历不可用且允许回退时返回 None。"""
     try:
-        exchange_calendar = mcal.get_calendar(config.workday_calendar)
+        exchange_calendar = _exchange_calendar(config.workday_calendar)
     except Exception as exc:  # pragma: no cover - calendar lookup failure
         if config.workday_fallback:
             # 日历库异常时回退为默认工作日
-            return _default_workdays(year, month)
+            return None
         raise HTTPException(status_code=502, detail=f"交易日历不可用：{exc}") from exc
 
-    start = date(year, month, 1)
-    end = date(year, month, calendar.monthrange(year, month)[1])
     schedule = exchange_calendar.schedule(start_date=start, end_date=end)
     # 将交易日索引转换为日期列表
     days = [d.date() for d in schedule.index]
     return sorted(days)
 
 
-async def get_workdays(year: int, month: int) -> list[date]:
-    """根据配置获取工作日列表，必要时回退到默认工作日。"""
-    if config.workday_provider == "pandas_market_calendars":
-        return _calendar_workdays(year, month)
+def _workday_http_client() -> httpx.AsyncClient:
+    """创建工作日接口客户端，连接池容量与并发上限一致。"""
+    concurrency = max(1, config.workday_api_concurrency)
+    return httpx.AsyncClient(
+        timeout=config.workday_api_timeout,
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+    )
 
-    if not config.workday_api_url:
-        if config.workday_fallback:
-            # 未配置接口时回退为默认工作日
-            return _default_workdays(year, month)
-        raise HTTPException(status_code=502, detail="工作日接口未配置")
 
+async def open_workday_client() -> None:
+    """创建进程级共享的工作日接口客户端，连接在多次请求间复用（应用启动时调用）。"""
+    global _http_client
+    if _http_client is None:
+        _http_client = _workday_http_client()
+
+
+async def close_workday_client() -> None:
+    """关闭共享的工作日接口客户端（应用关闭时调用）。"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+@asynccontextmanager
+async def _borrow_http_client() -> AsyncIterator[httpx.AsyncClient]:
+    """优先使用共享客户端；未启动共享客户端（如脚本中）时为本次区间查询临时创建。"""
+    if _http_client is not None:
+        yield _http_client
+        return
+    async with _workday_http_client() as client:
+        yield client
+
+
+async def _request_api_workdays(client: httpx.AsyncClient, year: int, month: int) -> list[date]:
+    """请求工作日接口并解析单月工作日，接口异常或返回无效时抛出 502。"""
     params: dict[str, int | str] = {"year": year, "month": month}
     if config.workday_api_key:
         params["key"] = config.workday_api_key
 
     try:
-        async with httpx.AsyncClient(timeout=config.workday_api_timeout) as client:
-            response = await client.get(config.workday_api_url, params=params)
-            response.raise_for_status()
-            payload = response.json()
+        response = await client.get(config.workday_api_url, params=params)
+        response.raise_for_status()
+        payload = response.json()
     except httpx.HTTPError as exc:
-        if config.workday_fallback:
-            # 接口异常时回退为默认工作日
-            return _default_workdays(year, month)
         raise HTTPException(status_code=502, detail=f"工作日接口错误：{exc}") from exc
 
     workdays = payload.get("workdays")
     if not isinstance(workdays, list):
-        if config.workday_fallback:
-            # 返回结构不符合预期时回退
-            return _default_workdays(year, month)
         raise HTTPException(status_code=502, detail="工作日接口返回数据无效")
 
     parsed: list[date] = []
@@ -85,12 +135,209 @@ async def get_workdays(year: int, month: int) -> list[date]:
             continue
 
     if not parsed and config.workday_fallback:
-        # 解析失败且允许回退时使用默认工作日
-        return _default_workdays(year, month)
+        # 解析失败且允许回退时按失败处理，使用默认工作日
+        raise HTTPException(status_code=502, detail="工作日接口返回数据无效")
 
     return sorted(parsed)
 
 
+async def _api_workdays(client: httpx.AsyncClient, year: int, month: int) -> list[date] | None:
+    """获取指定月份工作日，接口不可用且允许回退时返回 None。
+
+    失败结果在短时间内缓存，期间同一月份直接按失败处理，不再请求接口。
+    """
+    key = (*_workday_source(), year, month)
+    detail = workday_failures.get(key)
+    if detail is None:
+        try:
+            return await _request_api_workdays(client, year, month)
+        except HTTPException as exc:
+            detail = exc.detail
+            workday_failures.put(key, detail)
+    if config.workday_fallback:
+        # 接口异常时回退为默认工作日
+        return None
+    raise HTTPException(status_code=502, detail=detail)
+
+
+async def _fetch_workdays(months: list[tuple[int, int]]) -> dict[tuple[int, int], list[date] | None]:
+    """向来源获取各月工作日；交易日历对首尾月份之间的整段区间只构建一次日程表，再按月拆分。"""
+    if config.workday_provider != "pandas_market_calendars":
+        if not config.workday_api_url:
+            if config.workday_fallback:
+                # 未配置接口时回退为默认工作日
+                return dict.fromkeys(months)
+            raise HTTPException(status_code=502, detail="工作日接口未配置")
+
+        # 工作日接口按年月查询，各月并发请求，并发数受配置限制
+        semaphore = asyncio.Semaphore(max(1, config.workday_api_concurrency))
+
+        async def fetch_month(client: httpx.AsyncClient, year: int, month: int) -> list[date] | None:
+            """在并发限制内获取单月工作日。"""
+            async with semaphore:
+                return await _api_workdays(client, year, month)
+
+        async with _borrow_http_client() as client:
+            results = await asyncio.gather(*(fetch_month(client, year, month) for year, month in months))
+        return dict(zip(months, results))
+
+    (first_year, first_month), (last_year, last_month) = months[0], months[-1]
+    start = date(first_year, first_month, 1)
+    end = date(last_year, last_month, calendar.monthrange(last_year, last_month)[1])
+    days = _calendar_workdays(start, end)
+    if days is None:
+        return dict.fromkeys(months)
+    by_month: dict[tuple[int, int], list[date]] = {month: [] for month in months}
+    for day in days:
+        month_days = by_month.get((day.year, day.month))
+        if month_days is not None:
+            month_days.append(day)
+    return by_month
+
+
+def _bitmap_path() -> str:
+    """紧凑日历文件路径：未配置时使用随应用打包的同名日历。"""
+    return config.workday_bitmap_path or str(bundled_bitmap_path(config.workday_calendar))
+
+
+def _bitmap_workdays(year: int, month: int) -> list[date]:
+    """从紧凑日历读取指定月份工作日，文件不可用或年份未覆盖时按配置回退。"""
+    try:
+        days = load_workday_bitmap(_bitmap_path()).month_workdays(year, month)
+        detail = "工作日日历未覆盖该年份"
+    except (OSError, ValueError) as exc:
+        days, detail = None, f"工作日日历不可用：{exc}"
+    if days is not None:
+        return days
+    if config.workday_fallback:
+        # 日历不可用时回退为默认工作日
+        return _default_workdays(year, month)
+    raise HTTPException(status_code=502, detail=detail)
+
+
+def _months_between(start: tuple[int, int], end: tuple[int, int]) -> list[tuple[int, int]]:
+    """生成起止年月（含）之间的年月列表。"""
+    months: list[tuple[int, int]] = []
+    year, month = start
+    while (year, month) <= end:
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+
+def _workday_source() -> tuple[str, str]:
+    """当前工作日来源标识：（来源, 日历）；接口来源以接口地址、紧凑日历以文件路径区分日历。"""
+    if config.workday_provider == "pandas_market_calendars":
+        return config.workday_provider, config.workday_calendar
+    if config.workday_provider == "bitmap":
+        return config.workday_provider, _bitmap_path()
+    return config.workday_provider, config.workday_api_url or ""
+
+
+def _cache_id(provider: str, calendar_name: str, year: int, month: int) -> str:
+    """workday_cache 集合中单月缓存的文档编号。"""
+    return f"{provider}|{calendar_name}|{year:04d}-{month:02d}"
+
+
+async def _load_cached(
+    provider: str, calendar_name: str, months: list[tuple[int, int]]
+) -> dict[tuple[int, int], list[date]]:
+    """从 workday_cache 集合一次读取多个月份的工作日；数据库不可用时视为全部未命中。"""
+    ids = [_cache_id(provider, calendar_name, year, month) for year, month in months]
+    try:
+        docs = await mongo.get_database()[WORKDAY_CACHE_COLLECTION].find({"_id": {"$in": ids}}).to_list(None)
+    except PyMongoError as exc:
+        logger.warning("读取工作日缓存失败：%s", exc)
+        return {}
+    return {(doc["year"], doc["month"]): [date.fromisoformat(item) for item in doc["workdays"]] for doc in docs}
+
+
+async def _save_cached(provider: str, calendar_name: str, resolved: dict[tuple[int, int], list[date]]) -> None:
+    """批量写入 workday_cache 集合；数据库不可用时只保留进程内缓存。"""
+    if not resolved:
+        return
+    now = datetime.utcnow()
+    operations = [
+        ReplaceOne(
+            {"_id": _cache_id(provider, calendar_name, year, month)},
+            {
+                "provider": provider,
+                "calendar": calendar_name,
+                "year": year,
+                "month": month,
+                "workdays": [day.isoformat() for day in days],
+                "updated_at": now,
+            },
+            upsert=True,
+        )
+        for (year, month), days in resolved.items()
+    ]
+    try:
+        await mongo.get_database()[WORKDAY_CACHE_COLLECTION].bulk_write(operations, ordered=False)
+    except PyMongoError as exc:
+        logger.warning("写入工作日缓存失败：%s", exc)
+
+
+async def get_workdays_range(start: tuple[int, int], end: tuple[int, int]) -> dict[tuple[int, int], list[date]]:
+    """获取起止年月（含）内各月工作日，按年月返回。
+
+    依次查进程内缓存与 workday_cache 集合，剩余月份向来源一次性请求后按月拆分；
+    回退为默认工作日的月份不缓存。
+    """
+    months = _months_between(start, end)
+    if config.workday_provider == "bitmap":
+        # 紧凑日历查询只是位运算，无需经过缓存
+        return {(year, month): _bitmap_workdays(year, month) for year, month in months}
+
+    provider, calendar_name = _workday_source()
+    resolved: dict[tuple[int, int], list[date]] = {}
+    for year, month in months:
+        cached = workday_cache.get((provider, calendar_name, year, month))
+        if cached is not None:
+            resolved[(year, month)] = cached
+
+    missing = [month for month in months if month not in resolved]
+    if missing:
+        stored = await _load_cached(provider, calendar_name, missing)
+        for (year, month), days in stored.items():
+            workday_cache.put((provider, calendar_name, year, month), days)
+        resolved.update(stored)
+        missing = [month for month in missing if month not in stored]
+
+    if missing:
+        fetched = await _fetch_workdays(missing)
+        cacheable = {month: days for month, days in fetched.items() if days is not None}
+        await _save_cached(provider, calendar_name, cacheable)
+        for (year, month), days in fetched.items():
+            if days is None:
+                resolved[(year, month)] = _default_workdays(year, month)
+            else:
+                workday_cache.put((provider, calendar_name, year, month), days)
+                resolved[(year, month)] = days
+
+    return {month: resolved[month] for month in months}
+
+
+async def get_workdays(year: int, month: int) -> list[date]:
+    """根据配置获取单月工作日列表，优先读取缓存，必要时回退到默认工作日。"""
+    return (await get_workdays_range((year, month), (year, month)))[(year, month)]
+
+
+async def refresh_workday_cache(db, year: int | None = None, month: int | None = None) -> int:
+    """清除当前来源的工作日缓存（可限定年份或年月），返回删除的持久化月份数。"""
+    provider, calendar_name = _workday_source()
+    query: dict[str, str | int] = {"provider": provider, "calendar": calendar_name}
+    if year is not None:
+        query["year"] = year
+    if month is not None:
+        query["month"] = month
+    result = await db[WORKDAY_CACHE_COLLECTION].delete_many(query)
+    # 进程内缓存整体清空，条目数有限，重新加载代价很低
+    workday_cache.clear()
+    workday_failures.clear()
+    return result.deleted_count
+
+
 def shift_to_next_workday(target: date, workdays: list[date]) -> date | None:
     """将目标日期向后顺延到最近的工作日。"""
     for day in workdays:
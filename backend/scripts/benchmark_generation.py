@@ -0,0 +1,260 @@
+"""计划生成基准测试脚本。
+
+在内存 MongoDB（mongomock，与测试相同）中构建指定规模的合成产品库，
+对不同产品规模与月份跨度计时 generate_plans，记录各阶段耗时与峰值内存，
+结果以 JSON 输出，便于在不同提交之间对比。
+
+示例：
+    python scripts/benchmark_generation.py --products 1000 10000 --months 1 12 --output bench.json
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tracemalloc
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from time import perf_counter
+
+# 兼容以文件路径执行脚本时的模块导入路径
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from bson import ObjectId
+from mongomock_motor import AsyncMongoMockClient
+
+import app.services.procurement_generator as generator
+from app.db.serializers import encode_for_mongo
+from app.services.catalog_snapshot import get_catalog_snapshot
+from app.services.generation_cache import generation_cache
+from app.services.generation_metrics import GenerationProfile, recording
+from app.services.workdays import _default_workdays, _months_between
+
+BENCHMARK_START_YEAR = 2026
+# 合成产品的单位：可分割单位按 0.1 步进，其余按 1
+SYNTHETIC_UNITS = ("斤", "份", "个", "箱")
+
+
+def _build_catalog(
+    products: int,
+    categories: int,
+    periodic_ratio: float,
+    rng: random.Random,
+) -> tuple[list[dict], list[dict]]:
+    """构建合成品类与产品，产品均匀分配到各品类。"""
+    periodic_count = round(categories * periodic_ratio)
+    category_docs: list[dict] = []
+    for idx in range(categories):
+        doc = {
+            "_id": ObjectId(),
+            "name": f"品类{idx + 1:03d}",
+            "is_active": True,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow(),
+        }
+        if idx < periodic_count:
+            doc.update(
+                purchase_mode="periodic",
+                cycle_days=rng.randint(7, 30),
+                float_days=rng.randint(0, 3),
+                items_count_range={"min": 1, "max": rng.randint(1, 2)},
+            )
+        else:
+            low = rng.randint(1, 3)
+            doc.update(purchase_mode="daily", items_count_range={"min": low, "max": low + rng.randint(0, 2)})
+        category_docs.append(doc)
+
+    product_docs: list[dict] = []
+    for idx in range(products):
+        category = category_docs[idx % categories]
+        qty_min = rng.randint(1, 5)
+        product_docs.append(
+            {
+                "name": f"产品{idx + 1:06d}",
+                "category_id": str(category["_id"]),
+                "category_name": category["name"],
+                "unit": rng.choice(SYNTHETIC_UNITS),
+                "base_price": Decimal(rng.randint(100, 5000)) / 100,
+                "volatility": Decimal(rng.randint(0, 15)) / 100,
+                "item_quantity_range": {"min": Decimal(qty_min), "max": Decimal(qty_min + rng.randint(5, 20))},
+                "is_deleted": False,
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow(),
+            }
+        )
+    return category_docs, product_docs
+
+
+def _budget_range(category_docs: list[dict], product_docs: list[dict]) -> dict:
+    """按每日品类的平均选品数、单价与数量估算日预算区间。"""
+    by_category: dict[str, list[dict]] = {}
+    for product in product_docs:
+        by_category.setdefault(product["category_id"], []).append(product)
+    expected = Decimal(0)
+    for category in category_docs:
+        products = by_category.get(str(category["_id"]))
+        if category["purchase_mode"] != "daily" or not products:
+            continue
+        count_range = category["items_count_range"]
+        mean_count = Decimal(count_range["min"] + count_range["max"]) / 2
+        mean_cost = sum(
+            (p["base_price"] * (p["item_quantity_range"]["min"] + p["item_quantity_range"]["max"]) / 2 for p in products),
+            Decimal(0),
+        ) / len(products)
+        expected += mean_count * mean_cost
+    return {"min": (expected * Decimal("0.8")).quantize(Decimal("1")), "max": (expected * Decimal("1.2")).quantize(Decimal("1"))}
+
+
+async def _prepare_database(products: int, categories: int, periodic_ratio: float, seed: int):
+    """创建内存数据库并写入合成产品库与预算设置。"""
+    rng = random.Random(seed)
+    category_docs, product_docs = _build_catalog(products, categories, periodic_ratio, rng)
+    db = AsyncMongoMockClient()[f"bench_{products}"]
+    await db["categories"].insert_many(encode_for_mongo(category_docs))
+    await db["products"].insert_many(encode_for_mongo(product_docs))
+    await db["settings"].insert_one(
+        encode_for_mongo({"key": "global", "daily_budget_range": _budget_range(category_docs, product_docs)})
+    )
+    return db
+
+
+def _end_month(months: int) -> tuple[int, int]:
+    """计算从基准年 1 月起跨越指定月数的结束年月。"""
+    offset = months - 1
+    return BENCHMARK_START_YEAR + offset // 12, offset % 12 + 1
+
+
+async def _generate(db, months: int, workers: int, seed: int) -> tuple[list[dict], list[dict]]:
+    """清空结果缓存后执行一次完整生成。"""
+    generation_cache.clear()
+    end_year, end_month = _end_month(months)
+    return await generator.generate_plans(
+        db, BENCHMARK_START_YEAR, 1, end_year, end_month, workers=workers, seed=seed
+    )
+
+
+async def _run_case(db, products: int, months: int, args: argparse.Namespace) -> dict:
+    """计时单个（产品规模, 月数）组合，可选再跑一轮统计峰值内存。"""
+    profile = GenerationProfile()
+    gc.collect()
+    started = perf_counter()
+    with recording(profile):
+        plans, warnings = await _generate(db, months, args.workers, args.seed)
+    seconds = perf_counter() - started
+
+    # 核对生成实际使用的产品数，避免加载上限等原因使规模与报告不符
+    snapshot_products = len((await get_catalog_snapshot(db)).products)
+    if snapshot_products != products:
+        raise RuntimeError(f"目录快照产品数 {snapshot_products} 与请求规模 {products} 不一致")
+
+    peak_memory = None
+    if not args.skip_memory:
+        # tracemalloc 会显著拖慢执行，峰值内存单独再跑一轮统计
+        gc.collect()
+        tracemalloc.start()
+        await _generate(db, months, args.workers, args.seed)
+        _, peak_memory = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {
+        "products": products,
+        "snapshot_products": snapshot_products,
+        "categories": args.categories,
+        "periodic_ratio": args.periodic_ratio,
+        "months": months,
+        "seconds": round(seconds, 4),
+        "plans": len(plans),
+        "items": sum(len(plan["items"]) for plan in plans),
+        "warnings": len(warnings),
+        "peak_memory_bytes": peak_memory,
+        "profile": profile.as_dict(),
+    }
+
+
+def _git_commit() -> str | None:
+    """读取当前提交号，便于对比不同提交的结果。"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_benchmark(args: argparse.Namespace) -> dict:
+    """按产品规模与月数矩阵执行基准测试。"""
+    if not args.real_workdays:
+        # 默认使用周一至周五作为工作日，避免外部日历影响计时
+        async def weekday_workdays(start: tuple[int, int], end: tuple[int, int]) -> dict[tuple[int, int], list[date]]:
+            """返回区间内各月周一至周五的工作日。"""
+            return {month: _default_workdays(*month) for month in _months_between(start, end)}
+
+        generator.get_workdays_range = weekday_workdays
+
+    results = []
+    # 与应用一致使用常驻进程池，各组合复用已启动的子进程
+    if args.workers > 1:
+        await generator.open_generation_pool(args.workers)
+    try:
+        for products in args.products:
+            db = await _prepare_database(products, args.categories, args.periodic_ratio, args.seed)
+            for months in args.months:
+                result = await _run_case(db, products, months, args)
+                print(
+                    f"products={products} months={months} seconds={result['seconds']} "
+                    f"plans={result['plans']} peak_memory={result['peak_memory_bytes']}",
+                    file=sys.stderr,
+                )
+                results.append(result)
+    finally:
+        await generator.close_generation_pool()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "workers": args.workers,
+            "seed": args.seed,
+            "real_workdays": args.real_workdays,
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    """脚本入口函数。"""
+    parser = argparse.ArgumentParser(description="计划生成基准测试")
+    parser.add_argument("--products", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--months", type=int, nargs="+", default=[1, 12, 60])
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--periodic-ratio", type=float, default=0.3)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=20260101)
+    parser.add_argument("--real-workdays", action="store_true", help="使用配置的工作日来源而非周一至周五")
+    parser.add_argument("--skip-memory", action="store_true", help="跳过峰值内存统计")
+    parser.add_argument("--output", type=Path, help="结果 JSON 文件路径，默认输出到标准输出")
+    args = parser.parse_args()
+    if args.categories < 1 or not 0 <= args.periodic_ratio <= 1:
+        parser.error("品类数须大于 0，定期品类占比须在 0 到 1 之间")
+
+    report = asyncio.run(run_benchmark(args))
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
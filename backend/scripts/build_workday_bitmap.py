@@ -0,0 +1,65 @@
+"""紧凑工作日日历构建脚本。
+
+从交易日历库或工作日接口导出指定年份范围的工作日，写入紧凑位图文件，
+默认输出到 app/data/workdays_<日历>.bin，即 workday_provider=bitmap 时读取的打包日历。
+节假日安排公布或调整后重新执行即可。
+
+示例：
+    python -m scripts.build_workday_bitmap --source calendar --calendar SSE --start-year 2015 --end-year 2035
+    python -m scripts.build_workday_bitmap --source api --start-year 2026 --end-year 2026 --output /tmp/workdays.bin
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# 兼容以文件路径执行脚本时的模块导入路径
+ROOT_DIR = Path(__file__).resolve().parents[1]
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from fastapi import HTTPException
+
+from app.core.config import config
+from app.services.workday_bitmap import WorkdayBitmap, bundled_bitmap_path
+from app.services.workdays import _fetch_workdays, _months_between
+
+SOURCE_PROVIDERS = {"calendar": "pandas_market_calendars", "api": "api"}
+
+
+async def build_bitmap(source: str, start_year: int, end_year: int) -> WorkdayBitmap:
+    """从指定来源获取年份范围内的全部工作日并构建位图，来源不可用时直接报错而不回退。"""
+    config.workday_provider = SOURCE_PROVIDERS[source]
+    config.workday_fallback = False
+    fetched = await _fetch_workdays(_months_between((start_year, 1), (end_year, 12)))
+    workdays = [day for days in fetched.values() for day in days or []]
+    return WorkdayBitmap.from_workdays(workdays, start_year, end_year)
+
+
+def main() -> None:
+    """脚本入口函数。"""
+    parser = argparse.ArgumentParser(description="构建紧凑工作日日历")
+    parser.add_argument("--source", choices=sorted(SOURCE_PROVIDERS), default="calendar")
+    parser.add_argument("--calendar", default=config.workday_calendar, help="交易日历名称，同时决定默认输出文件名")
+    parser.add_argument("--start-year", type=int, required=True)
+    parser.add_argument("--end-year", type=int, required=True)
+    parser.add_argument("--output", type=Path, help="输出文件路径，默认为打包日历路径")
+    args = parser.parse_args()
+    if args.start_year > args.end_year:
+        parser.error("起始年份不能大于结束年份")
+
+    config.workday_calendar = args.calendar
+    try:
+        bitmap = asyncio.run(build_bitmap(args.source, args.start_year, args.end_year))
+    except HTTPException as exc:
+        sys.exit(f"构建失败：{exc.detail}")
+
+    output = args.output or bundled_bitmap_path(args.calendar)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_bytes(bitmap.to_bytes())
+    print(f"已写入 {output}：{bitmap.first_year}-{bitmap.last_year}，{len(bitmap.to_bytes())} 字节")
+
+
+if __name__ == "__main__":
+    main()
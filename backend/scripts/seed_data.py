@@ -15,6 +15,7 @@ from app.core.config import config
 from app.core.security import hash_password
 from app.db.mongo import get_database
 from app.db.serializers import encode_for_mongo
+from app.services.catalog_snapshot import bump_catalog_version
 from app.services.procurement_generator import generate_plans
 
 
@@ -393,6 +394,7 @@ async def seed_data(year: int, scale: int, wipe: bool) -> None:
         product["created_at"] = now
         product["updated_at"] = now
     await db["products"].insert_many(encode_for_mongo(products))
+    await bump_catalog_version(db)
 
     settings = _build_settings()
     encoded_settings = cast(dict[str, Any], encode_for_mongo(settings))
@@ -405,10 +407,8 @@ async def seed_data(year: int, scale: int, wipe: bool) -> None:
     daily_range = settings.get("daily_budget_range")
     plans: list[dict] = []
     if daily_range and daily_range.get("min") is not None and daily_range.get("max") is not None:
-        for month in range(1, 13):
-            month_plans = await generate_plans(db, year, month, year, month, creator_id=user_id)
-            if month_plans:
-                plans.extend(month_plans)
+        # 全年一次生成：工作日整段解析一次，定期品类台账跨月连续
+        plans, _ = await generate_plans(db, year, 1, year, 12, creator_id=user_id)
 
     if plans:
         encoded_plans = cast(list[dict[str, Any]], encode_for_mongo(plans))
@@ -1,12 +1,14 @@
 """测试通用夹具配置。"""
 
 from datetime import datetime
+import inspect
 import os
 import sys
 
 import pytest
 import pytest_asyncio
 from httpx import ASGITransport, AsyncClient
+from mongomock.collection import BulkOperationBuilder
 from mongomock_motor import AsyncMongoMockClient
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -15,8 +17,11 @@ if ROOT not in sys.path:
 
 from app.core.security import hash_password
 from app.main import app
+from app.services.generation_cache import generation_cache
+from app.services.workdays import _months_between, workday_cache, workday_failures
 
 import app.db.mongo as mongo
+import app.services.procurement_generator as generator
 import app.core.security as security
 import app.routers.products as products_router
 import app.routers.procurement as procurement_router
@@ -24,6 +29,21 @@ import app.routers.history as history_router
 import app.routers.procurement_export as procurement_export_router
 import app.routers.auth as auth_router
 import app.routers.categories as categories_router
+import app.routers.workdays as workdays_router
+
+
+def _accept_sort_argument(method):
+    """新版 pymongo 的批量操作会额外传入 sort 参数，mongomock 尚未支持，测试中忽略即可。"""
+    def wrapper(self, *args, sort=None, **kwargs):
+        """丢弃 sort 参数后调用原方法。"""
+        return method(self, *args, **kwargs)
+    return wrapper
+
+
+for _name in ("add_replace", "add_update"):
+    _method = getattr(BulkOperationBuilder, _name)
+    if "sort" not in inspect.signature(_method).parameters:
+        setattr(BulkOperationBuilder, _name, _accept_sort_argument(_method))
 
 
 @pytest_asyncio.fixture
@@ -31,6 +51,9 @@ async def db(monkeypatch):
     """提供内存 MongoDB 并替换数据库依赖。"""
     client = AsyncMongoMockClient()
     db = client["testdb"]
+    generation_cache.clear()
+    workday_cache.clear()
+    workday_failures.clear()
 
     def _get_db():
         """返回测试数据库实例。"""
@@ -44,10 +67,25 @@ async def db(monkeypatch):
     monkeypatch.setattr(procurement_export_router, "get_database", _get_db)
     monkeypatch.setattr(auth_router, "get_database", _get_db)
     monkeypatch.setattr(categories_router, "get_database", _get_db)
+    monkeypatch.setattr(workdays_router, "get_database", _get_db)
 
     return db
 
 
+@pytest.fixture
+def patch_workdays(monkeypatch):
+    """以按月的工作日函数替换生成服务的区间工作日查询。"""
+    def _patch(fetch):
+        """安装替换函数，fetch(year, month) 返回当月工作日。"""
+        async def fake_range(start, end):
+            """按月调用 fetch 组装区间结果。"""
+            return {month: await fetch(*month) for month in _months_between(start, end)}
+
+        monkeypatch.setattr(generator, "get_workdays_range", fake_range)
+
+    return _patch
+
+
 @pytest_asyncio.fixture
 async def client(db):
     """提供基于 ASGI 的异步测试客户端。"""
@@ -0,0 +1,123 @@
+"""预算贴合求解器测试。"""
+
+from itertools import product as cartesian
+import random
+
+from app.services import budget_solver
+from app.services.budget_solver import solve_closest
+from app.services.fixed_point import line_amount_cents
+import app.services.procurement_generator as generator
+
+
+def test_solver_matches_brute_force():
+    """小规模随机实例上，求解结果应与穷举的最小偏差一致。"""
+    rng = random.Random(11)
+    for _ in range(200):
+        options = []
+        for _ in range(rng.randint(1, 4)):
+            price = rng.randint(1, 900)
+            low = rng.randint(0, 5)
+            options.append([line_amount_cents(price, steps, (1, 10)) for steps in range(low, low + rng.randint(1, 6))])
+        target = rng.randint(0, sum(group[-1] for group in options) + 200)
+
+        chosen, total = solve_closest(options, target, rng=rng)
+        assert total == sum(group[idx] for group, idx in zip(options, chosen))
+        best = min(abs(sum(combo) - target) for combo in cartesian(*options))
+        assert abs(total - target) == best
+
+
+def test_solver_respects_deadline(monkeypatch):
+    """超过时间上限时应返回 None 交由调用方兜底，单组候选内部也会检查时间。"""
+    options = [[amount for amount in range(0, 5000, 7)] for _ in range(5)]
+    assert solve_closest(options, 12345, deadline=0) is None
+
+    checks = iter([0.0, 0.0, 1.0])
+    monkeypatch.setattr(budget_solver, "perf_counter", lambda: next(checks))
+    assert solve_closest([[0, 1, 2, 3, 4, 5]], 3, deadline=0.5) is None
+
+
+def test_solver_respects_work_limit():
+    """工作量超过上限时应直接返回 None，判定只取决于输入而与耗时无关。"""
+    options = [[amount for amount in range(0, 5000, 7)] for _ in range(5)]
+    work = budget_solver.solver_work(options, 12345)
+    assert work == (12345 + 7 + 1) * sum(len(group) for group in options)
+    assert solve_closest(options, 12345, max_work=work - 1) is None
+    assert solve_closest(options, 12345, max_work=work) is not None
+    # 可直接得出结果的情形不计工作量
+    assert budget_solver.solver_work(options, 0) == 0
+    assert solve_closest(options, 0, max_work=0) == ([0] * 5, 0)
+
+
+def _solver_items() -> list[dict]:
+    """构造两个需要精确求解才能命中目标的明细。"""
+    product = {
+        "_id": "a",
+        "name": "青菜",
+        "unit": "斤",
+        "base_price": "3.00",
+        "volatility": "0",
+        "item_quantity_range": {"min": "1", "max": "20"},
+    }
+    other = {**product, "_id": "b", "base_price": "7.00", "unit": "个", "item_quantity_range": {"min": "1", "max": "9"}}
+    return [
+        generator._build_item(p, generator._build_product_profile(p, 2), 2, steps_override=profile_min)
+        for p, profile_min in ((product, 10), (other, 1))
+    ]
+
+
+def test_adjust_to_budget_ignores_wall_clock_without_time_limit(monkeypatch):
+    """未传入时间上限（指定种子）时，机器再慢也应完成求解；传入时才由时间兜底。"""
+    clock = iter(range(0, 10**9, 1000))
+    monkeypatch.setattr(generator, "perf_counter", lambda: next(clock))
+    monkeypatch.setattr(budget_solver, "perf_counter", lambda: next(clock))
+
+    items = _solver_items()
+    generator._adjust_to_budget(items, 6530, 2, rng=random.Random(0))
+    assert generator._items_total_cents(items) == 6530
+
+    items = _solver_items()
+    generator._adjust_to_budget(items, 6530, 2, rng=random.Random(0), time_limit=0.05)
+    assert generator._items_total_cents(items) == 6520
+
+
+def test_adjust_to_budget_keeps_greedy_result_over_work_limit(monkeypatch):
+    """工作量上限不足时保留贪心结果，且单品数量不越界。"""
+    monkeypatch.setattr(generator.config, "solver_work_limit", 0)
+    # 3.00 × 17.1 + 7.00 × 2 = 65.30，贪心只能到 65.20
+    items = _solver_items()
+    generator._adjust_to_budget(items, 6530, 2, rng=random.Random(0))
+    assert generator._items_total_cents(items) == 6520
+    for item in items:
+        assert item["_min_steps"] <= item["_steps"] <= item["_max_steps"]
+
+
+def test_adjust_to_budget_hits_target_exactly():
+    """存在可行组合时，调整后的日合计应精确命中目标预算。"""
+    items = _solver_items()
+
+    # 3.00 × 12.3 + 7.00 × 4 = 64.90
+    generator._adjust_to_budget(items, 6490, 2, rng=random.Random(0))
+    assert generator._items_total_cents(items) == 6490
+    for item in items:
+        assert item["_min_steps"] <= item["_steps"] <= item["_max_steps"]
+
+
+def test_adjust_to_budget_skips_solver_when_greedy_is_exact(monkeypatch):
+    """贪心已精确命中目标时不再调用精确求解。"""
+    product = {
+        "_id": "a",
+        "name": "青菜",
+        "unit": "个",
+        "base_price": "3.00",
+        "volatility": "0",
+        "item_quantity_range": {"min": "1", "max": "20"},
+    }
+    items = [generator._build_item(product, generator._build_product_profile(product, 2), 2, steps_override=2)]
+
+    def fail_solver(*args, **kwargs):
+        """贪心命中时不应被调用。"""
+        raise AssertionError("solver should not run")
+
+    monkeypatch.setattr(generator, "solve_closest", fail_solver)
+    generator._adjust_to_budget(items, 1500, 2, rng=random.Random(0))
+    assert generator._items_total_cents(items) == 1500
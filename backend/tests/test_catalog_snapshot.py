@@ -0,0 +1,102 @@
+"""目录快照测试。"""
+
+import pytest
+
+from app.services.catalog_snapshot import bump_catalog_version, get_catalog_snapshot
+
+
+@pytest.mark.asyncio
+async def test_snapshot_reused_until_version_changes(db):
+    """版本未变化时复用同一快照，递增版本后重新加载。"""
+    category = await db["categories"].insert_one({"name": "蔬菜", "is_active": True})
+    await db["products"].insert_one(
+        {"name": "青菜", "category_name": "蔬菜", "base_price": 3, "is_deleted": False}
+    )
+
+    first = await get_catalog_snapshot(db)
+    category_id = str(category.inserted_id)
+    # 历史产品仅有品类名称时按名称归入品类，但不计入品类列表数量
+    assert [p["name"] for p in first.products_by_category[category_id]] == ["青菜"]
+    assert first.product_counts.get(category_id, 0) == 0
+    assert first.profiles is first.profiles
+
+    await db["products"].insert_one(
+        {"name": "菠菜", "category_id": category_id, "base_price": 4, "is_deleted": False}
+    )
+    assert await get_catalog_snapshot(db) is first
+
+    await bump_catalog_version(db)
+    second = await get_catalog_snapshot(db)
+    assert second is not first
+    assert second.product_counts[category_id] == 1
+    assert len(second.products_by_category[category_id]) == 2
+
+
+@pytest.mark.asyncio
+async def test_write_paths_bump_catalog_version(client, auth_header):
+    """通过接口写入产品与品类后，品类列表与规则校验立即反映变化。"""
+    resp = await client.post("/api/categories", json={"name": "蔬菜"}, headers=auth_header)
+    category_id = resp.json()["data"]["id"]
+
+    resp = await client.get("/api/categories", headers=auth_header)
+    assert resp.json()["data"]["items"][0]["product_count"] == 0
+
+    resp = await client.post(
+        "/api/products",
+        json={
+            "name": "青菜",
+            "category_id": category_id,
+            "unit": "斤",
+            "base_price": "3.0",
+            "volatility": "0.0",
+            "item_quantity_range": {"min": "1", "max": "2"},
+        },
+        headers=auth_header,
+    )
+    product_id = resp.json()["data"]["id"]
+    resp = await client.get("/api/categories", headers=auth_header)
+    assert resp.json()["data"]["items"][0]["product_count"] == 1
+    resp = await client.get("/api/categories/validation", headers=auth_header)
+    assert resp.json()["data"]["categories_without_rules"] == [category_id]
+
+    await client.put(
+        f"/api/categories/{category_id}",
+        json={"purchase_mode": "daily", "items_count_range": {"min": 1, "max": 1}},
+        headers=auth_header,
+    )
+    resp = await client.get("/api/categories/validation", headers=auth_header)
+    assert resp.json()["data"]["categories_without_rules"] == []
+
+    await client.delete(f"/api/products/{product_id}", headers=auth_header)
+    resp = await client.get("/api/categories/validation", headers=auth_header)
+    assert resp.json()["data"]["categories_without_products"] == [category_id]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_loads_catalog_without_row_cap(db):
+    """超过一万条产品时快照与品类计数不被截断。"""
+    category = await db["categories"].insert_one({"name": "蔬菜", "is_active": True})
+    category_id = str(category.inserted_id)
+    await db["products"].insert_many(
+        [{"name": f"产品{idx}", "category_id": category_id, "is_deleted": False} for idx in range(10001)]
+    )
+
+    snapshot = await get_catalog_snapshot(db)
+    assert len(snapshot.products) == 10001
+    assert snapshot.product_counts[category_id] == 10001
+
+
+@pytest.mark.asyncio
+async def test_snapshot_reads_do_not_write_version(db, monkeypatch):
+    """版本记录存在时读取快照只查询版本号，不执行写入。"""
+    await db["categories"].insert_one({"name": "蔬菜", "is_active": True})
+    first = await get_catalog_snapshot(db)
+
+    async def fail_write(*args, **kwargs):
+        """读取路径不应写入版本记录。"""
+        raise AssertionError("读取快照时写入了版本记录")
+
+    collection_type = type(db["meta"])
+    monkeypatch.setattr(collection_type, "find_one_and_update", fail_write)
+    monkeypatch.setattr(collection_type, "update_one", fail_write)
+    assert await get_catalog_snapshot(db) is first
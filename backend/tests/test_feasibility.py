@@ -0,0 +1,170 @@
+"""预算可行性预检与预算命中模拟测试。"""
+
+from datetime import date
+
+import pytest
+
+import app.services.procurement_generator as generator
+
+
+async def _setup_catalog(client, auth_header, budget: dict) -> str:
+    """写入预算区间、一个每日采购品类与两个产品，返回品类编号。"""
+    await client.put(
+        "/api/procurement/settings",
+        json={"daily_budget_range": budget},
+        headers=auth_header,
+    )
+    category = await client.post("/api/categories", json={"name": "蔬菜"}, headers=auth_header)
+    category_id = category.json()["data"]["id"]
+    for name, price in (("萝卜", "2.0"), ("白菜", "5.0")):
+        await client.post(
+            "/api/products",
+            json={
+                "name": name,
+                "category_id": category_id,
+                "unit": "斤",
+                "base_price": price,
+                "volatility": "0.1",
+                "item_quantity_range": {"min": "1", "max": "2"},
+            },
+            headers=auth_header,
+        )
+    await client.put(
+        f"/api/categories/{category_id}",
+        json={"purchase_mode": "daily", "items_count_range": {"min": 1, "max": 2}},
+        headers=auth_header,
+    )
+    return category_id
+
+
+@pytest.mark.asyncio
+async def test_feasibility_reports_daily_cost_interval(client, auth_header):
+    """预检应按最便宜下限与最贵上限计算每日可达金额区间。"""
+    category_id = await _setup_catalog(client, auth_header, {"min": "3", "max": "10"})
+
+    resp = await client.get("/api/categories/feasibility", headers=auth_header)
+    data = resp.json()["data"]
+
+    assert data["feasible"] is True
+    # 下限：萝卜 1.80 × 1 斤；上限：白菜 5.50 × 2 斤 + 萝卜 2.20 × 2 斤
+    assert data["cost_min"] == "1.80"
+    assert data["cost_max"] == "15.40"
+    assert data["categories"] == [
+        {
+            "category_id": category_id,
+            "category_name": "蔬菜",
+            "available": 2,
+            "min_count": 1,
+            "max_count": 2,
+            "cost_min": "1.80",
+            "cost_max": "15.40",
+        }
+    ]
+    assert data["issues"] == []
+
+
+@pytest.mark.asyncio
+async def test_infeasible_budget_rejected_before_generation(client, auth_header, db, monkeypatch, patch_workdays):
+    """严格模式下预算不可达时应在生成前拒绝，默认模式仅随结果提示。"""
+    async def fake_workdays(year: int, month: int):
+        """构造单个工作日。"""
+        return [date(year, month, 6)]
+
+    patch_workdays(fake_workdays)
+    await _setup_catalog(client, auth_header, {"min": "50", "max": "60"})
+
+    feasibility = await client.get("/api/categories/feasibility", headers=auth_header)
+    assert feasibility.json()["data"]["feasible"] is False
+    assert feasibility.json()["data"]["issues"][0]["reason"] == "最高日采总额低于预算下限"
+
+    params = {"start_year": 2026, "start_month": 2, "end_year": 2026, "end_month": 2}
+    rejected = await client.post(
+        "/api/procurement/generate",
+        params={**params, "require_feasible": True},
+        headers=auth_header,
+    )
+    assert rejected.status_code == 409
+    assert rejected.json()["code"] == 4108
+    assert rejected.json()["detail"]["feasibility"]["cost_max"] == "15.40"
+    assert await db["procurement_plans"].count_documents({}) == 0
+
+    resp = await client.post("/api/procurement/generate", params=params, headers=auth_header)
+    data = resp.json()["data"]
+    assert data["status"] == "成功"
+    assert data["feasibility"]["feasible"] is False
+
+
+@pytest.mark.asyncio
+async def test_budget_simulation_reports_distribution(client, auth_header, db):
+    """模拟应统计每日金额分布与品类贡献，相同种子结果一致且不写入计划。"""
+    category_id = await _setup_catalog(client, auth_header, {"min": "3", "max": "10"})
+    params = {"days": 300, "seed": 7}
+
+    resp = await client.get("/api/procurement/simulation", params=params, headers=auth_header)
+    data = resp.json()["data"]
+
+    assert data["days"] == 300
+    assert sum(bucket["days"] for bucket in data["daily_total"]["histogram"]) == 300
+    assert 0 <= data["daily_total"]["outside_budget_ratio"] <= 1
+    assert data["categories"][0]["category_id"] == category_id
+    assert data["categories"][0]["share"] == 1.0
+    assert data["budget_fit"]["days"] == 300
+    assert await db["procurement_plans"].count_documents({}) == 0
+
+    again = await client.get("/api/procurement/simulation", params=params, headers=auth_header)
+    assert again.json()["data"] == data
+
+    narrowed = await client.get(
+        "/api/procurement/simulation",
+        params={**params, "budget_min": "20", "budget_max": "30"},
+        headers=auth_header,
+    )
+    assert narrowed.json()["data"]["daily_total"]["below_budget_ratio"] == 1.0
+
+
+@pytest.mark.asyncio
+async def test_budget_simulation_uses_override_without_saved_budget(client, auth_header, db):
+    """未保存预算区间时，完整指定的临时预算区间可直接用于模拟。"""
+    await _setup_catalog(client, auth_header, {"min": "3", "max": "10"})
+    await db["settings"].update_one({"key": "global"}, {"$unset": {"daily_budget_range": ""}})
+
+    missing = await client.get("/api/procurement/simulation", params={"days": 50, "seed": 7}, headers=auth_header)
+    assert missing.status_code == 409
+
+    partial = await client.get(
+        "/api/procurement/simulation",
+        params={"days": 50, "seed": 7, "budget_min": "3"},
+        headers=auth_header,
+    )
+    assert partial.status_code == 409
+
+    resp = await client.get(
+        "/api/procurement/simulation",
+        params={"days": 50, "seed": 7, "budget_min": "3", "budget_max": "10"},
+        headers=auth_header,
+    )
+    assert resp.status_code == 200
+    data = resp.json()["data"]
+    assert data["days"] == 50
+    assert data["budget_fit"]["days"] == 50
+
+
+@pytest.mark.asyncio
+async def test_budget_simulation_runs_batches_off_event_loop(client, auth_header, db, monkeypatch):
+    """单进程模拟时各批次也在工作线程中生成，不占用事件循环。"""
+    import threading
+
+    await _setup_catalog(client, auth_header, {"min": "3", "max": "10"})
+    batch_threads: list[bool] = []
+    original_build_month = generator._build_month
+
+    def recording_build_month(context, task):
+        """记录批次是否在事件循环线程中生成。"""
+        batch_threads.append(threading.current_thread() is threading.main_thread())
+        return original_build_month(context, task)
+
+    monkeypatch.setattr(generator, "_build_month", recording_build_month)
+    resp = await client.get("/api/procurement/simulation", params={"days": 600, "seed": 7}, headers=auth_header)
+
+    assert resp.json()["data"]["days"] == 600
+    assert batch_threads == [False, False, False]
@@ -0,0 +1,63 @@
+"""定点数运算与 Decimal 路径一致性测试。"""
+
+from decimal import Decimal, ROUND_HALF_UP
+import random
+
+from app.services.fixed_point import (
+    cents_to_decimal,
+    div_round_half_up,
+    line_amount_cents,
+    step_ratio,
+    steps_to_decimal,
+    to_cents,
+    to_steps,
+)
+from app.services.number_utils import round_decimal
+import app.services.procurement_generator as generator
+
+
+def test_integer_path_matches_decimal_path():
+    """随机抽样比较整数路径与 Decimal 路径的取整结果。"""
+    rng = random.Random(20260201)
+    for _ in range(5000):
+        price = Decimal(rng.randint(1, 99999)).scaleb(-2)
+        step = rng.choice([Decimal("0.1"), Decimal("1")])
+        steps = rng.randint(0, 5000)
+        quantity = steps * step
+        precision = rng.choice([0, 1, 2])
+
+        amount_cents = line_amount_cents(to_cents(price), steps, step_ratio(step), precision)
+        assert cents_to_decimal(amount_cents) == round_decimal(price * quantity, precision)
+        assert steps_to_decimal(steps, step) == round_decimal(quantity, 1 if step < 1 else 0)
+
+        raw = Decimal(str(rng.uniform(-1000, 1000)))
+        assert cents_to_decimal(to_cents(raw)) == round_decimal(raw, 2)
+        assert to_steps(raw, step) * step == (raw / step).quantize(Decimal("1"), rounding=ROUND_HALF_UP) * step
+
+        numerator = rng.randint(-10**6, 10**6)
+        denominator = rng.randint(1, 1000)
+        expected = (Decimal(numerator) / Decimal(denominator)).quantize(Decimal("1"), rounding=ROUND_HALF_UP)
+        assert div_round_half_up(numerator, denominator) == int(expected)
+
+
+def test_build_item_matches_decimal_formula():
+    """整数路径构建的明细应与原 Decimal 公式一致。"""
+    product = {
+        "_id": "p1",
+        "name": "青菜",
+        "unit": "斤",
+        "base_price": "3.155",
+        "volatility": "0.2",
+        "item_quantity_range": {"min": "1.05", "max": "9.3"},
+    }
+    for seed in range(200):
+        profile = generator._build_product_profile(product, 2)
+        item = generator._build_item(product, profile, 2, rng=random.Random(seed))
+        replay = random.Random(seed)
+        factor = Decimal(1) + Decimal(str(replay.uniform(-0.2, 0.2)))
+        price = (Decimal("3.16") * factor).quantize(Decimal("0.01"))
+        cleaned = generator._cleanup_items([item])[0]
+        assert cleaned["price"] == price
+        assert Decimal("1.1") <= cleaned["quantity"] <= Decimal("9.3")
+        assert cleaned["amount"] == round_decimal(price * cleaned["quantity"], 2)
+        assert "_price_cents" not in cleaned
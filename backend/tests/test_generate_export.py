@@ -1,20 +1,89 @@
 """采购计划生成与导出测试。"""
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
+from decimal import Decimal
 
 import pytest
 
+from app.db.serializers import encode_for_mongo
+import app.services.generation_jobs as generation_jobs
+import app.services.plan_store as plan_store
 import app.services.procurement_generator as generator
+from app.services.number_utils import round_decimal
 
 
-@pytest.mark.asyncio
-async def test_generate_and_export(client, auth_header, monkeypatch):
-    """验证生成计划后可正常导出 ZIP。"""
+def _workdays_on(*days: int):
+    """返回以每月指定日期为工作日的模拟函数。"""
     async def fake_workdays(year: int, month: int):
         """模拟工作日列表。"""
-        return [date(year, month, 3), date(year, month, 4)]
+        return [date(year, month, day) for day in days]
+
+    return fake_workdays
 
-    monkeypatch.setattr(generator, "get_workdays", fake_workdays)
+
+async def _setup_vegetable_catalog(client, auth_header, volatility: str = "0.0") -> tuple[str, str]:
+    """通过接口写入预算区间 5~10、每日采购品类“蔬菜”与单个产品“青菜”，返回（品类编号, 产品编号）。"""
+    await client.put(
+        "/api/procurement/settings",
+        json={"daily_budget_range": {"min": "5", "max": "10"}},
+        headers=auth_header,
+    )
+    category = await client.post("/api/categories", json={"name": "蔬菜"}, headers=auth_header)
+    category_id = category.json()["data"]["id"]
+    product = await client.post(
+        "/api/products",
+        json={
+            "name": "青菜",
+            "category_id": category_id,
+            "unit": "斤",
+            "base_price": "3.0",
+            "volatility": volatility,
+            "item_quantity_range": {"min": "1", "max": "3"},
+        },
+        headers=auth_header,
+    )
+    await client.put(
+        f"/api/categories/{category_id}",
+        json={"purchase_mode": "daily", "items_count_range": {"min": 1, "max": 1}},
+        headers=auth_header,
+    )
+    return category_id, product.json()["data"]["id"]
+
+
+async def _insert_daily_catalog(db, products: int, volatility: float = 0.1, max_items: int = 2) -> str:
+    """直接写入预算区间 20~40、每日采购品类“蔬菜”与若干产品“青菜N”，返回品类编号。"""
+    await db["settings"].insert_one({"key": "global", "daily_budget_range": {"min": "20", "max": "40"}})
+    category = await db["categories"].insert_one(
+        {"name": "蔬菜", "is_active": True, "purchase_mode": "daily", "items_count_range": {"min": 1, "max": max_items}}
+    )
+    category_id = str(category.inserted_id)
+    await db["products"].insert_many(
+        [
+            {
+                "name": f"青菜{idx}",
+                "category_id": category_id,
+                "unit": "斤",
+                "base_price": 3 + idx,
+                "volatility": volatility,
+                "item_quantity_range": {"min": 1, "max": 5},
+                "is_deleted": False,
+            }
+            for idx in range(products)
+        ]
+    )
+    return category_id
+
+
+def _without_timestamps(plans: list[dict]) -> list[dict]:
+    """去除生成时间戳后比较。"""
+    return [{k: v for k, v in plan.items() if k not in {"created_at", "updated_at"}} for plan in plans]
+
+
+@pytest.mark.asyncio
+async def test_generate_and_export(client, auth_header, monkeypatch, patch_workdays):
+    """验证生成计划后可正常导出 ZIP。"""
+    patch_workdays(_workdays_on(3, 4))
 
     await client.put(
         "/api/procurement/exports/settings",
@@ -121,3 +190,414 @@ async def test_export_preview_precision_matches_export_rules(client, auth_header
     assert row["day_total"] == "1.4"
     assert "物资A0.1元" in row["items_text"]
     assert "物资B1.3元" in row["items_text"]
+
+
+@pytest.mark.asyncio
+async def test_generate_items_respect_step_and_precision_rules(client, auth_header, db, monkeypatch, patch_workdays):
+    """生成的明细应满足步进、区间与两位金额精度规则。"""
+    patch_workdays(_workdays_on(3, 4, 5))
+
+    await client.put(
+        "/api/procurement/settings",
+        json={"daily_budget_range": {"min": "20", "max": "40"}},
+        headers=auth_header,
+    )
+    category = await client.post("/api/categories", json={"name": "蔬菜"}, headers=auth_header)
+    category_id = category.json()["data"]["id"]
+    for name, unit, price in [("青菜", "斤", "3.15"), ("鸡蛋", "个", "0.85"), ("豆腐", "块", "2.5")]:
+        await client.post(
+            "/api/products",
+            json={
+                "name": name,
+                "category_id": category_id,
+                "unit": unit,
+                "base_price": price,
+                "volatility": "0.1",
+                "item_quantity_range": {"min": "1", "max": "8"},
+            },
+            headers=auth_header,
+        )
+    await client.put(
+        f"/api/categories/{category_id}",
+        json={"purchase_mode": "daily", "items_count_range": {"min": 2, "max": 3}},
+        headers=auth_header,
+    )
+
+    resp = await client.post(
+        "/api/procurement/generate",
+        params={"start_year": 2026, "start_month": 2, "end_year": 2026, "end_month": 2},
+        headers=auth_header,
+    )
+    assert resp.json()["data"]["status"] == "成功"
+    assert resp.json()["data"]["budget_fit"]["days"] == 3
+
+    plans = await db["procurement_plans"].find({"year_month": "2026-02"}).to_list(10)
+    assert len(plans) == 3
+    for plan in plans:
+        # 预算偏差只作为生成诊断返回，不写入计划文档
+        assert "budget_target" not in plan and "budget_error" not in plan
+        assert set(plan["items"][0]) == {
+            "product_id", "category_id", "category_name", "name", "unit", "price", "quantity", "amount",
+        }
+        for item in plan["items"]:
+            price = Decimal(str(item["price"]))
+            quantity = Decimal(str(item["quantity"]))
+            step = Decimal("0.1") if item["unit"] == "斤" else Decimal("1")
+            assert price == price.quantize(Decimal("0.01"))
+            assert Decimal("1") <= quantity <= Decimal("8")
+            assert quantity % step == 0
+            assert Decimal(str(item["amount"])) == round_decimal(price * quantity, 2)
+
+
+@pytest.mark.asyncio
+async def test_generate_streams_months_in_batches(client, auth_header, db, monkeypatch, patch_workdays):
+    """多月生成应按月产出并分批写入，批次大小不超过上限。"""
+    patch_workdays(_workdays_on(3, 4, 5))
+    monkeypatch.setattr(plan_store, "PLAN_WRITE_BATCH_SIZE", 2)
+
+    await _setup_vegetable_catalog(client, auth_header)
+
+    months = [
+        year_month
+        async for year_month, _, _, _ in generator.iter_generate_plans(db, 2026, 1, 2026, 3)
+    ]
+    assert months == ["2026-01", "2026-02", "2026-03"]
+
+    batch_sizes: list[int] = []
+
+    def recording_encode(value):
+        """记录每批写入的计划数量。"""
+        if isinstance(value, list):
+            batch_sizes.append(len(value))
+        return encode_for_mongo(value)
+
+    monkeypatch.setattr(plan_store, "encode_for_mongo", recording_encode)
+
+    resp = await client.post(
+        "/api/procurement/generate",
+        params={"start_year": 2026, "start_month": 1, "end_year": 2026, "end_month": 3},
+        headers=auth_header,
+    )
+    assert resp.json()["data"]["status"] == "成功"
+    assert await db["procurement_plans"].count_documents({}) == 9
+    assert batch_sizes and max(batch_sizes) <= 2
+
+
+@pytest.mark.asyncio
+async def test_parallel_generation_matches_serial(db, monkeypatch, patch_workdays):
+    """进程池并行生成与串行生成结果一致，且按日期顺序合并。"""
+    import random
+
+    patch_workdays(_workdays_on(3, 4, 5))
+    await _insert_daily_catalog(db, products=4)
+    periodic = await db["categories"].insert_one(
+        {
+            "name": "燃料",
+            "is_active": True,
+            "purchase_mode": "periodic",
+            "cycle_days": 30,
+            "float_days": 2,
+            "items_count_range": {"min": 1, "max": 1},
+        }
+    )
+    await db["products"].insert_one(
+        {
+            "name": "煤气",
+            "category_id": str(periodic.inserted_id),
+            "unit": "罐",
+            "base_price": 10,
+            "volatility": 0,
+            "item_quantity_range": {"min": 1, "max": 1},
+            "is_deleted": False,
+        }
+    )
+
+    random.seed(11)
+    serial, serial_warnings = await generator.generate_plans(db, 2026, 1, 2026, 4)
+    random.seed(11)
+    parallel, parallel_warnings = await generator.generate_plans(db, 2026, 1, 2026, 4, workers=2)
+
+    assert _without_timestamps(parallel) == _without_timestamps(serial)
+    assert parallel_warnings == serial_warnings
+    assert [plan["date"] for plan in parallel] == sorted(plan["date"] for plan in parallel)
+    assert len(serial) == 12
+
+
+class _RecordingPool(ThreadPoolExecutor):
+    """以线程池代替进程池，记录提交的月份与关闭参数。"""
+
+    def __init__(self, max_workers: int) -> None:
+        """初始化线程池与记录。"""
+        super().__init__(max_workers=max_workers)
+        self.months: list[str] = []
+        self.shutdowns: list[tuple[bool, bool]] = []
+
+    def submit(self, fn, *args, **kwargs):
+        """记录生成月份后提交。"""
+        task = args[-1]
+        self.months.append(f"{task.year}-{task.month:02d}")
+        return super().submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        """记录关闭方式后再关闭线程池。"""
+        self.shutdowns.append((wait, cancel_futures))
+        super().shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+@pytest.mark.asyncio
+async def test_parallel_generation_keeps_long_lived_pool(db, monkeypatch, patch_workdays):
+    """提前结束并行生成时只取消本次在途月份，常驻进程池保持可用并在后续请求中复用。"""
+    patch_workdays(_workdays_on(3, 4))
+    await _insert_daily_catalog(db, products=1, max_items=1)
+    pool = _RecordingPool(max_workers=1)
+    monkeypatch.setattr(generator, "_generation_pool", pool)
+
+    stream = generator.iter_generate_plans(db, 2026, 1, 2026, 6, workers=2)
+    year_month, plans, _, _ = await stream.__anext__()
+    await stream.aclose()
+    assert year_month == "2026-01" and len(plans) == 2
+
+    plans, _ = await generator.generate_plans(db, 2026, 1, 2026, 6, workers=2)
+    assert len(plans) == 12
+    assert pool.shutdowns == []
+    # 少于 PARALLEL_MIN_MONTHS 的区间直接串行生成，不提交到进程池
+    submitted = len(pool.months)
+    await generator.generate_plans(db, 2026, 1, 2026, generator.PARALLEL_MIN_MONTHS - 1, workers=2)
+    assert len(pool.months) == submitted
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_parallel_generation_releases_temporary_pool_without_blocking(db, monkeypatch, patch_workdays):
+    """未启动常驻进程池时临时创建，提前结束后以非阻塞方式关闭并取消尚未开始的月份。"""
+    patch_workdays(_workdays_on(3, 4))
+    await _insert_daily_catalog(db, products=1, max_items=1)
+    pools: list[_RecordingPool] = []
+
+    def new_pool(max_workers):
+        """记录临时创建的线程池。"""
+        pools.append(_RecordingPool(max_workers))
+        return pools[-1]
+
+    monkeypatch.setattr(generator, "_generation_pool", None)
+    monkeypatch.setattr(generator, "_new_generation_pool", new_pool)
+
+    stream = generator.iter_generate_plans(db, 2026, 1, 2026, 6, workers=2)
+    year_month, plans, _, _ = await stream.__anext__()
+    await stream.aclose()
+
+    assert year_month == "2026-01" and len(plans) == 2
+    assert len(pools) == 1 and pools[0].shutdowns == [(False, True)]
+
+
+@pytest.mark.asyncio
+async def test_seeded_generation_is_reproducible_and_cached(db, monkeypatch, patch_workdays):
+    """指定种子时结果与全局随机状态无关，重复请求命中缓存，目录变化后重新生成。"""
+    import random
+
+    from app.services.catalog_snapshot import bump_catalog_version
+    from app.services.generation_cache import generation_cache
+
+    patch_workdays(_workdays_on(3, 4))
+    await _insert_daily_catalog(db, products=3, volatility=0.2)
+
+    random.seed(1)
+    first, _ = await generator.generate_plans(db, 2026, 1, 2026, 2, seed=42)
+    assert len(generation_cache) == 1
+
+    built_months: list[str] = []
+    original_build_month = generator._build_month
+
+    def counting_build_month(context, task):
+        """记录实际生成的月份。"""
+        built_months.append(f"{task.year}-{task.month:02d}")
+        return original_build_month(context, task)
+
+    monkeypatch.setattr(generator, "_build_month", counting_build_month)
+
+    random.seed(2)
+    cached, _ = await generator.generate_plans(db, 2026, 1, 2026, 2, seed=42, creator_id="u1")
+    assert _without_timestamps(cached) == [{**plan, "creator_id": "u1"} for plan in _without_timestamps(first)]
+    assert built_months == []
+
+    generation_cache.clear()
+    random.seed(3)
+    regenerated, _ = await generator.generate_plans(db, 2026, 1, 2026, 2, seed=42)
+    assert _without_timestamps(regenerated) == _without_timestamps(first)
+    assert built_months == ["2026-01", "2026-02"]
+
+    other, _ = await generator.generate_plans(db, 2026, 1, 2026, 2, seed=43)
+    assert _without_timestamps(other) != _without_timestamps(first)
+
+    await db["products"].update_one({"name": "青菜0"}, {"$set": {"base_price": 4}})
+    await bump_catalog_version(db)
+    built_months.clear()
+    await generator.generate_plans(db, 2026, 1, 2026, 2, seed=42)
+    assert built_months == ["2026-01", "2026-02"]
+
+
+@pytest.mark.asyncio
+async def test_preview_then_commit_without_regenerating(client, auth_header, db, monkeypatch, patch_workdays):
+    """预览不落库；提交预览直接写入相同计划，冲突时需确认覆盖，提交后令牌失效。"""
+    patch_workdays(_workdays_on(3, 4))
+    await _setup_vegetable_catalog(client, auth_header, volatility="0.1")
+    await db["procurement_plans"].insert_one({"date": "2026-01-09", "year_month": "2026-01", "items": []})
+
+    resp = await client.post(
+        "/api/procurement/generate",
+        params={"start_year": 2026, "start_month": 1, "end_year": 2026, "end_month": 2, "preview": True},
+        headers=auth_header,
+    )
+    data = resp.json()["data"]
+    assert data["status"] == "预览"
+    assert data["conflict_months"] == ["2026-01"]
+    assert [plan["date"] for plan in data["plans"]] == ["2026-01-03", "2026-01-04", "2026-02-03", "2026-02-04"]
+    assert await db["procurement_plans"].count_documents({}) == 1
+
+    async def fail_generation(*args, **kwargs):
+        """提交预览时不应重新生成。"""
+        raise AssertionError("不应重新生成")
+        yield
+
+    monkeypatch.setattr(generation_jobs, "iter_generate_plans", fail_generation)
+    token = data["preview_token"]
+    resp = await client.post(f"/api/procurement/generate/previews/{token}/commit", headers=auth_header)
+    assert resp.json()["data"]["status"] == "冲突"
+
+    resp = await client.post(
+        f"/api/procurement/generate/previews/{token}/commit",
+        params={"force_overwrite": True},
+        headers=auth_header,
+    )
+    assert resp.json()["data"]["inserted"] == 4
+    cursor = db["procurement_plans"].find({}, {"_id": 0, "date": 1, "total_amount": 1}).sort("date", 1)
+    stored = await cursor.to_list(10)
+    assert stored == [
+        {"date": plan["date"], "total_amount": plan["total_amount"]} for plan in data["plans"]
+    ]
+
+    resp = await client.post(f"/api/procurement/generate/previews/{token}/commit", headers=auth_header)
+    assert resp.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_regenerate_only_replaces_requested_dates(client, auth_header, db, monkeypatch, patch_workdays):
+    """重新生成只替换指定日期；相同种子下结果与整月生成一致，非工作日被跳过。"""
+    patch_workdays(_workdays_on(3, 4, 5))
+    _, product_id = await _setup_vegetable_catalog(client, auth_header, volatility="0.1")
+    await client.post(
+        "/api/procurement/generate",
+        params={"start_year": 2026, "start_month": 1, "end_year": 2026, "end_month": 2, "seed": 7},
+        headers=auth_header,
+    )
+    before = {doc["date"]: doc async for doc in db["procurement_plans"].find({})}
+    assert len(before) == 6
+
+    def comparable(doc: dict) -> dict:
+        """去除文档编号与时间戳后比较。"""
+        return {k: v for k, v in doc.items() if k not in {"_id", "created_at", "updated_at"}}
+
+    resp = await client.post(
+        "/api/procurement/plans/regenerate",
+        json={"dates": ["2026-02-04", "2026-02-07"], "seed": 7},
+        headers=auth_header,
+    )
+    data = resp.json()["data"]
+    assert data["regenerated"] == ["2026-02-04"]
+    assert data["skipped"] == ["2026-02-07"]
+    after = {doc["date"]: doc async for doc in db["procurement_plans"].find({})}
+    assert comparable(after["2026-02-04"]) == comparable(before["2026-02-04"])
+
+    await client.put(f"/api/products/{product_id}", json={"base_price": "6.0"}, headers=auth_header)
+    resp = await client.post(
+        "/api/procurement/plans/regenerate",
+        json={"start_date": "2026-01-04", "end_date": "2026-01-04", "seed": 7},
+        headers=auth_header,
+    )
+    assert resp.json()["data"]["regenerated"] == ["2026-01-04"]
+    after = {doc["date"]: doc async for doc in db["procurement_plans"].find({})}
+    assert len(after) == 6
+    assert after["2026-01-04"]["items"][0]["price"] != before["2026-01-04"]["items"][0]["price"]
+    for plan_date in before:
+        if plan_date not in {"2026-01-04", "2026-02-04"}:
+            assert after[plan_date] == before[plan_date]
+
+    resp = await client.post("/api/procurement/plans/regenerate", json={}, headers=auth_header)
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_force_overwrite_replaces_by_date_without_emptying_month(client, auth_header, db, monkeypatch, patch_workdays):
+    """覆盖生成按日期原地替换，仅删除新计划中不存在的日期。"""
+    patch_workdays(_workdays_on(3, 4))
+    await _setup_vegetable_catalog(client, auth_header)
+    kept = await db["procurement_plans"].insert_one({"date": "2026-01-03", "year_month": "2026-01", "items": []})
+    await db["procurement_plans"].insert_one({"date": "2026-01-09", "year_month": "2026-01", "items": []})
+    await db["procurement_plans"].insert_one({"date": "2026-02-09", "year_month": "2026-02", "items": []})
+
+    assert await plan_store.supports_transactions(db) is False
+
+    delete_filters: list[dict] = []
+    collection_type = type(db["procurement_plans"])
+    original_delete_many = collection_type.delete_many
+
+    def recording_delete_many(self, filter, *args, **kwargs):
+        """记录删除条件。"""
+        delete_filters.append(filter)
+        return original_delete_many(self, filter, *args, **kwargs)
+
+    monkeypatch.setattr(collection_type, "delete_many", recording_delete_many)
+
+    resp = await client.post(
+        "/api/procurement/generate",
+        params={"start_year": 2026, "start_month": 1, "end_year": 2026, "end_month": 1, "force_overwrite": True},
+        headers=auth_header,
+    )
+    assert resp.json()["data"]["status"] == "成功"
+
+    docs = {doc["date"]: doc async for doc in db["procurement_plans"].find({})}
+    assert sorted(docs) == ["2026-01-03", "2026-01-04", "2026-02-09"]
+    assert docs["2026-01-03"]["_id"] == kept.inserted_id
+    assert docs["2026-01-03"]["items"]
+    # 只按日期清理过期文档，不整月删除
+    assert delete_filters and all("date" in spec for spec in delete_filters)
+
+
+def test_generation_cache_bounds_total_weight():
+    """缓存按权重总和淘汰最久未使用的条目，超出上限的值不写入。"""
+    from app.services.generation_cache import GenerationCache
+
+    cache = GenerationCache(max_entries=10, ttl_seconds=60, max_weight=10)
+    cache.put("a", ["a"], weight=4)
+    cache.put("b", ["b"], weight=4)
+    assert cache.get("a") == ["a"]
+    cache.put("c", ["c"], weight=4)
+    assert cache.get("b") is None and cache.get("a") == ["a"] and cache.get("c") == ["c"]
+    assert cache.weight == 8
+
+    cache.put("huge", ["huge"], weight=11)
+    assert cache.get("huge") is None and len(cache) == 2
+    cache.put("a", ["a2"], weight=2)
+    assert cache.get("a") == ["a2"] and cache.weight == 6
+
+
+@pytest.mark.asyncio
+async def test_seeded_generation_skips_cache_over_item_limit(db, monkeypatch, patch_workdays):
+    """明细行数超出缓存上限的结果不缓存，已缓存的结果不受影响。"""
+    from app.services import generation_metrics
+    from app.services.generation_cache import generation_cache
+    from app.services.generation_metrics import GenerationProfile
+
+    patch_workdays(_workdays_on(3, 4))
+    await _insert_daily_catalog(db, products=3)
+
+    await generator.generate_plans(db, 2026, 1, 2026, 1, seed=7)
+    assert len(generation_cache) == 1
+    items_per_month = generation_cache.weight
+
+    monkeypatch.setattr(generation_cache, "max_weight", items_per_month + 1)
+    with generation_metrics.recording(GenerationProfile()) as profile:
+        plans, _ = await generator.generate_plans(db, 2026, 1, 2026, 2, seed=7)
+    assert len(plans) == 4
+    assert len(generation_cache) == 1 and generation_cache.weight == items_per_month
+    assert profile.counters["cache_skips"] == 1
@@ -0,0 +1,146 @@
+"""后台生成任务测试。"""
+
+from datetime import date, datetime, timedelta
+import asyncio
+
+import pytest
+
+import app.services.procurement_generator as generator
+from app.services.generation_jobs import JOB_STATUS_INTERRUPTED, JOB_TERMINAL_STATUSES
+
+
+async def _prepare_catalog(client, auth_header) -> None:
+    """准备预算设置与一个每日采购品类。"""
+    await client.put(
+        "/api/procurement/settings",
+        json={"daily_budget_range": {"min": "5", "max": "10"}},
+        headers=auth_header,
+    )
+    category = await client.post("/api/categories", json={"name": "蔬菜"}, headers=auth_header)
+    category_id = category.json()["data"]["id"]
+    await client.post(
+        "/api/products",
+        json={
+            "name": "青菜",
+            "category_id": category_id,
+            "unit": "斤",
+            "base_price": "3.0",
+            "volatility": "0.0",
+            "item_quantity_range": {"min": "1", "max": "3"},
+        },
+        headers=auth_header,
+    )
+    await client.put(
+        f"/api/categories/{category_id}",
+        json={"purchase_mode": "daily", "items_count_range": {"min": 1, "max": 1}},
+        headers=auth_header,
+    )
+
+
+async def _wait_for_job(client, auth_header, job_id: str) -> dict:
+    """轮询任务直到结束。"""
+    for _ in range(200):
+        resp = await client.get(f"/api/procurement/generate/jobs/{job_id}", headers=auth_header)
+        job = resp.json()["data"]
+        if job["status"] in JOB_TERMINAL_STATUSES:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError("生成任务未在预期时间内结束")
+
+
+@pytest.mark.asyncio
+async def test_generation_job_reports_progress_and_result(client, auth_header, db, monkeypatch, patch_workdays):
+    """提交任务后可轮询到逐月进度与最终结果，计划写入数据库。"""
+    async def fake_workdays(year: int, month: int):
+        """模拟工作日列表。"""
+        return [date(year, month, 3), date(year, month, 4)]
+
+    patch_workdays(fake_workdays)
+    await _prepare_catalog(client, auth_header)
+
+    resp = await client.post(
+        "/api/procurement/generate/jobs",
+        params={"start_year": 2026, "start_month": 1, "end_year": 2026, "end_month": 3},
+        headers=auth_header,
+    )
+    job_id = resp.json()["data"]["job_id"]
+
+    job = await _wait_for_job(client, auth_header, job_id)
+    assert job["status"] == "已完成"
+    assert job["progress"]["months_total"] == 3
+    assert job["progress"]["months_done"] == 3
+    assert job["progress"]["days_done"] == 6
+    assert job["result"]["status"] == "成功"
+    assert job["result"]["budget_fit"]["days"] == 6
+    assert await db["procurement_plans"].count_documents({}) == 6
+
+    async with client.stream(
+        "GET", f"/api/procurement/generate/jobs/{job_id}/events", headers=auth_header
+    ) as stream:
+        lines = [line async for line in stream.aiter_lines() if line.startswith("data: ")]
+    assert len(lines) == 1
+    assert "已完成" in lines[0]
+
+
+@pytest.mark.asyncio
+async def test_generation_job_validation_and_stale_status(client, auth_header, db):
+    """无效范围直接拒绝；心跳超时的运行中任务报告为已中断。"""
+    resp = await client.post(
+        "/api/procurement/generate/jobs",
+        params={"start_year": 2026, "start_month": 5, "end_year": 2026, "end_month": 1},
+        headers=auth_header,
+    )
+    assert resp.status_code == 400
+
+    stale = datetime.utcnow() - timedelta(hours=1)
+    result = await db["generation_jobs"].insert_one(
+        {"status": "运行中", "progress": {}, "created_at": stale, "heartbeat_at": stale}
+    )
+    resp = await client.get(f"/api/procurement/generate/jobs/{result.inserted_id}", headers=auth_header)
+    assert resp.json()["data"]["status"] == JOB_STATUS_INTERRUPTED
+
+    resp = await client.get("/api/procurement/generate/jobs/unknown", headers=auth_header)
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_generation_job_builds_months_off_event_loop(client, auth_header, db, monkeypatch, patch_workdays):
+    """月份生成在工作线程中执行：生成阻塞时仍可查询任务状态。"""
+    import threading
+
+    async def fake_workdays(year: int, month: int):
+        """模拟工作日列表。"""
+        return [date(year, month, 3)]
+
+    patch_workdays(fake_workdays)
+    await _prepare_catalog(client, auth_header)
+
+    released = threading.Event()
+    blocked_threads: list[bool] = []
+    original_build_month = generator._build_month
+
+    def blocking_build_month(context, task):
+        """阻塞到测试确认状态查询可用后再生成，并记录是否在事件循环线程中执行。"""
+        blocked_threads.append(threading.current_thread() is threading.main_thread())
+        released.wait(timeout=5)
+        return original_build_month(context, task)
+
+    monkeypatch.setattr(generator, "_build_month", blocking_build_month)
+
+    resp = await client.post(
+        "/api/procurement/generate/jobs",
+        params={"start_year": 2026, "start_month": 1, "end_year": 2026, "end_month": 1},
+        headers=auth_header,
+    )
+    job_id = resp.json()["data"]["job_id"]
+    for _ in range(200):
+        if blocked_threads:
+            break
+        await asyncio.sleep(0.01)
+    status = await client.get(f"/api/procurement/generate/jobs/{job_id}", headers=auth_header)
+    assert status.json()["data"]["status"] == "运行中"
+    released.set()
+
+    job = await _wait_for_job(client, auth_header, job_id)
+    assert job["status"] == "已完成"
+    assert blocked_threads == [False]
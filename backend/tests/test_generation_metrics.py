@@ -0,0 +1,81 @@
+"""生成耗时与计数埋点测试。"""
+
+from datetime import date
+
+import pytest
+
+import app.services.procurement_generator as generator
+from app.services.generation_metrics import GenerationProfile, generation_metrics, recording, span
+
+
+def test_profile_merges_worker_records():
+    """子进程回传的记录应按阶段与计数累加。"""
+    profile = GenerationProfile()
+    with recording(profile):
+        with span("select"):
+            pass
+    profile.count("swaps_tried", 2)
+    profile.merge({"spans": {"select": {"seconds": 0.5, "calls": 3}}, "counters": {"swaps_tried": 1}})
+
+    data = profile.as_dict()
+    assert data["spans"]["select"]["calls"] == 4
+    assert data["spans"]["select"]["seconds"] >= 0.5
+    assert data["counters"] == {"swaps_tried": 3}
+
+
+@pytest.mark.asyncio
+async def test_generate_debug_profile_and_metrics(client, auth_header, monkeypatch, patch_workdays):
+    """debug 模式应返回各阶段耗时与计数，并累计到 /metrics。"""
+    async def fake_workdays(year: int, month: int):
+        """模拟工作日列表。"""
+        return [date(year, month, 3), date(year, month, 4)]
+
+    patch_workdays(fake_workdays)
+    generation_metrics.clear()
+
+    await client.put(
+        "/api/procurement/settings",
+        json={"daily_budget_range": {"min": "5", "max": "10"}},
+        headers=auth_header,
+    )
+    category = await client.post("/api/categories", json={"name": "蔬菜"}, headers=auth_header)
+    category_id = category.json()["data"]["id"]
+    await client.post(
+        "/api/products",
+        json={
+            "name": "青菜",
+            "category_id": category_id,
+            "unit": "斤",
+            "base_price": "3.0",
+            "volatility": "0.0",
+            "item_quantity_range": {"min": "1", "max": "3"},
+        },
+        headers=auth_header,
+    )
+    await client.put(
+        f"/api/categories/{category_id}",
+        json={"purchase_mode": "daily", "items_count_range": {"min": 1, "max": 1}},
+        headers=auth_header,
+    )
+
+    params = {"start_year": 2026, "start_month": 1, "end_year": 2026, "end_month": 2}
+    plain = await client.post("/api/procurement/generate", params=params, headers=auth_header)
+    assert "profile" not in plain.json()["data"]
+
+    resp = await client.post(
+        "/api/procurement/generate",
+        params={**params, "force_overwrite": True, "debug": True},
+        headers=auth_header,
+    )
+    profile = resp.json()["data"]["profile"]
+    for phase in ("load_context", "load_ledger", "workdays", "build_month", "select", "adjust", "write", "total"):
+        assert phase in profile["spans"]
+    assert profile["spans"]["build_month"]["calls"] == 2
+    assert profile["counters"]["days_built"] == 4
+    assert profile["counters"]["items_built"] == 4
+    assert profile["counters"]["adjust_passes"] == 4
+
+    metrics = await client.get("/metrics")
+    assert metrics.status_code == 200
+    assert 'autoprocure_generation_runs_total{operation="generate"} 2' in metrics.text
+    assert 'autoprocure_generation_events_total{operation="generate",event="days_built"} 8' in metrics.text
@@ -0,0 +1,102 @@
+"""生成器选品与产品画像测试。"""
+
+from dataclasses import FrozenInstanceError
+from decimal import Decimal
+import random
+
+import pytest
+
+import app.services.procurement_generator as generator
+
+
+def _product(product_id: str, price: str, unit: str = "个", qty_min: str = "2", qty_max: str = "5") -> dict:
+    """构造测试产品。"""
+    return {
+        "_id": product_id,
+        "name": product_id,
+        "unit": unit,
+        "base_price": price,
+        "volatility": "0.1",
+        "item_quantity_range": {"min": qty_min, "max": qty_max},
+    }
+
+
+def _bitmap(index: generator.CandidateIndex, used: list[dict], size: int | None = None) -> bytearray:
+    """构造当日位图并标记已用产品。"""
+    bitmap = bytearray(len(index) if size is None else size)
+    for product in used:
+        index.mark(bitmap, product, True)
+    return bitmap
+
+
+def test_product_profile_precomputes_cost_fields():
+    """产品画像应包含基础单价、最高单价、最小数量、步进与最低成本。"""
+    profile = generator._build_product_profile(_product("a", "3.15", unit="斤", qty_min="1.05"), 2)
+
+    assert profile.base_cents == 315
+    assert profile.max_price_cents == 346
+    assert profile.min_steps == 11
+    assert profile.step == Decimal("0.1")
+    assert profile.quantity_precision == 1
+    assert profile.min_cost_cents == 381
+    with pytest.raises(FrozenInstanceError):
+        profile.min_cost_cents = 0
+
+
+def test_lower_cost_swap_reads_profiles():
+    """超预算时应以画像中的最低成本替换高价产品。"""
+    candidates = [_product("cheap", "1"), _product("mid", "5"), _product("pricey", "50")]
+    profiles = generator._build_product_profiles(candidates, 2)
+
+    index = generator.CandidateIndex(candidates, profiles)
+    chosen, cost = generator._try_lower_cost_swap(
+        [candidates[2]],
+        index,
+        _bitmap(index, []),
+        random.Random(1),
+        profiles,
+        budget_max_cents=1200,
+    )
+    assert chosen[0]["_id"] in {"cheap", "mid"}
+    assert cost == profiles[chosen[0]["_id"]].min_cost_cents
+
+
+def test_candidate_index_picks_unused_cheaper_products():
+    """价格索引应只返回低于阈值且未使用的产品。"""
+    candidates = [_product(f"p{i}", str(i + 1)) for i in range(200)]
+    profiles = generator._build_product_profiles(candidates, 2)
+    index = generator.CandidateIndex(list(reversed(candidates)), profiles)
+    assert index.prices == sorted(index.prices)
+
+    bitmap = _bitmap(index, candidates[0:50:2])
+    rng = random.Random(7)
+    for _ in range(500):
+        picked = index.pick_cheaper(5100, bitmap, rng)
+        position = int(picked["_id"][1:])
+        assert position < 50 and position % 2 == 1
+
+    assert index.pick_cheaper(100, bitmap, rng) is None
+    full = _bitmap(index, candidates[:5])
+    assert index.pick_cheaper(600, full, rng) is None
+
+
+def test_candidate_index_samples_unused_products_in_shared_bitmap():
+    """多个品类共用一个当日位图时，抽样只返回本品类未用产品且不重复。"""
+    first = [_product(f"a{i}", str(i + 1)) for i in range(20)]
+    second = [_product(f"b{i}", str(i + 1)) for i in range(10)]
+    profiles = generator._build_product_profiles(first + second, 2)
+    first_index = generator.CandidateIndex(first, profiles)
+    second_index = generator.CandidateIndex(second, profiles, offset=len(first_index))
+    bitmap = _bitmap(first_index, first[:15], size=len(first_index) + len(second_index))
+    second_index.mark(bitmap, second[0], True)
+
+    assert first_index.free_count(bitmap) == 5
+    assert second_index.free_count(bitmap) == 9
+    rng = random.Random(3)
+    for _ in range(50):
+        picked = first_index.sample(3, bitmap, rng)
+        ids = [product["_id"] for product in picked]
+        assert len(set(ids)) == 3
+        assert all(int(product_id[1:]) >= 15 for product_id in ids)
+    assert {p["_id"] for p in first_index.sample(10, bitmap, rng)} == {f"a{i}" for i in range(15, 20)}
+    assert "b0" not in {p["_id"] for p in second_index.sample(9, bitmap, rng)}
@@ -0,0 +1,22 @@
+"""应用启动导入测试。"""
+
+from pathlib import Path
+import json
+import subprocess
+import sys
+
+ROOT = Path(__file__).resolve().parents[1]
+# 仅在首次使用时加载的重型依赖
+LAZY_MODULES = {"pandas", "pandas_market_calendars", "numpy", "openpyxl"}
+
+
+def _loaded_modules(module: str) -> set[str]:
+    """在独立进程中导入模块，返回导入后 sys.modules 中的全部模块名。"""
+    code = f"import json, sys, {module}; print(json.dumps(sorted(sys.modules)))"
+    stdout = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True).stdout
+    return set(json.loads(stdout))
+
+
+def test_app_startup_defers_heavy_imports():
+    """导入 app.main 后重型依赖尚未加载。"""
+    assert LAZY_MODULES.isdisjoint(_loaded_modules("app.main"))
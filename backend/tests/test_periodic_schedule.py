@@ -0,0 +1,160 @@
+"""定期采购排期测试。"""
+
+from datetime import date, timedelta
+import random
+
+import pytest
+
+from app.db.indexes import ensure_indexes
+from app.services.generation_cache import generation_cache
+from app.services.workdays import _default_workdays
+import app.services.procurement_generator as generator
+
+
+async def _insert_periodic_catalog(db) -> None:
+    """写入预算设置与一个 28 天周期的定期品类及其产品。"""
+    await db["settings"].insert_one({"key": "global", "daily_budget_range": {"min": 1, "max": 1000}})
+    category = await db["categories"].insert_one(
+        {
+            "name": "燃料",
+            "is_active": True,
+            "purchase_mode": "periodic",
+            "cycle_days": 28,
+            "float_days": 0,
+            "items_count_range": {"min": 1, "max": 1},
+        }
+    )
+    await db["products"].insert_one(
+        {
+            "name": "煤气",
+            "category_id": str(category.inserted_id),
+            "category_name": "燃料",
+            "unit": "罐",
+            "base_price": 100,
+            "volatility": 0,
+            "item_quantity_range": {"min": 1, "max": 1},
+            "is_deleted": False,
+        }
+    )
+
+
+async def _weekday_workdays(year: int, month: int):
+    """使用周一至周五作为工作日。"""
+    return _default_workdays(year, month)
+
+
+@pytest.mark.asyncio
+async def test_last_purchase_index_single_aggregation(db):
+    """一次聚合应返回每个定期产品的最近采购日期。"""
+    await db["procurement_plans"].insert_many(
+        [
+            {"date": "2026-01-05", "items": [{"product_id": "a"}, {"product_id": "b"}]},
+            {"date": "2026-01-20", "items": [{"product_id": "a"}, {"product_id": "c"}]},
+            {"date": "2026-02-02", "items": [{"product_id": "c"}]},
+        ]
+    )
+
+    index = await generator._load_last_purchase_index(db, ["a", "b", "x"])
+    assert index == {"a": date(2026, 1, 20), "b": date(2026, 1, 5)}
+    assert await generator._load_last_purchase_index(db, []) == {}
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_creates_periodic_lookup_index(db):
+    """启动索引应覆盖按产品与日期查询最近采购。"""
+    await ensure_indexes(db)
+    info = await db["procurement_plans"].index_information()
+    keys = [spec["key"] for spec in info.values()]
+    assert [("items.product_id", 1), ("date", -1)] in keys
+
+
+def test_periodic_schedule_uses_last_purchase_index():
+    """有最近采购记录时按周期顺延排期，无需访问数据库。"""
+    category = {"purchase_mode": "periodic", "cycle_days": 30, "float_days": 0}
+    product = {"_id": "a", "category_id": "c1"}
+    workdays = [date(2026, 2, 2), date(2026, 2, 3), date(2026, 2, 4)]
+
+    schedule = generator._build_periodic_schedule(
+        {"a": date(2026, 1, 3)},
+        {"c1": [product]},
+        {"c1": category},
+        workdays,
+        2026,
+        2,
+    )
+    assert schedule == {date(2026, 2, 2): [product]}
+
+
+@pytest.mark.asyncio
+async def test_multi_month_generation_uses_in_run_ledger(db, monkeypatch, patch_workdays):
+    """跨月生成时，上月新生成的定期采购应驱动下月排期，且只查询一次数据库。"""
+    async def fake_workdays(year: int, month: int):
+        """使用周一至周五作为工作日。"""
+        return _default_workdays(year, month)
+
+    calls: list[list[str]] = []
+    original = generator._load_last_purchase_index
+
+    async def counting_index(db_, product_ids, before=None):
+        """记录台账初始化查询次数。"""
+        calls.append(product_ids)
+        return await original(db_, product_ids, before=before)
+
+    patch_workdays(fake_workdays)
+    monkeypatch.setattr(generator, "_load_last_purchase_index", counting_index)
+
+    await _insert_periodic_catalog(db)
+
+    # 首月无历史记录时随机落日，固定种子保证用例可复现
+    random.seed(3)
+    plans, _ = await generator.generate_plans(db, 2026, 1, 2026, 3)
+
+    assert len(calls) == 1
+    dates = [date.fromisoformat(plan["date"]) for plan in plans]
+    assert len(dates) >= 3
+    for previous, current in zip(dates, dates[1:]):
+        expected = previous + timedelta(days=28)
+        assert current == generator.shift_to_next_workday(expected, _default_workdays(expected.year, expected.month))
+
+
+@pytest.mark.asyncio
+async def test_force_overwrite_keeps_periodic_dates_stable(client, auth_header, db, patch_workdays):
+    """相同种子重复覆盖生成时，台账不读取将被替换的计划，定期采购日期保持一致。"""
+    patch_workdays(_weekday_workdays)
+    await _insert_periodic_catalog(db)
+    params = {"start_year": 2026, "start_month": 1, "end_year": 2026, "end_month": 3, "seed": 11}
+
+    runs: list[list[str]] = []
+    for overwrite in (False, True):
+        generation_cache.clear()
+        resp = await client.post(
+            "/api/procurement/generate", params={**params, "force_overwrite": overwrite}, headers=auth_header
+        )
+        assert resp.json()["data"]["status"] == "成功"
+        runs.append(sorted([plan["date"] async for plan in db["procurement_plans"].find({})]))
+
+    assert len(runs[0]) >= 3
+    assert runs[1] == runs[0]
+
+
+@pytest.mark.asyncio
+async def test_preview_of_existing_months_matches_fresh_generation(client, auth_header, db, patch_workdays):
+    """预览已有计划的月份时与全新生成结果一致，提交后定期采购日期不漂移。"""
+    patch_workdays(_weekday_workdays)
+    await _insert_periodic_catalog(db)
+    params = {"start_year": 2026, "start_month": 1, "end_year": 2026, "end_month": 3, "seed": 11}
+
+    await client.post("/api/procurement/generate", params=params, headers=auth_header)
+    fresh = sorted([plan["date"] async for plan in db["procurement_plans"].find({})])
+    assert len(fresh) >= 3
+
+    generation_cache.clear()
+    resp = await client.post("/api/procurement/generate", params={**params, "preview": True}, headers=auth_header)
+    data = resp.json()["data"]
+    assert sorted(plan["date"] for plan in data["plans"]) == fresh
+
+    token = data["preview_token"]
+    await client.post(
+        f"/api/procurement/generate/previews/{token}/commit", params={"force_overwrite": True}, headers=auth_header
+    )
+    assert sorted([plan["date"] async for plan in db["procurement_plans"].find({})]) == fresh
@@ -0,0 +1,127 @@
+"""计划明细紧凑存储测试。"""
+
+from datetime import date
+
+import pytest
+
+import app.services.procurement_generator as generator
+from app.core.config import config
+from app.services.plan_codec import PLAN_DICTIONARY_COLLECTION, PLAN_FORMAT_FIELD, compact_items, find_meta_refs
+from app.services.plan_store import _upsert_plans
+
+
+def test_compact_items_keeps_lossy_rows_inline():
+    """可无损还原的明细压缩为引用行，额外精度的明细原样保留。"""
+    item = {
+        "product_id": "p1",
+        "category_id": "c1",
+        "category_name": "蔬菜",
+        "name": "青菜",
+        "unit": "斤",
+        "price": 3.3,
+        "quantity": 1.5,
+        "amount": 4.95,
+    }
+    edited = {**item, "price": 3.333}
+    rows, entries = compact_items([item, edited])
+
+    assert rows[0] == {"product_id": "p1", "r": rows[0]["r"], "p": 330, "q": 15, "a": 495}
+    assert entries == {rows[0]["r"]: {"category_id": "c1", "category_name": "蔬菜", "name": "青菜", "unit": "斤"}}
+    assert rows[1] is edited
+
+
+@pytest.mark.asyncio
+async def test_find_meta_refs_loads_only_requested_months(db):
+    """按年月条件只加载对应月份的字典。"""
+    meta = {"category_id": "c1", "category_name": "蔬菜", "unit": "斤"}
+    await db[PLAN_DICTIONARY_COLLECTION].insert_many(
+        [
+            {"_id": "2025-12", "entries": {"a": {**meta, "name": "青菜"}}},
+            {"_id": "2026-01", "entries": {"b": {**meta, "name": "青椒"}}},
+            {"_id": "2026-02", "entries": {"c": {**meta, "name": "青瓜"}}},
+        ]
+    )
+
+    def matches(name):
+        """名称包含“青”。"""
+        return "青" in name
+
+    assert await find_meta_refs(db, "name", matches) == ["a", "b", "c"]
+    assert await find_meta_refs(db, "name", matches, "2026-02") == ["c"]
+    assert await find_meta_refs(db, "name", matches, {"$gte": "2026-01", "$lte": "2026-12"}) == ["b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_compact_storage_keeps_responses_identical(client, auth_header, db, monkeypatch, patch_workdays):
+    """紧凑格式存储后，计划详情、导出预览与历史查询结果与展开格式一致。"""
+    async def fake_workdays(year: int, month: int):
+        """模拟工作日列表。"""
+        return [date(year, month, 3), date(year, month, 4)]
+
+    patch_workdays(fake_workdays)
+    await client.put(
+        "/api/procurement/settings",
+        json={"daily_budget_range": {"min": "5", "max": "10"}},
+        headers=auth_header,
+    )
+    category = await client.post("/api/categories", json={"name": "蔬菜"}, headers=auth_header)
+    category_id = category.json()["data"]["id"]
+    await client.post(
+        "/api/products",
+        json={
+            "name": "青菜",
+            "category_id": category_id,
+            "unit": "斤",
+            "base_price": "3.3",
+            "volatility": "0.1",
+            "item_quantity_range": {"min": "1", "max": "3"},
+        },
+        headers=auth_header,
+    )
+    await client.put(
+        f"/api/categories/{category_id}",
+        json={"purchase_mode": "daily", "items_count_range": {"min": 1, "max": 1}},
+        headers=auth_header,
+    )
+    params = {"start_year": 2026, "start_month": 2, "end_year": 2026, "end_month": 2, "seed": 3}
+    month = {"year": 2026, "month": 2}
+
+    async def snapshot() -> list[bytes]:
+        """读取详情、导出预览与历史查询的原始响应。"""
+        plan = await client.get("/api/procurement/plans/2026-02-03", headers=auth_header)
+        preview = await client.get("/api/procurement/exports/preview", params=month, headers=auth_header)
+        by_name = await client.get("/api/procurement/history", params={"keyword": "青"}, headers=auth_header)
+        by_category = await client.get(
+            "/api/procurement/history", params={"category": category_id}, headers=auth_header
+        )
+        return [plan.content, preview.content, by_name.content, by_category.content]
+
+    await client.post("/api/procurement/generate", params=params, headers=auth_header)
+    expanded = await snapshot()
+    stored = await db["procurement_plans"].find_one({"date": "2026-02-03"})
+    assert "name" in stored["items"][0]
+
+    # 同一批计划改为紧凑格式重写，文档编号与时间戳保持不变
+    monkeypatch.setattr(config, "plan_storage_format", "compact")
+    plans = await db["procurement_plans"].find({}).to_list(None)
+    await _upsert_plans(db, plans)
+    stored = await db["procurement_plans"].find_one({"date": "2026-02-03"})
+    assert stored[PLAN_FORMAT_FIELD] == "compact"
+    assert "name" not in stored["items"][0]
+    assert await db[PLAN_DICTIONARY_COLLECTION].count_documents({"_id": "2026-02"}) == 1
+    assert await snapshot() == expanded
+
+    # 手工编辑后仍以紧凑格式保存并正确还原
+    item = {**(await client.get("/api/procurement/plans/2026-02-03", headers=auth_header)).json()["data"]["items"][0]}
+    item.update(quantity="2", amount="6.6", price="3.3")
+    resp = await client.put(
+        "/api/procurement/plans/2026-02-03",
+        json={"items": [item], "total_amount": "6.6"},
+        headers=auth_header,
+    )
+    assert resp.json()["data"]["status"] == "成功"
+    stored = await db["procurement_plans"].find_one({"date": "2026-02-03"})
+    assert stored["items"][0]["q"] == 20
+    detail = (await client.get("/api/procurement/plans/2026-02-03", headers=auth_header)).json()["data"]
+    assert detail["items"][0]["name"] == "青菜"
+    assert detail["items"][0]["quantity"] == 2.0
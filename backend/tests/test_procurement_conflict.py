@@ -8,13 +8,13 @@ import app.services.procurement_generator as generator
 
 
 @pytest.mark.asyncio
-async def test_generate_conflict(client, auth_header, monkeypatch):
+async def test_generate_conflict(client, auth_header, monkeypatch, patch_workdays):
     """验证重复生成同月计划会返回冲突。"""
     async def fake_workdays(year: int, month: int):
         """构造仅含单个工作日的日期列表。"""
         return [date(year, month, 6)]
 
-    monkeypatch.setattr(generator, "get_workdays", fake_workdays)
+    patch_workdays(fake_workdays)
 
     await client.put(
         "/api/procurement/exports/settings",
@@ -8,13 +8,13 @@ import app.services.procurement_generator as generator
 
 
 @pytest.mark.asyncio
-async def test_user_flow_end_to_end(client, auth_header, monkeypatch):
+async def test_user_flow_end_to_end(client, auth_header, monkeypatch, patch_workdays):
     """验证从配置到生成与查询的完整流程。"""
     async def fake_workdays(year: int, month: int):
         """模拟固定的工作日列表。"""
         return [date(year, month, 3), date(year, month, 4)]
 
-    monkeypatch.setattr(generator, "get_workdays", fake_workdays)
+    patch_workdays(fake_workdays)
 
     resp = await client.put(
         "/api/procurement/exports/settings",
@@ -0,0 +1,61 @@
+"""紧凑工作日日历测试。"""
+
+from datetime import date
+from pathlib import Path
+import subprocess
+import sys
+
+from fastapi import HTTPException
+import pytest
+
+import app.services.workdays as workdays_service
+from app.services.workday_bitmap import YEAR_BYTES, WorkdayBitmap, bundled_bitmap_path, load_workday_bitmap
+
+
+def test_bitmap_round_trip_and_lookup():
+    """位图序列化后可还原，按位查询与原工作日一致，含闰年最后一天。"""
+    workdays = [date(2024, 1, 2), date(2024, 2, 29), date(2024, 12, 31), date(2025, 3, 3)]
+    bitmap = WorkdayBitmap.from_workdays(workdays, 2024, 2025)
+    restored = WorkdayBitmap.from_bytes(bitmap.to_bytes())
+
+    assert len(bitmap.to_bytes()) == 9 + 2 * YEAR_BYTES
+    assert restored.is_workday(date(2024, 12, 31))
+    assert not restored.is_workday(date(2024, 12, 30))
+    assert restored.month_workdays(2024, 2) == [date(2024, 2, 29)]
+    assert restored.month_workdays(2026, 1) is None
+    with pytest.raises(ValueError):
+        WorkdayBitmap.from_bytes(b"XXXX" + bitmap.to_bytes()[4:])
+
+
+@pytest.mark.asyncio
+async def test_bitmap_provider(tmp_path, monkeypatch):
+    """bitmap 来源按位图返回工作日，未覆盖年份按配置回退或报错。"""
+    path = tmp_path / "workdays.bin"
+    path.write_bytes(WorkdayBitmap.from_workdays([date(2026, 2, 2), date(2026, 3, 9)], 2026, 2026).to_bytes())
+    monkeypatch.setattr(workdays_service.config, "workday_provider", "bitmap")
+    monkeypatch.setattr(workdays_service.config, "workday_bitmap_path", str(path))
+
+    result = await workdays_service.get_workdays_range((2026, 2), (2026, 3))
+    assert result == {(2026, 2): [date(2026, 2, 2)], (2026, 3): [date(2026, 3, 9)]}
+    assert len(await workdays_service.get_workdays(2027, 3)) == 23
+
+    monkeypatch.setattr(workdays_service.config, "workday_fallback", False)
+    with pytest.raises(HTTPException) as exc_info:
+        await workdays_service.get_workdays(2027, 3)
+    assert exc_info.value.detail == "工作日日历未覆盖该年份"
+
+
+def test_bundled_calendar_is_lightweight():
+    """打包日历覆盖当前年份，且加载查询不引入 pandas。"""
+    bitmap = load_workday_bitmap(str(bundled_bitmap_path("SSE")))
+    assert bitmap.covers(2026)
+    # 2026 年元旦为节假日，1 月 5 日为周一工作日
+    assert not bitmap.is_workday(date(2026, 1, 1))
+    assert bitmap.is_workday(date(2026, 1, 5))
+
+    code = (
+        "import sys; from app.services.workday_bitmap import bundled_bitmap_path, load_workday_bitmap; "
+        "load_workday_bitmap(str(bundled_bitmap_path('SSE'))); print('pandas' in sys.modules)"
+    )
+    output = subprocess.run([sys.executable, "-c", code], cwd=Path(__file__).resolve().parents[1], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "False"
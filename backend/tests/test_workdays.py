@@ -1,10 +1,17 @@
 """工作日接口测试。"""
 
-from datetime import date
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import json
+import threading
+import time
 
 import pytest
 
 import app.routers.workdays as workdays_router
+import app.services.workdays as workdays_service
+from app.services.workdays import WORKDAY_CACHE_COLLECTION, workday_cache, workday_failures
 
 
 @pytest.mark.asyncio
@@ -20,3 +27,143 @@ async def test_workdays_endpoint(client, auth_header, monkeypatch):
     payload = resp.json()
     assert payload["code"] == 2000
     assert payload["data"]["workdays"] == ["2026-02-05"]
+
+
+@pytest.mark.asyncio
+async def test_workday_range_cache_and_refresh(client, auth_header, db, monkeypatch):
+    """区间工作日一次请求日历并按月拆分；先查内存缓存再查持久化缓存，刷新后重新读取；回退结果不缓存。"""
+    calls: list[tuple[date, date]] = []
+    available = True
+
+    def fake_calendar(start: date, end: date):
+        """模拟交易日历：每月 2、3 日为工作日，记录调用区间。"""
+        calls.append((start, end))
+        if not available:
+            return None
+        return [day for day in _days_between(start, end) if day.day in {2, 3}]
+
+    monkeypatch.setattr(workdays_service.config, "workday_provider", "pandas_market_calendars")
+    monkeypatch.setattr(workdays_service, "_calendar_workdays", fake_calendar)
+
+    assert await workdays_service.get_workdays(2026, 2) == [date(2026, 2, 2), date(2026, 2, 3)]
+    result = await workdays_service.get_workdays_range((2025, 11), (2026, 4))
+    assert list(result) == [(2025, 11), (2025, 12), (2026, 1), (2026, 2), (2026, 3), (2026, 4)]
+    assert result[(2025, 12)] == [date(2025, 12, 2), date(2025, 12, 3)]
+    # 已缓存的 2 月不再请求，其余月份合并为一次日历请求
+    assert calls == [(date(2026, 2, 1), date(2026, 2, 28)), (date(2025, 11, 1), date(2026, 4, 30))]
+    assert await db[WORKDAY_CACHE_COLLECTION].count_documents({}) == 6
+
+    # 进程内缓存失效后从集合读取，不再访问日历
+    workday_cache.clear()
+    assert await workdays_service.get_workdays_range((2025, 11), (2026, 4)) == result
+    assert len(calls) == 2
+
+    # 回退得到的工作日每次重新获取
+    available = False
+    assert len(await workdays_service.get_workdays(2027, 3)) == 23
+    await workdays_service.get_workdays(2027, 3)
+    assert len(calls) == 4
+    available = True
+
+    resp = await client.post("/api/workdays/refresh", params={"year": 2026}, headers=auth_header)
+    assert resp.json()["data"]["removed"] == 4
+    await workdays_service.get_workdays_range((2025, 12), (2026, 1))
+    assert calls[-1] == (date(2026, 1, 1), date(2026, 1, 31))
+
+
+def _days_between(start: date, end: date) -> list[date]:
+    """返回起止日期内的所有日期。"""
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+class _StubWorkdayHandler(BaseHTTPRequestHandler):
+    """本地工作日接口桩：固定延迟后返回每月 2、3 日，失败月份返回 500，并记录同时处理中的请求峰值。"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    delay = 0.05
+    failing_month = 6
+
+    def do_GET(self) -> None:
+        """记录请求与连接端口后返回工作日。"""
+        query = parse_qs(urlparse(self.path).query)
+        year, month = int(query["year"][0]), int(query["month"][0])
+        self.server.requests.append((year, month))
+        self.server.ports.add(self.client_address[1])
+        with self.server.lock:
+            self.server.in_flight += 1
+            self.server.peak_in_flight = max(self.server.peak_in_flight, self.server.in_flight)
+        time.sleep(self.delay)
+        with self.server.lock:
+            self.server.in_flight -= 1
+        if month == self.failing_month:
+            body, status = b"{}", 500
+        else:
+            body = json.dumps({"workdays": [f"{year}-{month:02d}-02", f"{year}-{month:02d}-03"]}).encode()
+            status = 200
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        """测试中不输出访问日志。"""
+
+
+class _StubWorkdayServer(ThreadingHTTPServer):
+    """工作日接口桩服务，监听队列足以容纳并发连接。"""
+
+    daemon_threads = True
+    request_queue_size = 64
+
+
+@pytest.fixture
+def stub_workday_api(monkeypatch):
+    """启动本地工作日接口桩并切换为接口来源。"""
+    server = _StubWorkdayServer(("127.0.0.1", 0), _StubWorkdayHandler)
+    server.requests, server.ports = [], set()
+    server.lock = threading.Lock()
+    server.in_flight = server.peak_in_flight = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(workdays_service.config, "workday_provider", "api")
+    monkeypatch.setattr(workdays_service.config, "workday_api_url", f"http://127.0.0.1:{server.server_port}/workdays")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.asyncio
+async def test_api_workdays_pooled_concurrent_and_negative_cache(db, monkeypatch, stub_workday_api):
+    """接口来源复用连接、并发请求区间各月，失败月份短期内不再重复请求。"""
+    async def peak_for_range(concurrency: int) -> int:
+        """清空缓存后按指定并发数解析 12 个月工作日，返回接口桩同时处理的请求峰值。"""
+        monkeypatch.setattr(workdays_service.config, "workday_api_concurrency", concurrency)
+        workday_cache.clear()
+        workday_failures.clear()
+        await db[WORKDAY_CACHE_COLLECTION].delete_many({})
+        stub_workday_api.peak_in_flight = 0
+        await workdays_service.open_workday_client()
+        try:
+            result = await workdays_service.get_workdays_range((2026, 1), (2026, 12))
+        finally:
+            await workdays_service.close_workday_client()
+        assert result[(2026, 1)] == [date(2026, 1, 2), date(2026, 1, 3)]
+        # 失败月份回退为默认工作日
+        assert len(result[(2026, 6)]) == 22
+        return stub_workday_api.peak_in_flight
+
+    assert await peak_for_range(1) == 1
+    # 串行请求复用同一连接
+    assert len(stub_workday_api.ports) == 1
+    # 并发请求同时在途，且不超过信号量限制
+    assert 1 < await peak_for_range(4) <= 4
+
+    # 失败结果缓存期间不再请求接口，成功月份由缓存返回
+    stub_workday_api.requests.clear()
+    await workdays_service.get_workdays_range((2026, 1), (2026, 12))
+    assert stub_workday_api.requests == []
+    workday_failures.clear()
+    await workdays_service.get_workdays(2026, 6)
+    assert stub_workday_api.requests == [(2026, 6)]